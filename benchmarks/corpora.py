@@ -0,0 +1,116 @@
+"""Reproducible synthetic word lists for benchmarks.
+
+Every generator takes the number of words and a seed and returns the same list
+for the same arguments, regardless of the platform.
+"""
+import random
+import string
+from typing import (  # pylint: disable=unused-import; false positive
+    Callable,
+    Dict,
+    List,
+)
+
+_SYLLABLES = [
+    consonant + vowel
+    for consonant in 'bcdfghklmnprstvz'
+    for vowel in 'aeiou'
+]
+_PREFIXES = ['', '', '', 'un', 're', 'pre', 'dis', 'over', 'in', 'sub']
+_SUFFIXES = ['', '', 's', 'ed', 'ing', 'er', 'ers', 'ness', 'able', 'ly']
+_UNICODE_ALPHABET = (
+    'áéíóúčřšžůñç'  # Latin-1 and Latin Extended-A
+    'αβγδεζηθικλμνξοπρστυφχψω'  # Greek
+    'абвгдежзийклмнопрстуфхцчшщ'  # Cyrillic
+    '日本語中文字漢'  # CJK
+    '\U0001F600\U0001F680\U0001F30D'  # outside of the Basic Multilingual Plane
+)
+
+
+def path_words(count: int, seed: int = 0) -> List[str]:
+    """Generates words resembling domain names and file paths, with common
+    prefixes of random length.
+    """
+    generator = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + '.-_/'
+    stems = [
+        ''.join(generator.choice(alphabet) for _ in range(generator.randint(3, 12)))
+        for _ in range(max(1, count // 100))
+    ]
+
+    return [
+        generator.choice(stems) + ''.join(
+            generator.choice(alphabet) for _ in range(generator.randint(1, 12))
+        )
+        for _ in range(count)
+    ]
+
+
+def ascii_words(count: int, seed: int = 0) -> List[str]:
+    """Generates random lowercase words with few common prefixes."""
+    generator = random.Random(seed)
+
+    return [
+        ''.join(
+            generator.choice(string.ascii_lowercase)
+            for _ in range(generator.randint(3, 12))
+        )
+        for _ in range(count)
+    ]
+
+
+def dictionary_words(count: int, seed: int = 0) -> List[str]:
+    """Generates pronounceable words from syllables and common affixes, which
+    share both prefixes and suffixes like words of a natural language.
+    """
+    generator = random.Random(seed)
+    stems = [
+        ''.join(generator.choice(_SYLLABLES) for _ in range(generator.randint(1, 4)))
+        for _ in range(max(1, count // 5))
+    ]
+
+    return [
+        generator.choice(_PREFIXES) + generator.choice(stems) + generator.choice(_SUFFIXES)
+        for _ in range(count)
+    ]
+
+
+def repetitive_words(count: int, seed: int = 0) -> List[str]:
+    """Generates long words made of repeated short units, which are compressed
+    into quantifiers.
+    """
+    generator = random.Random(seed)
+    words = []
+
+    for _ in range(count):
+        unit = ''.join(generator.choice('abc') for _ in range(generator.randint(1, 4)))
+        words.append(
+            generator.choice(string.ascii_lowercase)
+            + unit * generator.randint(2, 30)
+            + generator.choice(string.ascii_lowercase)
+        )
+
+    return words
+
+
+def unicode_words(count: int, seed: int = 0) -> List[str]:
+    """Generates words of letters outside of ASCII, including those outside of
+    the Basic Multilingual Plane.
+    """
+    generator = random.Random(seed)
+
+    return [
+        ''.join(
+            generator.choice(_UNICODE_ALPHABET) for _ in range(generator.randint(2, 10))
+        )
+        for _ in range(count)
+    ]
+
+
+CORPORA = {
+    'ascii': ascii_words,
+    'dictionary': dictionary_words,
+    'paths': path_words,
+    'repetitive': repetitive_words,
+    'unicode': unicode_words,
+}  # type: Dict[str, Callable[[int, int], List[str]]]
@@ -0,0 +1,120 @@
+"""Measures memory allocated while words are inserted into `PrefixTree`.
+
+Run from the repository root::
+
+    python -m benchmarks.insertion [--corpora paths,repetitive] [--words 100000]
+                                   [--depths 10,100,400]
+
+Words of every corpus are added one by one. For each of them, ``tracemalloc``
+records the peak of memory allocated during `PrefixTree.add` above the memory
+allocated before the call, which includes temporary copies of the word, and the
+number of memory blocks still allocated after it. Time per word is measured
+separately, without tracing.
+
+The depth test adds a word below a chain of single letter edges of each depth.
+Memory allocated for it should not grow with the depth, as long as no part of
+the word is copied on every edge. Requires Python 3.9.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from typing import (  # pylint: disable=unused-import; false positive
+    List,
+    Optional,
+    Tuple,
+)
+
+from benchmarks.corpora import CORPORA
+from w2re.prefix_tree.tree import PrefixTree
+
+
+def measure_words(words: List[str]) -> Tuple[float, int, float, float]:
+    """:return: Mean and maximal peak of bytes, mean number of retained memory
+        blocks and mean time in microseconds per added word.
+    """
+    tree = PrefixTree()
+    started = time.perf_counter()
+
+    for word in words:
+        tree.add(word)
+
+    elapsed = time.perf_counter() - started
+
+    tree = PrefixTree()
+    peaks = []  # type: List[int]
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+
+    for word in words:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tree.add(word)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+
+    return (
+        sum(peaks) / len(peaks), max(peaks), blocks / len(words),
+        elapsed / len(words) * 10 ** 6
+    )
+
+
+def measure_depth(depth: int, suffix_length: int) -> Optional[int]:
+    """:return: Peak of bytes allocated while adding a word ending with
+        ``suffix_length`` new letters below a chain of ``depth`` edges, or
+        ``None`` if it fails.
+    """
+    # traced since the chain is built, so that replaced weights of its nodes
+    # are subtracted
+    tracemalloc.start()
+
+    try:
+        tree = PrefixTree('a' * length for length in range(1, depth + 1))
+        word = 'a' * depth + 'b' * suffix_length
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tree.add(word)
+        return tracemalloc.get_traced_memory()[1] - before
+    except RecursionError:
+        return None
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--corpora', default=','.join(sorted(CORPORA)),
+                        help='Comma separated corpora, out of: {}.'.format(
+                            ', '.join(sorted(CORPORA))))
+    parser.add_argument('--words', type=int, default=100000,
+                        help='Number of words of each corpus. '
+                             'Defaults to %(default)s.')
+    parser.add_argument('--depths', default='10,100,400',
+                        help='Comma separated depths of the depth test. '
+                             'Defaults to %(default)s.')
+    args = parser.parse_args(argv)
+
+    print('{:<12} {:>12} {:>12} {:>14} {:>14}'.format(
+        'corpus', 'mean [B]', 'max [B]', 'blocks/word', 'time [us]'
+    ))
+
+    for corpus in args.corpora.split(','):
+        print('{:<12} {:>12.1f} {:>12} {:>14.2f} {:>14.2f}'.format(
+            corpus, *measure_words(CORPORA[corpus](args.words, 0))
+        ))
+
+    print('\n{:<12} {:>12} {:>12}'.format('depth', 'peak [B]', 'long [B]'))
+
+    for depth in (int(depth) for depth in args.depths.split(',')):
+        print('{:<12} {:>12} {:>12}'.format(depth, *(
+            'failed' if peak is None else peak
+            for peak in (measure_depth(depth, 1), measure_depth(depth, 1000))
+        )))
+
+
+if __name__ == '__main__':
+    main()
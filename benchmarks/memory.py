@@ -0,0 +1,78 @@
+"""Compares memory used by prefix tree implementations.
+
+Run from the repository root::
+
+    python -m benchmarks.memory [--words 1000000] [--input words.txt]
+"""
+import argparse
+import time
+import tracemalloc
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Callable,
+    List,
+)
+
+from benchmarks.corpora import path_words
+from w2re import PythonFormatter
+from w2re.prefix_tree.compact import CompactPrefixTree
+from w2re.prefix_tree.tree import PrefixTree
+
+IMPLEMENTATIONS = (PrefixTree, CompactPrefixTree)
+
+
+def measure(build: Callable, words: List[str]) -> Any:
+    """Builds the tree twice, because tracing memory allocations slows it down."""
+    started = time.perf_counter()
+    tree = build(words)
+    elapsed = time.perf_counter() - started
+    del tree
+
+    tracemalloc.start()
+    tree = build(words)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:<20} {:>12.1f} {:>12.1f} {:>10.2f}'.format(
+        build.__name__, current / 2 ** 20, peak / 2 ** 20, elapsed
+    ))
+
+    return tree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=1000000,
+                        help='Number of generated words.')
+    parser.add_argument('--input', help='File with one word per line, used instead '
+                                        'of generated words.')
+    parser.add_argument('--check', action='store_true',
+                        help='Verify that all implementations produce the same output.')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, encoding='utf-8') as input_file:
+            words = [line.rstrip('\r\n') for line in input_file]
+    else:
+        words = path_words(args.words)
+
+    print('{} words, {:.1f} MiB of text'.format(
+        len(words), sum(len(word) for word in words) / 2 ** 20
+    ))
+    print('{:<20} {:>12} {:>12} {:>10}'.format('', 'size [MiB]', 'peak [MiB]', 'time [s]'))
+    regexps = set()
+
+    for implementation in IMPLEMENTATIONS:
+        tree = measure(implementation, words)
+
+        if args.check:
+            regexps.add(tree.to_regexp(PythonFormatter))
+
+        del tree
+
+    if args.check:
+        print('Outputs are {}.'.format('identical' if len(regexps) == 1 else 'DIFFERENT'))
+
+
+if __name__ == '__main__':
+    main()
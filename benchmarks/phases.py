@@ -0,0 +1,258 @@
+"""Times phases of the conversion of words into a regular expression.
+
+Run from the repository root::
+
+    python -m benchmarks.phases [--corpora ascii,unicode] [--sizes 1K,100K]
+                                [--repeat 3] [--output results.json]
+                                [--compare baseline.json]
+
+For every corpus and size, it times building of the prefix tree, its conversion
+with each formatter, `compress` of every word on its own, compilation of the
+output and matching of text by it. Matching is compared with a naive alternation
+of all words, lookups of words in the tree with matching by the output, and
+rejection of non-matching strings with and without atomic groups. Results are
+printed and can be stored as JSON and compared with results of another version.
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from benchmarks.corpora import CORPORA
+from w2re import __version__
+from w2re.formatters import (
+    ALL_FORMATTERS,
+    BaseFormatter,
+    PythonAtomicFormatter,
+    PythonFormatter,
+)
+from w2re.prefix_tree.primitives import escape_label
+from w2re.prefix_tree.tree import PrefixTree
+from w2re.prefix_tree.repetitions import compress
+
+_SIZE_SUFFIXES = {'K': 10 ** 3, 'M': 10 ** 6}
+_MATCHED_TEXT_WORDS = 10000  # words in the text searched by the regular expressions
+_DEFAULT_SIZES = '1K,10K,100K'
+_REGRESSION_RATIO = 1.1  # slower by more than this is reported by --compare
+_HAS_ATOMIC_GROUPS = sys.version_info >= (3, 11)
+
+Result = Dict[str, Any]
+
+
+def parse_size(size: str) -> int:
+    """:return: Number from a string such as ``'10K'`` or ``'1M'``."""
+    size = size.strip().upper()
+
+    if size[-1:] in _SIZE_SUFFIXES:
+        return int(size[:-1]) * _SIZE_SUFFIXES[size[-1]]
+
+    return int(size)
+
+
+def best_time(function: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """:return: Shortest of ``repeat`` run times in seconds and the last result."""
+    times = []
+    result = None
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+
+    return min(times), result
+
+
+def matched_text(words: List[str], seed: int = 0) -> str:
+    """:return: Text of randomly chosen words and their altered copies, so that
+        about a half of them does not match.
+    """
+    generator = random.Random(seed)
+    text_words = []
+
+    for _ in range(_MATCHED_TEXT_WORDS):
+        word = generator.choice(words)
+        text_words.append(word if generator.random() < 0.5 else word[::-1] + '~')
+
+    return ' '.join(text_words)
+
+
+def benchmark(corpus: str, size: int, repeat: int) -> List[Result]:
+    words = CORPORA[corpus](size, 0)
+    results = []  # type: List[Result]
+
+    def record(phase: str, seconds: float, **extra: Any) -> None:
+        result = dict(corpus=corpus, size=size, phase=phase, seconds=seconds)
+        result.update(extra)
+        results.append(result)
+        print('{:<12} {:>10} {:<24} {:>10.4f}{}'.format(
+            corpus, size, phase, seconds,
+            ''.join(' {}={}'.format(key, value) for key, value in sorted(extra.items()))
+        ))
+
+    def build() -> PrefixTree:
+        tree = PrefixTree()
+        tree.extend(words)
+        return tree
+
+    seconds, tree = best_time(build, repeat)
+    record('extend', seconds)
+
+    regexps = {}  # type: Dict[str, str]
+
+    def to_regexp(formatter: Type[BaseFormatter]) -> str:
+        escape_label.cache_clear()  # labels would be escaped only by the first formatter
+        return tree.to_regexp(formatter)
+
+    for formatter in ALL_FORMATTERS:
+        seconds, regexps[formatter.code()] = best_time(
+            lambda: to_regexp(formatter), repeat  # pylint: disable=cell-var-from-loop
+        )
+        record('to_regexp[{}]'.format(formatter.code()), seconds,
+               length=len(regexps[formatter.code()]))
+
+    seconds, _ = best_time(lambda: [compress(re.escape(word)) for word in words], repeat)
+    record('compress', seconds)
+
+    regexp = regexps[PythonFormatter.code()]
+    naive_regexp = '|'.join(
+        re.escape(word) for word in sorted(set(words), key=len, reverse=True)
+    )
+
+    text = matched_text(words)
+
+    for name, pattern in (('', regexp), ('naive ', naive_regexp)):
+        seconds, compiled = best_time(
+            lambda: compile_uncached(pattern), repeat  # pylint: disable=cell-var-from-loop
+        )
+        record('{}compile'.format(name), seconds)
+
+        seconds, matches = best_time(
+            lambda: compiled.findall(text), repeat  # pylint: disable=cell-var-from-loop
+        )
+        record('{}match'.format(name), seconds, matches=len(matches),
+               mib_per_second=round(len(text) / 2 ** 20 / seconds, 2))
+
+    # the same words are looked up in the tree and by the compiled regular expression
+    lookups = text.split(' ')
+    compiled = compile_uncached(regexp)
+    seconds, found = best_time(lambda: tree.contains_many(lookups), repeat)
+    record('contains_many', seconds, found=sum(found))
+    seconds, found = best_time(
+        lambda: [compiled.fullmatch(word) is not None for word in lookups], repeat
+    )
+    record('regexp fullmatch', seconds, found=sum(found))
+    seconds, found = best_time(
+        lambda: [tree.longest_prefix_match(word) for word in lookups], repeat
+    )
+    record('longest_prefix_match', seconds, found=sum(map(bool, found)))
+    seconds, found = best_time(lambda: [compiled.match(word) for word in lookups], repeat)
+    record('regexp match', seconds, found=sum(map(bool, found)))
+
+    # words continued past their end and text of reversed words, which are
+    # rejected only after trying all shorter words
+    misses = [word + '~' for word in lookups]
+    missed_text = ' '.join(word[::-1] for word in lookups)
+    formatters = (PythonFormatter, PythonAtomicFormatter) if _HAS_ATOMIC_GROUPS else \
+        (PythonFormatter,)
+
+    for formatter in formatters:
+        # pylint: disable=cell-var-from-loop
+        code = formatter.code()
+        compiled = compile_uncached(regexps[code])
+        seconds, found = best_time(
+            lambda: [compiled.fullmatch(word) for word in misses], repeat
+        )
+        record('fullmatch misses[{}]'.format(code), seconds, found=sum(map(bool, found)))
+        seconds, matches = best_time(lambda: compiled.findall(missed_text), repeat)
+        record('search misses[{}]'.format(code), seconds, matches=len(matches))
+
+    return results
+
+
+def compile_uncached(pattern: str) -> Any:
+    re.purge()  # compiled patterns are cached by re
+    return re.compile(pattern)
+
+
+def compare(results: List[Result], baseline: List[Result]) -> None:
+    """Prints ratios of times of phases present in both ``results`` and ``baseline``."""
+    baseline_seconds = {
+        (result['corpus'], result['size'], result['phase']): result['seconds']
+        for result in baseline
+    }
+    print()
+    print('{:<12} {:>10} {:<24} {:>10} {:>10} {:>7}'.format(
+        'corpus', 'size', 'phase', 'baseline', 'current', 'ratio'
+    ))
+
+    for result in results:
+        key = (result['corpus'], result['size'], result['phase'])
+
+        if key in baseline_seconds:
+            ratio = result['seconds'] / max(baseline_seconds[key], 1e-9)
+            print('{:<12} {:>10} {:<24} {:>10.4f} {:>10.4f} {:>6.2f}x{}'.format(
+                result['corpus'], result['size'], result['phase'],
+                baseline_seconds[key], result['seconds'], ratio,
+                ' SLOWER' if ratio > _REGRESSION_RATIO else ''
+            ))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--corpora', default=','.join(sorted(CORPORA)),
+                        help='Comma separated corpora, out of: {}.'.format(
+                            ', '.join(sorted(CORPORA))))
+    parser.add_argument('--sizes', default=_DEFAULT_SIZES,
+                        help='Comma separated numbers of words, such as 1K or 10M. '
+                             'Defaults to %(default)s.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs of each phase. The shortest time is '
+                             'reported. Defaults to %(default)s.')
+    parser.add_argument('--output', help='JSON file to store results in.')
+    parser.add_argument('--compare', help='JSON file with results to compare with.')
+    args = parser.parse_args(argv)
+
+    corpora = args.corpora.split(',')
+    unknown_corpora = set(corpora) - set(CORPORA)
+
+    if unknown_corpora:
+        parser.error('Unknown corpora: {}'.format(', '.join(sorted(unknown_corpora))))
+
+    results = []  # type: List[Result]
+    print('{:<12} {:>10} {:<24} {:>10}'.format('corpus', 'size', 'phase', 'time [s]'))
+
+    for corpus in corpora:
+        for size in args.sizes.split(','):
+            results.extend(benchmark(corpus, parse_size(size), args.repeat))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({
+                'version': __version__,
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'repeat': args.repeat,
+                'results': results,
+            }, output_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            compare(results, json.load(baseline_file)['results'])
+
+
+if __name__ == '__main__':
+    main()
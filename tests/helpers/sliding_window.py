@@ -0,0 +1,98 @@
+"""The original sliding window implementation of `compress`, used as a reference.
+
+It does not handle escaped backslashes correctly, so it must not be used for
+strings containing them.
+"""
+
+
+def get_stop_index(word, sliding_window_length):
+    """ Stop index for two adjacent sliding windows.
+
+    For blActgActgA it would be::
+
+        blAct | gActg | A -> b | lActg | ActgA
+
+    """
+    return len(word) - sliding_window_length * 2 + 1
+
+
+def add_brackets_around_string(word: str):
+    """Adds square brackets for single character strings and round the rest.
+    """
+    if len(word) == 1 or (len(word) == 2 and word.startswith('\\')):
+        return word
+
+    return '(?:' + word + ')'
+
+
+def sliding_window_compress(word, sliding_window_len=None):
+    """
+    This function uses sliding window of decreasing size to find repeated,
+    non-overlapping and adjacent sub-strings.
+
+    Example::
+
+        BLACTGACTGA contains BL - 2x ACTG - A or BLA - 2x CTGA
+
+    Note that the sub-string can be repeated more than 2x, so the function remembers
+    first window and then next window, that can be repeated 1+ times, while
+    counting the repetitions.
+
+    The function also applies itself on the longest discovered sub-string
+    recursively. So it discovers shorter sub-strings in sub-strings.
+
+    :param word: Input string.
+    :param sliding_window_len: Initial window size. Used by recursion. Do not set this
+        yourself.
+    :return: Compressed string.
+    """
+    if sliding_window_len is None:
+        sliding_window_len = len(word) // 2
+
+    if sliding_window_len <= 0 or len(word) <= 1:
+        return word  # don't compress these
+
+    stop_index = get_stop_index(word, sliding_window_len)
+    i = 0
+    compression_observed = False
+
+    while i < stop_index:
+        next_window_start = i + sliding_window_len  # there can be more than 2 windows
+        first_window = word[i:next_window_start]
+        repeat_count = 0
+
+        while True:  # Repeat next windows until non-matching found
+            next_window_end = next_window_start + sliding_window_len
+
+            if next_window_end >= len(word) + 1:
+                break  # next window overflows the string -> stop
+
+            next_window = word[next_window_start:next_window_end]
+
+            if first_window != next_window:
+                break
+
+            repeat_count += 1
+            next_window_start = next_window_end
+
+        if repeat_count > 0:
+            compression_observed = True
+            prefix = word[:i]
+
+            repeated_block_len_end = i + sliding_window_len * (repeat_count + 1)
+            suffix = word[repeated_block_len_end:]
+
+            center = add_brackets_around_string(sliding_window_compress(first_window))
+
+            new_word = prefix + center + '{' + str(repeat_count + 1) + '}'
+            i = len(new_word) - 1  # skip the compressed part, investigate only the rest
+            new_word += suffix
+            word = new_word
+            stop_index = get_stop_index(word, sliding_window_len)
+
+        i += 1
+
+    if compression_observed:
+        return word
+
+    return sliding_window_compress(word, sliding_window_len - 1)
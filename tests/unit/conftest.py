@@ -0,0 +1,5 @@
+import sys
+
+# syntax and protocol of asynchronous iteration, see w2re/__init__.py
+# pylint: disable=invalid-name; name required by pytest
+collect_ignore = [] if sys.version_info >= (3, 5, 2) else ['test_aio.py']
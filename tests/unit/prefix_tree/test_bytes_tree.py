@@ -0,0 +1,78 @@
+import re
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from w2re.formatters import (
+    PythonBytesFormatter,
+    PythonFormatter,
+    PythonWordMatchFormatter,
+)
+from w2re.prefix_tree.bytes_tree import (
+    BytesPrefixTree,
+    BytesRegexpEmitter,
+)
+from w2re.prefix_tree.tree import PrefixTree
+
+
+class BytesPrefixTreeTest(TestCase):
+    WORDS = st.lists(st.binary(min_size=1, max_size=4), max_size=20)
+
+    @given(WORDS, st.binary(min_size=1, max_size=4))
+    def test_it_matches_only_added_words(self, words, string):
+        regexp = re.compile(BytesPrefixTree(words).to_regexp())
+
+        for probe in words + [string] + [bytes([value]) for value in range(256)]:
+            self.assertEqual(
+                probe in words, bool(regexp.fullmatch(probe)), msg=regexp.pattern
+            )
+
+    @given(st.lists(st.text(alphabet='ab-]\\^é', min_size=1, max_size=4), max_size=20))
+    def test_it_converts_like_latin_1_text(self, words):
+        self.assertEqual(
+            PrefixTree(words).to_regexp(PythonFormatter).encode('latin-1'),
+            BytesPrefixTree(word.encode('latin-1') for word in words).to_regexp()
+        )
+
+    def test_it_sets_bytes_of_any_value(self):
+        words = [b'\x00', b'\x01', b'\x02', b']', b'\\', b'^', b'\xff']
+
+        self.assertEqual(b'[\x00\x01\x02\\\\-\\^\xff]', BytesPrefixTree(words).to_regexp())
+
+    def test_it_accepts_other_formatters(self):
+        self.assertEqual(
+            r'(?:\W+|\A)(i[ns])(?=\W+|\Z)',
+            BytesPrefixTree([b'is', b'in']).to_regexp(PythonWordMatchFormatter)
+        )
+
+    def test_it_matches_empty_string_without_words(self):
+        self.assertEqual(b'\\A\\Z', BytesPrefixTree().to_regexp())
+
+    def test_it_updates_cached_regexp(self):
+        tree = BytesPrefixTree([b'is', b'in', b'it'], cache_regexp=True)
+        tree.to_regexp()
+        tree.add(b'if')
+        tree.remove(b'in')
+
+        self.assertEqual(b'i[fst]', tree.to_regexp())
+
+    def test_it_adds_sorted_words(self):
+        tree = BytesPrefixTree()
+        tree.extend_sorted([b'', b'if', b'in', b'in', b'than', b'the'])
+
+        self.assertEqual(b'(?:i[fn]|th(?:e|an))', tree.to_regexp(PythonBytesFormatter))
+
+    def test_it_orders_alternatives_by_weight(self):
+        tree = BytesPrefixTree()
+        tree.add(b'is', 1)
+        tree.add(b'than', 2)
+
+        self.assertEqual(
+            b'(?:than|is)', tree.to_regexp(emitter=BytesRegexpEmitter(weighted=True))
+        )
+
+    def test_it_can_not_be_saved(self):
+        self.assertFalse(hasattr(BytesPrefixTree([b'is']), 'save'))
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from hypothesis import given
+
+from tests.helpers.hypothesis import (
+    NON_EMPTY_TEXT_ITERABLES,
+    SPECIAL_CHARACTER_STRINGS,
+)
+from tests.unit.prefix_tree.test_tree import assert_strings_can_be_matched
+from w2re.formatters import PythonFormatter
+from w2re.prefix_tree.compact import (
+    CompactPrefixTree,
+    IndexedPrefixTree,
+)
+from w2re.prefix_tree.tree import PrefixTree
+
+
+class CompactPrefixTreeTest(TestCase):
+    def test_correctly_encodes_strings_with_special_characters(self):
+        for input_string, expected_regexp in SPECIAL_CHARACTER_STRINGS.items():
+            with self.subTest(input_string=input_string):
+                tree = CompactPrefixTree([input_string])
+                self.assertEqual(expected_regexp, tree.to_regexp(PythonFormatter))
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_accepts_individual_strings(self, expected_strings):
+        tree = CompactPrefixTree()
+
+        for string in expected_strings:
+            tree.add(string)
+
+        assert_strings_can_be_matched(
+            self, tree.to_regexp(PythonFormatter), expected_strings
+        )
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_produces_the_same_output_as_prefix_tree(self, strings):
+        # longer words with common prefixes and characters outside of BMP
+        words = [string * length + '\U0001F600' * (length % 3)
+                 for length, string in enumerate(strings)]
+        words += [word[:len(word) // 2] for word in words]
+
+        self.assertEqual(
+            PrefixTree(words).to_regexp(PythonFormatter),
+            CompactPrefixTree(words).to_regexp(PythonFormatter)
+        )
+
+    def test_it_shares_labels_of_split_edges(self):
+        tree = CompactPrefixTree(['abcd', 'ab', 'abxy'])
+
+        self.assertEqual(b'abcdxy', bytes(tree._labels))
+        self.assertEqual('ab(?:cd|xy)?', tree.to_regexp(PythonFormatter))
+
+    def test_it_widens_labels_for_letters_outside_of_latin_1(self):
+        tree = CompactPrefixTree(['caf\xe9s', 'caf\xe9'])
+        tree.add('caf\u20ac')
+
+        self.assertEqual(
+            'caf\xe9s\u20ac'.encode('utf-32-le'),
+            bytes(tree._labels)
+        )
+        self.assertEqual('caf(?:\u20ac|\xe9s?)', tree.to_regexp(PythonFormatter))
+
+    def test_it_ignores_empty_strings(self):
+        self.assertEqual(
+            PythonFormatter._EMPTY_STRING_MATCH,
+            CompactPrefixTree(['']).to_regexp(PythonFormatter)
+        )
+
+
+class IndexedPrefixTreeTest(TestCase):
+    def test_it_must_be_read_by_subclasses(self):
+        tree = IndexedPrefixTree()
+
+        with self.assertRaises(NotImplementedError):
+            tree.edges(0)
+
+        with self.assertRaises(NotImplementedError):
+            tree.is_terminal(0)
@@ -0,0 +1,96 @@
+import sys
+from unittest import TestCase
+
+from hypothesis import given
+
+from tests.helpers.hypothesis import (
+    LISTS_OF_WORDS,
+    NON_EMPTY_TEXT_ITERABLES,
+)
+from tests.unit.prefix_tree.test_primitives import build_chain
+from w2re.formatters import PythonFormatter
+from w2re.prefix_tree.emitter import (
+    CacheStats,
+    RegexpEmitter,
+    escape_label,
+    fragment_length,
+    join_fragments,
+    label_cache_stats,
+)
+from w2re.prefix_tree.tree import PrefixTree
+
+
+class JoinFragments(TestCase):
+    def test_it_returns_strings_unchanged(self):
+        self.assertEqual('abc', join_fragments('abc'))
+
+    def test_it_joins_nested_fragments_in_order(self):
+        self.assertEqual(
+            '(?:ab|c(?:de)?)',
+            join_fragments(['(?:', ['ab', '|', ['c', ['(?:', 'de', ')?']]], ')'])
+        )
+
+class FragmentLength(TestCase):
+    def test_it_measures_nested_fragments(self):
+        fragment = ['(?:', ['ab', '|', ['c', ['(?:', 'de', ')?']]], ')']
+
+        self.assertEqual(len(join_fragments(fragment)), fragment_length(fragment))
+        self.assertEqual(3, fragment_length('abc'))
+
+class SharedSubtrees(TestCase):
+    @staticmethod
+    def emit(words, share_subtrees):
+        return RegexpEmitter(share_subtrees).emit(PrefixTree(words)._root_node)
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_produces_the_same_output_for_strings(self, strings):
+        words = [prefix + suffix for prefix in strings for suffix in ('', 'ab', 'ac')]
+        self.assertEqual(self.emit(words, False), self.emit(words, True))
+
+    @given(LISTS_OF_WORDS)
+    def test_produces_the_same_output_for_words(self, words):
+        self.assertEqual(self.emit(words, False), self.emit(words, True))
+
+    def test_it_counts_shared_subtrees(self):
+        emitter = RegexpEmitter(share_subtrees=True)
+        tree = PrefixTree(['ax', 'axs', 'bx', 'bxs', 'cx'])
+
+        self.assertEqual('(?:axs?|bxs?|cx)', tree.to_regexp(PythonFormatter, emitter))
+        # root and the node after 'ax' are new, the node after 'bx' is shared
+        self.assertEqual(1, emitter.subtree_stats.hits)
+        self.assertEqual(2, emitter.subtree_stats.misses)
+
+    def test_it_refuses_to_cache_shared_subtrees(self):
+        with self.assertRaises(ValueError):
+            RegexpEmitter(share_subtrees=True, cache_fragments=True)
+
+    def test_it_serializes_trees_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 10
+        emitter = RegexpEmitter(share_subtrees=True)
+
+        self.assertEqual(
+            build_chain(depth).to_regexp(),
+            emitter.emit(build_chain(depth))
+        )
+
+class LabelCache(TestCase):
+    def test_it_caches_escaped_labels(self):
+        escape_label.cache_clear()
+
+        for _ in range(3):
+            self.assertEqual(r'a\.{3}', escape_label('a...'))
+
+        stats = label_cache_stats()
+        self.assertEqual((2, 1), (stats.hits, stats.misses))
+
+class CacheStatsTest(TestCase):
+    def test_it_calculates_hit_rate(self):
+        self.assertEqual(0.75, CacheStats(3, 1).hit_rate)
+
+    def test_hit_rate_without_lookups_is_zero(self):
+        self.assertEqual(0.0, CacheStats().hit_rate)
+
+    def test_it_shows_hits_misses_and_hit_rate(self):
+        self.assertEqual(
+            'CacheStats(hits=3, misses=1, hit_rate=75.00%)', repr(CacheStats(3, 1))
+        )
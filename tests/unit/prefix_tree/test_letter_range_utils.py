@@ -38,6 +38,7 @@ class CollapseLettersIntoRangesTest(TestCase):
             '[]': [r'\[', r'\]'],
             '][': [r'\[', r'\]'],
             '\\': ['\\\\'],
+            '^_': ['\\^', '_'],
         }
 
         for input_string, expected_output in samples.items():
@@ -54,3 +55,27 @@ class CollapseLettersIntoRangesTest(TestCase):
         for input_letters in samples:
             with self.subTest(input_letters=input_letters):
                 self.assert_collapses_letters_into(input_letters, input_letters)
+
+    def test_special_characters_after_range_are_escaped(self):
+        self.assert_collapses_letters_into(['A', 'B', '\\', 'c'], ['A', 'B', '\\\\', 'c'])
+
+    def test_special_characters_ending_range_are_escaped(self):
+        self.assert_collapses_letters_into(['Y', 'Z', '[', '\\'], ['Y-\\\\'])
+
+    def test_non_alphanumeric_are_collapsed_if_shorter(self):
+        self.assert_collapses_letters_into(['$', '#', '"', '!'], ['!-$'])
+
+    def test_non_alphanumeric_are_collapsed_with_alphanumeric(self):
+        self.assert_collapses_letters_into(['1', '0', '/'], ['/-1'])
+
+    def test_escaped_non_alphanumeric_are_collapsed(self):
+        self.assert_collapses_letters_into(['^', ']', '\\', '['], ['\\[-\\^'])
+
+    def test_hyphen_is_not_collapsed(self):
+        self.assert_collapses_letters_into(['.', '-', ','], ['-', ',', '.'])
+
+    def test_wide_alphabet_is_collapsed(self):
+        letters = [chr(code) for code in range(0x4e00, 0xa000) if code != 0x4f00]
+        self.assert_collapses_letters_into(
+            letters, [chr(0x4e00) + '-' + chr(0x4eff), chr(0x4f01) + '-' + chr(0x9fff)]
+        )
@@ -0,0 +1,71 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from tests.helpers.hypothesis import NON_EMPTY_TEXT_ITERABLES
+from w2re.formatters import PythonFormatter
+from w2re.prefix_tree.mapped import MappedPrefixTree
+from w2re.prefix_tree.tree import PrefixTree
+
+
+class MappedPrefixTreeTest(TestCase):
+    def setUp(self):
+        temporary_directory = TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self._path = os.path.join(temporary_directory.name, 'tree')
+
+    def _saved(self, tree: PrefixTree) -> MappedPrefixTree:
+        tree.save(self._path)
+        mapped_tree = PrefixTree.load(self._path)
+        self.addCleanup(mapped_tree.close)
+        return mapped_tree
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_produces_the_same_output_as_saved_tree(self, strings):
+        # characters outside of Latin-1 and BMP
+        words = [string + '€\U0001F600' * (length % 2)
+                 for length, string in enumerate(strings)]
+        words += [word[:len(word) // 2] for word in words]
+        tree = PrefixTree(words)
+
+        with self._saved(tree) as mapped_tree:
+            self.assertEqual(
+                tree.to_regexp(PythonFormatter), mapped_tree.to_regexp(PythonFormatter)
+            )
+
+    @given(st.lists(st.text(alphabet='ab\xe9', min_size=1, max_size=4), max_size=20),
+           st.lists(st.text(alphabet='ab\xe9€', max_size=5), max_size=20))
+    def test_it_contains_only_saved_words(self, words, other_words):
+        with self._saved(PrefixTree(words)) as mapped_tree:
+            for word in words + other_words:
+                self.assertEqual(word in words, word in mapped_tree, msg=word)
+
+    def test_it_saves_empty_tree(self):
+        with self._saved(PrefixTree()) as mapped_tree:
+            self.assertEqual(
+                PythonFormatter._EMPTY_STRING_MATCH, mapped_tree.to_regexp(PythonFormatter)
+            )
+            self.assertNotIn('', mapped_tree)
+
+    def test_it_refuses_other_files(self):
+        for content in (b'', b'W2RE', b'x' * 100):
+            with self.subTest(content=content):
+                with open(self._path, 'wb') as output_file:
+                    output_file.write(content)
+
+                with self.assertRaises(ValueError):
+                    PrefixTree.load(self._path)
+
+    def test_it_refuses_truncated_files(self):
+        PrefixTree(['abc', 'abd', 'x']).save(self._path)
+
+        with open(self._path, 'r+b') as output_file:
+            output_file.truncate(os.path.getsize(self._path) - 1)
+
+        with self.assertRaises(ValueError):
+            PrefixTree.load(self._path)
@@ -0,0 +1,122 @@
+import re
+from unittest import TestCase
+
+from hypothesis import given
+from hypothesis.strategies import (
+    lists,
+    sets,
+    text,
+)
+
+from tests.helpers.hypothesis import LISTS_OF_WORDS
+from w2re.formatters import PythonFormatter
+from w2re.prefix_tree.optimizer import (
+    CostModel,
+    MatchStepsCost,
+    OptimizingEmitter,
+    PatternLengthCost,
+)
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.tree import PrefixTree
+
+SHORT_WORDS = sets(text(alphabet='abc.', min_size=1, max_size=6), min_size=1, max_size=12)
+
+
+class QuestionMarkCost(PatternLengthCost):  # pylint: disable=too-few-public-methods
+    def cost(self, regexp: str) -> float:
+        return super().cost(regexp) + 10 * (regexp.count('?') - regexp.count('(?'))
+
+
+class MatchStepsCostTest(TestCase):
+    def test_it_counts_letters_and_sets(self):
+        self.assertEqual(3, MatchStepsCost().cost(r'a\.[bc]'))
+
+    def test_it_counts_alternatives_after_the_first_one(self):
+        self.assertEqual(5, MatchStepsCost().cost('(?:ab|cd)'))
+
+    def test_it_multiplies_repeated_letters_and_groups(self):
+        self.assertEqual(4, MatchStepsCost().cost('a{4}'))
+        self.assertEqual(5, MatchStepsCost().cost('(?:ab){2}c'))
+
+    def test_it_ignores_optional_quantifiers(self):
+        self.assertEqual(2, MatchStepsCost().cost('[ab]c?'))
+
+
+class OptimizingEmitterTest(TestCase):
+    @staticmethod
+    def emit(words, emitter):
+        return PrefixTree(words).to_regexp(PythonFormatter, emitter)
+
+    def test_it_factors_out_common_sub_trees(self):
+        emitter = OptimizingEmitter()
+        words = ['walked', 'walking', 'talked', 'talking']
+
+        self.assertEqual('[tw]alk(?:ed|ing)', self.emit(words, emitter))
+        self.assertEqual(16, emitter.saved_bytes)
+
+    def test_it_merges_single_letters_followed_by_the_same_ending(self):
+        self.assertEqual(
+            '(?:[xy]|[acd]b)', self.emit(['ab', 'cb', 'db', 'x', 'y'], OptimizingEmitter())
+        )
+
+    def test_it_keeps_alternatives_if_factoring_is_longer(self):
+        emitter = OptimizingEmitter()
+
+        self.assertEqual('(?:ab|cb|xyz)', self.emit(['ab', 'cb', 'xyz'], emitter))
+        self.assertEqual(0, emitter.saved_bytes)
+
+    def test_it_keeps_alternatives_if_factoring_by_last_letters_is_no_shorter(self):
+        emitter = OptimizingEmitter()
+
+        # '[pq]a|[rs]b' is as long as 'pa|qa|rb|sb'
+        self.assertEqual('(?:pa|qa|rb|sb)', self.emit(['pa', 'qa', 'rb', 'sb'], emitter))
+        self.assertEqual(0, emitter.saved_bytes)
+
+    def test_the_cost_model_decides(self):
+        words = ['aaaab', 'bbbbb']
+
+        self.assertEqual('(?:a{4}b|b{5})', self.emit(words, OptimizingEmitter()))
+        self.assertEqual(
+            '(?:a{4}|b{4})b', self.emit(words, OptimizingEmitter(MatchStepsCost()))
+        )
+
+    def test_it_chooses_empty_alternative_if_cheaper(self):
+        emitter = OptimizingEmitter(QuestionMarkCost())
+
+        self.assertEqual('ab(?:c|)', self.emit(['ab', 'abc'], emitter))
+        self.assertEqual(-4, emitter.saved_bytes)
+
+    def test_it_does_not_factor_the_root_of_atomic_regular_expressions(self):
+        emitter = OptimizingEmitter(atomic=True)
+
+        self.assertEqual(
+            '(?:walk(?>ed|ing)|talk(?>ed|ing))',
+            emitter.emit(PrefixTree(['walked', 'walking', 'talked', 'talking'])._root_node)
+        )
+
+    @given(SHORT_WORDS, lists(text(alphabet='abc.', max_size=7), max_size=20))
+    def test_it_matches_the_same_strings(self, words, probes):
+        expected = self.emit(words, RegexpEmitter(share_subtrees=True))
+
+        for cost_model in (PatternLengthCost(), MatchStepsCost(), QuestionMarkCost()):
+            regexp = self.emit(words, OptimizingEmitter(cost_model))
+
+            for string in list(words) + probes:
+                self.assertEqual(
+                    bool(re.fullmatch(expected, string)),
+                    bool(re.fullmatch(regexp, string)),
+                    (regexp, string)
+                )
+
+    @given(LISTS_OF_WORDS)
+    def test_it_reports_saved_bytes(self, words):
+        expected = self.emit(words, RegexpEmitter(share_subtrees=True))
+        emitter = OptimizingEmitter()
+        regexp = self.emit(words, emitter)
+
+        self.assertLessEqual(len(regexp), len(expected))
+        self.assertEqual(len(expected) - len(regexp), emitter.saved_bytes)
+
+    def test_cost_model_is_abstract(self):
+        with self.assertRaises(NotImplementedError):
+            CostModel().cost('a')
@@ -1,25 +1,109 @@
+import re
+import sys
 from unittest import TestCase
 
+from hypothesis import given
+from hypothesis.strategies import (
+    integers,
+    text,
+)
+
+from w2re.formatters import PythonFormatter
 from w2re.prefix_tree.primitives import (
-    compress,
+    PrefixTreeNode,
+    PrerenderedNode,
+    RegexpNode,
+    common_length,
 )
+from w2re.prefix_tree.tree import PrefixTree
+
+
+class CommonLength(TestCase):
+    @given(text(alphabet='ab', min_size=1), text(alphabet='ab'), integers(0, 3))
+    def test_it_finds_length_of_common_prefix(self, label, suffix, start):
+        word = 'x' * start + label[0] + suffix
+        expected_length = 0
+
+        while expected_length < min(len(label), len(word) - start) \
+                and label[expected_length] == word[start + expected_length]:
+            expected_length += 1
+
+        self.assertEqual(expected_length, common_length(label, word, start))
+
+    def test_it_compares_long_labels_by_binary_search(self):
+        label = 'a' * 1000 + 'b'
+
+        self.assertEqual(1000, common_length(label, 'x' + 'a' * 1000 + 'c', 1))
+        self.assertEqual(1001, common_length(label, label * 2, 0))
+        self.assertEqual(999, common_length(label, 'a' * 999, 0))
+        self.assertEqual(500, common_length(label, 'a' * 500 + 'b' * 500, 0))
+
+
+class PrefixTreeNodeAdd(TestCase):
+    def test_it_adds_words_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        tree = PrefixTree('a' * length for length in range(1, depth + 1))
+        tree.add('a' * depth + 'b')
+        tree.add('a' * (depth // 2) + 'c')
+
+        self.assertIn('a' * depth + 'b', tree)
+        self.assertIn('a' * (depth // 2) + 'c', tree)
+        self.assertNotIn('a' * (depth // 2) + 'b', tree)
+        root = tree._root_node
+        self.assertEqual(depth + 2, root.weight)
+
+    def test_it_skips_start_of_word(self):
+        root = PrefixTreeNode()
+        root.add('abc')
+        root.add('xyzabd', start=3)
+        root.add('xyzab', start=3)
+
+        self.assertEqual('ab[cd]?', root.to_regexp())
+        self.assertEqual(3, root.weight)
+
+def build_chain(depth: int) -> PrefixTreeNode:
+    """Builds a tree of words 'a', 'aa', 'aaa', ... without recursion."""
+    node = PrefixTreeNode(True)
+
+    for _ in range(depth - 1):
+        parent = PrefixTreeNode(True)
+        parent.add('a', node)
+        node = parent
+
+    root = PrefixTreeNode()
+    root.add('a', node)
+    return root
+
+
+class PrefixTreeNodeToRegexp(TestCase):
+    def test_it_serializes_trees_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 100
+        regexp = build_chain(depth).to_regexp()
+
+        self.assertEqual('a' + '(?:a' * (depth - 2) + 'a?' + ')?' * (depth - 2), regexp)
+
+    def test_it_serializes_edges(self):
+        root = PrefixTreeNode()
+        root.add('abc')
+        root.add('abd')
+        root.add('ab')
+
+        edge = root._edges['a']
+        self.assertEqual('ab[cd]?', edge.to_regexp())
+        self.assertTrue(re.fullmatch(edge.to_regexp(), 'abd'))
+
+
+    def test_it_serializes_alternatives_longer_than_joined_fragments(self):
+        label = ''.join(chr(0x100 + index) for index in range(300))  # no repetitions
+        root = PrefixTree(['b', 'a' + label + 'x', 'a' + label + 'y'])._root_node
+
+        self.assertEqual('(?:b|a' + label + '[xy])', root.to_regexp())
+        self.assertEqual('(?:a' + label + '[xy]|b)', root.to_regexp(atomic=True))
 
+class RegexpNodeTest(TestCase):
+    def test_it_must_be_serialized_by_subclasses(self):
+        with self.assertRaises(NotImplementedError):
+            PythonFormatter.wrap_regexp(RegexpNode())
 
-class Compress(TestCase):
-    def test_compresses_strings_correctly(self):
-        samples = [
-            ['bactactgactactb', 'b(?:act){2}g(?:act){2}b', 'multiple repetitions'],
-            ['abxbxaabxbxa', '(?:a(?:bx){2}a){2}', 'nested repetition'],
-            ['blact', 'blact', 'no compression possible'],
-            ['blactgactga', 'bl(?:actg){2}a', '2 overlapping substrings'],
-            ['blactgactgactga', 'bl(?:actg){3}a', '3 overlapping substrings'],
-            # TODO(Radek): optimize to a{7}
-            ['aaaaaaa', '(?:a{3}){2}a', 'single letter 7 times'],
-            # TODO(Radek): optimize to (?:\\ª){8}
-            ['\\ª\\ª\\ª\\ª\\ª\\ª\\ª\\ª', '(?:(?:\\ª{2}){2}){2}', 'escaped string'],
-            ['ctaact', 'cta{2}ct', "don't compress non-adjacent blocks"],
-        ]
-
-        for string, expected_regexp, name in samples:
-            with self.subTest(string=string, test=name):
-                self.assertEqual(expected_regexp, compress(string))
+    def test_formatters_accept_prerendered_nodes(self):
+        self.assertEqual('i[ns]', PythonFormatter.wrap_regexp(PrerenderedNode('i[ns]')))
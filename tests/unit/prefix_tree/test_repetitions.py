@@ -0,0 +1,116 @@
+import re
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from tests.helpers.sliding_window import sliding_window_compress
+from w2re.prefix_tree.repetitions import (
+    _find_runs_by_scanning,
+    compress,
+    find_runs,
+    split_escaped,
+)
+
+REPETITIVE_STRINGS = st.text(alphabet='ab.', max_size=40)
+
+STRINGS_WITHOUT_BACKSLASH = st.text(
+    alphabet=st.characters(blacklist_characters='\\'), max_size=20
+)
+
+
+class Compress(TestCase):
+    def test_compresses_strings_correctly(self):
+        samples = [
+            ['bactactgactactb', 'b(?:act){2}g(?:act){2}b', 'multiple repetitions'],
+            ['abxbxaabxbxa', '(?:a(?:bx){2}a){2}', 'nested repetition'],
+            ['blact', 'blact', 'no compression possible'],
+            ['blactgactga', 'bl(?:actg){2}a', '2 overlapping substrings'],
+            ['blactgactgactga', 'bl(?:actg){3}a', '3 overlapping substrings'],
+            ['aaaaaaa', 'a{7}', 'single letter 7 times'],
+            ['\\ª\\ª\\ª\\ª\\ª\\ª\\ª\\ª', '\\ª{8}', 'escaped string'],
+            ['ctaact', 'cta{2}ct', "don't compress non-adjacent blocks"],
+            ['abababab', '(?:ab){4}', 'shortest period'],
+            ['\\\\\\\\\\\\', '\\\\{3}', 'escaped backslashes'],
+        ]
+
+        for string, expected_regexp, name in samples:
+            with self.subTest(string=string, test=name):
+                self.assertEqual(expected_regexp, compress(string))
+
+    def test_it_compresses_long_strings(self):
+        self.assertEqual('(?:abc){10000}', compress('abc' * 10000))
+
+    @given(st.one_of(REPETITIVE_STRINGS, STRINGS_WITHOUT_BACKSLASH))
+    def test_it_matches_the_same_string_as_sliding_window_compression(self, string):
+        escaped = re.escape(string)
+        expected_regexp = sliding_window_compress(escaped)
+        regexp = compress(escaped)
+
+        self.assertTrue(re.fullmatch(expected_regexp, string))
+        self.assertTrue(
+            re.fullmatch(regexp, string),
+            msg="Regexp: {}\nExpected regexp: {}".format(regexp, expected_regexp)
+        )
+
+    @given(st.text(max_size=20))
+    def test_it_keeps_escape_sequences_together(self, string):
+        self.assertTrue(re.fullmatch(compress(re.escape(string * 3)), string * 3))
+
+
+class FindRuns(TestCase):
+    @staticmethod
+    def find_runs_naively(sequence):
+        """Checks every sub-sequence: a run repeats its smallest period at
+        least twice and can't be extended by a letter repeating the period.
+        """
+        runs = []
+
+        for start in range(len(sequence)):
+            for end in range(start + 2, len(sequence) + 1):
+                period = next(
+                    period for period in range(1, end - start + 1)
+                    if sequence[start:end - period] == sequence[start + period:end]
+                )
+
+                extends_left = start > 0 and \
+                    sequence[start - 1] == sequence[start - 1 + period]
+                extends_right = end < len(sequence) and \
+                    sequence[end] == sequence[end - period]
+
+                if end - start >= 2 * period and not extends_left and not extends_right:
+                    runs.append((start, end, period))
+
+        return runs
+
+    def test_it_finds_runs(self):
+        self.assertEqual(
+            [(0, 3, 1), (2, 8, 3), (3, 5, 1), (6, 8, 1)],
+            find_runs([0, 0, 0, 1, 1, 0, 1, 1])
+        )
+
+    def test_it_finds_runs_starting_less_than_a_period_before_the_middle(self):
+        # longer than scanned sequences, the run starts at 19 and the middle is 20
+        sequence = list(range(10, 29)) + [0, 1, 2] * 7
+
+        self.assertEqual([(19, 40, 3)], find_runs(sequence))
+        self.assertEqual(_find_runs_by_scanning(sequence), find_runs(sequence))
+
+    def test_it_finds_no_runs_in_short_sequences(self):
+        self.assertEqual([], find_runs([]))
+        self.assertEqual([], find_runs([0]))
+
+    @given(st.lists(st.integers(min_value=0, max_value=2), max_size=80))
+    def test_it_finds_all_runs(self, sequence):
+        self.assertEqual(self.find_runs_naively(sequence), find_runs(sequence))
+
+    @given(st.lists(st.integers(min_value=0, max_value=2), max_size=32))
+    def test_scanning_finds_all_runs(self, sequence):
+        self.assertEqual(self.find_runs_naively(sequence), _find_runs_by_scanning(sequence))
+
+
+class SplitEscaped(TestCase):
+    def test_it_keeps_escape_sequences_together(self):
+        self.assertEqual(['a', '\\.', '\\\\', 'b'], split_escaped('a\\.\\\\b'))
@@ -1,9 +1,11 @@
 import re
+from itertools import product
 from typing import Iterable
 from unittest import TestCase
 
 from hypothesis import (
     given,
+    strategies as st,
 )
 
 from tests.helpers.hypothesis import (
@@ -11,7 +13,11 @@ from tests.helpers.hypothesis import (
     SPECIAL_CHARACTER_STRINGS,
 )
 from w2re.formatters import PythonFormatter
-from w2re.prefix_tree.tree import PrefixTree
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.tree import (
+    PrefixTree,
+    common_prefix_length,
+)
 
 
 def assert_strings_can_be_matched(
@@ -69,3 +75,257 @@ class PrefixTreeTest(TestCase):
         self.assertEqual(
             PythonFormatter._EMPTY_STRING_MATCH, tree.to_regexp(PythonFormatter)
         )
+
+
+class CommonPrefixLength(TestCase):
+    @given(st.text(), st.text(), st.text())
+    def test_it_finds_the_longest_common_prefix(self, prefix, first, second):
+        first, second = prefix + first, prefix + second
+        expected_length = 0
+
+        while expected_length < min(len(first), len(second)) and \
+                first[expected_length] == second[expected_length]:
+            expected_length += 1
+
+        self.assertEqual(expected_length, common_prefix_length(first, second))
+
+
+class ExtendSorted(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', max_size=6), max_size=30)
+
+    @given(WORDS, WORDS)
+    def test_produces_the_same_output_as_extend(self, initial_words, words):
+        expected_tree = PrefixTree(initial_words)
+        expected_tree.extend(sorted(words))
+        tree = PrefixTree(initial_words)
+        tree.extend_sorted(sorted(words))
+
+        self.assertEqual(
+            expected_tree.to_regexp(PythonFormatter), tree.to_regexp(PythonFormatter)
+        )
+
+    @given(WORDS)
+    def test_it_adds_unsorted_words_if_not_strict(self, words):
+        tree = PrefixTree()
+        tree.extend_sorted(words, strict=False)
+
+        self.assertEqual(
+            PrefixTree(words).to_regexp(PythonFormatter), tree.to_regexp(PythonFormatter)
+        )
+
+    def test_it_refuses_unsorted_words_if_strict(self):
+        for words in (['b', 'a'], ['ab', 'a'], ['abc', 'abd', 'abc']):
+            with self.subTest(words=words):
+                with self.assertRaises(ValueError):
+                    PrefixTree().extend_sorted(words)
+
+    def test_it_ignores_empty_and_repeated_strings(self):
+        tree = PrefixTree()
+        tree.extend_sorted(['', 'a', 'a', 'ab', 'ab'])
+        self.assertEqual('ab?', tree.to_regexp(PythonFormatter))
+
+
+def all_strings(alphabet: str, max_length: int) -> Iterable[str]:
+    for length in range(1, max_length + 1):
+        for characters in product(alphabet, repeat=length):
+            yield ''.join(characters)
+
+
+class CachedRegexp(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', min_size=1, max_size=5), max_size=20)
+
+    @given(WORDS, WORDS, WORDS)
+    def test_it_serializes_changed_tree_correctly(self, words, added_words, sorted_words):
+        tree = PrefixTree(words, cache_regexp=True)
+        tree.to_regexp(PythonFormatter)
+        tree.extend(added_words)
+        tree.to_regexp(PythonFormatter)
+        tree.extend_sorted(sorted(sorted_words), strict=False)
+
+        self.assertEqual(
+            tree.to_regexp(PythonFormatter, RegexpEmitter()),
+            tree.to_regexp(PythonFormatter)
+        )
+
+    def test_it_serializes_only_changed_sub_trees(self):
+        combined_nodes = []
+
+        class CountingEmitter(RegexpEmitter):
+            def combine(self, sub_fragments, terminal):
+                combined_nodes.append(sub_fragments)
+                return super().combine(sub_fragments, terminal)
+
+        tree = PrefixTree(['abcd', 'abce', 'xyzv', 'xyzw'])
+        emitter = CountingEmitter(cache_fragments=True)
+        tree.to_regexp(PythonFormatter, emitter)
+        del combined_nodes[:]
+
+        tree.add('abcf')
+        self.assertEqual('(?:abc[d-f]|xyz[vw])', tree.to_regexp(PythonFormatter, emitter))
+        # node after 'abc' and the root
+        self.assertEqual(2, len(combined_nodes))
+
+
+class Remove(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', min_size=1, max_size=4), max_size=20)
+
+    @given(WORDS, st.data())
+    def test_it_matches_only_remaining_words(self, words, data):
+        tree = PrefixTree(words, cache_regexp=True)
+        tree.to_regexp(PythonFormatter)
+        removed_words = data.draw(
+            st.sets(st.sampled_from(words)) if words else st.just(set())
+        )
+
+        for word in removed_words:
+            tree.remove(word)
+
+        regexp = re.compile(tree.to_regexp(PythonFormatter))
+
+        self.assertEqual(
+            set(words) - removed_words,
+            {string for string in all_strings('abc', 4) if regexp.fullmatch(string)},
+            msg=regexp.pattern
+        )
+
+    def test_it_merges_edges(self):
+        tree = PrefixTree(['ab', 'abc', 'abd'])
+        tree.remove('abd')
+        tree.remove('ab')
+
+        edges = tree._root_node._edges
+
+        self.assertEqual('abc', tree.to_regexp(PythonFormatter))
+        self.assertEqual(['abc'], [edge._label for edge in edges.values()])
+
+    def test_it_refuses_missing_words(self):
+        tree = PrefixTree(['abc'])
+
+        for word in ('', 'a', 'abcd', 'x'):
+            with self.subTest(word=word):
+                with self.assertRaises(KeyError):
+                    tree.remove(word)
+
+
+class Queries(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', min_size=1, max_size=4), max_size=20)
+
+    @given(WORDS)
+    def test_it_contains_only_added_words(self, words):
+        tree = PrefixTree(words)
+        strings = [''] + list(all_strings('abcd', 4))
+
+        self.assertEqual([string in words for string in strings],
+                         tree.contains_many(strings))
+
+    @given(WORDS, st.text(alphabet='abcd', max_size=6))
+    def test_it_finds_words_starting_text(self, words, text):
+        tree = PrefixTree(words)
+        prefixes = [word for word in words if text.startswith(word)]
+
+        self.assertEqual(bool(prefixes), tree.has_prefix(text))
+        self.assertEqual(
+            max(prefixes, key=len) if prefixes else None, tree.longest_prefix_match(text)
+        )
+
+    def test_it_matches_words_ending_inside_of_labels(self):
+        tree = PrefixTree(['abcd', 'ab'])
+
+        self.assertNotIn('abc', tree)
+        self.assertEqual('ab', tree.longest_prefix_match('abce'))
+        self.assertEqual('abcd', tree.longest_prefix_match('abcde'))
+        self.assertFalse(tree.has_prefix('a'))
+
+
+def subtree_weights(tree: PrefixTree) -> dict:
+    """:return: Weights of nodes by their paths from the root."""
+    weights = {}
+    stack = [('', tree._root_node)]
+
+    while stack:
+        path, node = stack.pop()
+        weights[path] = node.weight
+
+        for edge in (node._edges or {}).values():
+            stack.append((path + edge._label, edge._target_node))
+
+    return weights
+
+
+class Weights(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', max_size=5), max_size=20)
+    WEIGHTED_WORDS = st.lists(
+        st.tuples(st.text(alphabet='abc', min_size=1, max_size=4), st.integers(0, 9)),
+        max_size=20
+    )
+
+    def test_nodes_hold_total_weight_of_words_below(self):
+        tree = PrefixTree()
+        tree.add('foo', 2)
+        tree.add('foobar', 3)
+        tree.add('fizz', 1)
+        tree.add('foo', 4)
+
+        self.assertEqual(
+            {'': 10, 'f': 10, 'foo': 9, 'foobar': 3, 'fizz': 1}, subtree_weights(tree)
+        )
+
+    @given(WORDS)
+    def test_extend_sorted_counts_words_like_extend(self, words):
+        tree = PrefixTree()
+        tree.extend_sorted(sorted(words))
+
+        self.assertEqual(subtree_weights(PrefixTree(words)), subtree_weights(tree))
+
+    def test_extend_sorted_counts_words_repeated_after_unsorted_ones(self):
+        words = ['b', 'a', 'b']
+        tree = PrefixTree()
+        tree.extend_sorted(words, strict=False)
+
+        self.assertEqual(subtree_weights(PrefixTree(words)), subtree_weights(tree))
+
+    @given(WORDS, st.data())
+    def test_removed_words_are_subtracted(self, words, data):
+        tree = PrefixTree(words)
+        removed_words = data.draw(
+            st.sets(st.sampled_from(words)).map(lambda words: words - {''}) if words
+            else st.just(set())
+        )
+
+        for word in removed_words:
+            tree.remove(word)
+
+        remaining_words = [word for word in words if word not in removed_words]
+
+        self.assertEqual(
+            subtree_weights(PrefixTree(remaining_words)), subtree_weights(tree)
+        )
+
+    def test_it_refuses_negative_weights(self):
+        with self.assertRaises(ValueError):
+            PrefixTree().add('a', -1)
+
+    def test_it_orders_alternatives_by_weight(self):
+        tree = PrefixTree()
+        tree.extend_weighted(
+            [('foo', 1), ('bar', 10), ('baz', 2), ('a', 3), ('c', 4), ('bb', 5)]
+        )
+        emitter = RegexpEmitter(weighted=True)
+
+        self.assertEqual('(?:[ac]|fo{2}|b(?:b|a[rz]))', tree.to_regexp(PythonFormatter))
+        # letters of a set are weighted together, 'a' and 'c' by 7, 'b' alone by 5
+        self.assertEqual(
+            '(?:b(?:a[rz]|b)|[ac]|fo{2})', tree.to_regexp(PythonFormatter, emitter)
+        )
+
+    @given(WEIGHTED_WORDS)
+    def test_weighted_regexp_matches_the_same_words(self, weighted_words):
+        tree = PrefixTree(cache_regexp=True)
+        tree.extend_weighted(weighted_words)
+        regexp = re.compile(tree.to_regexp(PythonFormatter, RegexpEmitter(weighted=True)))
+
+        self.assertEqual(
+            {word for word, _ in weighted_words},
+            {string for string in all_strings('abc', 4) if regexp.fullmatch(string)},
+            msg=regexp.pattern
+        )
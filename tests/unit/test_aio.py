@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from hypothesis import given
+
+from tests.helpers.hypothesis import NON_EMPTY_TEXT_ITERABLES
+from w2re import PythonWordMatchFormatter
+from w2re.aio import (
+    async_iterable_to_regexp,
+    async_stream_to_regexp,
+)
+from w2re.utils import iterable_to_regexp
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncIterator:
+    """Asynchronous iterator of ``items``, which unlike asynchronous generators
+    works before Python 3.6.
+    """
+
+    def __init__(self, items):
+        self._items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class ReadStream:  # pylint: disable=too-few-public-methods
+    """Stream returning at most ``size`` characters or bytes on each read."""
+
+    def __init__(self, data):
+        self._data = data
+
+    async def read(self, size):
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class AsyncIterableToRegexp(TestCase):
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_it_creates_the_same_regexp_as_iterable_to_regexp(self, words):
+        self.assertEqual(
+            iterable_to_regexp(words), run(async_iterable_to_regexp(AsyncIterator(words)))
+        )
+
+    def test_it_lets_other_tasks_run_between_batches(self):
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        words = ['word{}'.format(index) for index in range(100)]
+
+        async def convert():
+            ticker = asyncio.ensure_future(tick())
+
+            try:
+                return await async_iterable_to_regexp(AsyncIterator(words), batch_size=10)
+            finally:
+                ticker.cancel()
+
+        self.assertEqual(iterable_to_regexp(words), run(convert()))
+        self.assertGreaterEqual(len(ticks), 10)
+
+    def test_it_serializes_the_tree_in_executor(self):
+        with CountingExecutor() as executor:
+            regexp = run(async_iterable_to_regexp(
+                AsyncIterator(['is', 'in']), PythonWordMatchFormatter, executor=executor
+            ))
+
+        self.assertEqual(r'(?:\W+|\A)(i[ns])(?=\W+|\Z)', regexp)
+        self.assertEqual(1, executor.submitted)
+
+
+class AsyncStreamToRegexp(TestCase):
+    def test_it_converts_text_stream(self):
+        self.assertEqual(
+            '(?:i[fnst]|th(?:e|an))',
+            run(async_stream_to_regexp(
+                ReadStream('is\nin\r\nit\rif\nthe\nthan'), chunk_size=3
+            ))
+        )
+
+    def test_it_converts_binary_stream(self):
+        self.assertEqual(
+            '(?:ž|i[fnst]|th(?:e|an))',
+            run(async_stream_to_regexp(
+                ReadStream('is\nin\r\nit\rif\nthe\nthan\r\nž\r'.encode('utf-8')),
+                chunk_size=2, batch_size=1
+            ))
+        )
+
+    def test_it_reads_asyncio_stream_reader(self):
+        async def convert():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'foo\nfoobar\nbar')
+            reader.feed_eof()
+            return await async_stream_to_regexp(reader)
+
+        self.assertEqual('(?:fo{2}(?:bar)?|bar)', run(convert()))
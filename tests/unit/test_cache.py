@@ -0,0 +1,206 @@
+import os
+import re
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from w2re.cache import (
+    COMPILED_CACHE_SIZE,
+    RegexpCache,
+    cached_iterable_to_regexp,
+    clear_compiled_cache,
+    compile_iterable,
+    default_cache_directory,
+    words_digest,
+)
+from w2re.formatters import (
+    PythonFormatter,
+    PythonWordMatchFormatter,
+)
+from w2re.prefix_tree.optimizer import PatternLengthCost
+from w2re.utils import ConversionOptions
+
+
+class WordsDigest(TestCase):
+    def test_it_depends_on_words_their_order_and_formatter(self):
+        digests = {
+            words_digest(['ab', 'c'], PythonFormatter),
+            words_digest(['a', 'bc'], PythonFormatter),
+            words_digest(['c', 'ab'], PythonFormatter),
+            words_digest(['ab', 'c'], PythonWordMatchFormatter),
+            words_digest(['ab', 'c'], PythonFormatter, merge_suffixes=True),
+        }
+
+        self.assertEqual(5, len(digests))
+        self.assertIn(words_digest(iter(['ab', 'c']), PythonFormatter), digests)
+
+    def test_it_depends_on_formatter_class(self):
+        class UpperCaseFormatter(PythonFormatter):
+            @staticmethod
+            def wrap_regexp(root_node):
+                return PythonFormatter.wrap_regexp(root_node).upper()
+
+        self.assertEqual(PythonFormatter.code(), UpperCaseFormatter.code())
+        self.assertNotEqual(
+            words_digest(['a'], PythonFormatter), words_digest(['a'], UpperCaseFormatter)
+        )
+
+    def test_it_depends_on_version(self):
+        digest = words_digest(['a'], PythonFormatter)
+
+        with patch('w2re.cache.__version__', '0.0.0'):
+            self.assertNotEqual(digest, words_digest(['a'], PythonFormatter))
+
+
+class RegexpCacheTest(TestCase):
+    def setUp(self):
+        temporary_directory = TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self._directory = os.path.join(temporary_directory.name, 'cache')
+
+    def test_it_stores_regexps(self):
+        cache = RegexpCache(self._directory)
+
+        self.assertIsNone(cache.get('digest'))
+        cache.put('digest', 'caf\xe9\r\n')
+        self.assertEqual('caf\xe9\r\n', RegexpCache(self._directory).get('digest'))
+
+        cache.clear()
+        self.assertIsNone(cache.get('digest'))
+
+    def test_it_evicts_least_recently_used_regexps(self):
+        cache = RegexpCache(self._directory, max_size=10)
+        cache.put('first', 'abcd')
+        cache.put('second', 'efgh')
+        # make the order of modification times certain
+        os.utime(os.path.join(self._directory, 'first.re'), (1, 1))
+        os.utime(os.path.join(self._directory, 'second.re'), (2, 2))
+        cache.get('first')
+        cache.put('third', 'ijkl')
+
+        self.assertEqual('abcd', cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual('ijkl', cache.get('third'))
+
+    def test_it_removes_all_regexps_if_the_newest_is_bigger_than_the_cache(self):
+        RegexpCache(self._directory).put('newest', 'ab')
+        future = time.time() + 3600
+        os.utime(os.path.join(self._directory, 'newest.re'), (future, future))
+        cache = RegexpCache(self._directory, max_size=1)
+        cache.put('digest', 'a')
+
+        self.assertEqual([], os.listdir(self._directory))
+
+    def test_it_skips_files_removed_by_another_process_while_listing(self):
+        cache = RegexpCache(self._directory)
+        cache.put('digest', 'abcd')
+
+        with open(os.path.join(self._directory, 'unrelated.txt'), 'w'):
+            pass
+
+        with patch('w2re.cache.os.stat', side_effect=FileNotFoundError):
+            cache.clear()
+
+        self.assertEqual('abcd', cache.get('digest'))
+
+    def test_it_skips_files_removed_by_another_process_while_evicting(self):
+        cache = RegexpCache(self._directory, max_size=4)
+        cache.put('first', 'abcd')
+        os.utime(os.path.join(self._directory, 'first.re'), (1, 1))
+
+        with patch('w2re.cache.os.remove', side_effect=FileNotFoundError) as mock_remove:
+            cache.put('second', 'efgh')
+
+        mock_remove.assert_called_once_with(os.path.join(self._directory, 'first.re'))
+        self.assertEqual('efgh', cache.get('second'))
+
+    def test_it_skips_regexps_bigger_than_the_cache(self):
+        cache = RegexpCache(self._directory, max_size=3)
+        cache.put('digest', 'abcd')
+
+        self.assertIsNone(cache.get('digest'))
+
+    def test_it_uses_user_cache_directory_by_default(self):
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': self._directory}):
+            self.assertEqual(os.path.join(self._directory, 'w2re'), RegexpCache().directory)
+            self.assertEqual(os.path.join(self._directory, 'w2re'),
+                             default_cache_directory())
+
+
+class CachedIterableToRegexp(TestCase):
+    def setUp(self):
+        temporary_directory = TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self._cache = RegexpCache(temporary_directory.name)
+        clear_compiled_cache()
+        self.addCleanup(clear_compiled_cache)
+
+    def test_it_builds_the_tree_only_once(self):
+        words = ['is', 'in', 'it']
+
+        with patch('w2re.cache.iterable_to_regexp', return_value='i[nst]') as mock_convert:
+            self.assertEqual('i[nst]', cached_iterable_to_regexp(words, cache=self._cache))
+            self.assertEqual('i[nst]', cached_iterable_to_regexp(words, cache=self._cache))
+
+        self.assertEqual(1, mock_convert.call_count)
+        self.assertEqual((words, PythonFormatter), mock_convert.call_args[0][:2])
+
+    def test_it_returns_the_same_output_as_without_cache(self):
+        for _ in range(2):
+            self.assertEqual(
+                '(?:\\W+|\\A)((?:fo{2}|bar))(?=\\W+|\\Z)',
+                cached_iterable_to_regexp(
+                    ['foo', 'bar'], PythonWordMatchFormatter, cache=self._cache
+                )
+            )
+
+    def test_it_passes_options_to_conversion(self):
+        options = ConversionOptions(merge_suffixes=True, jobs=2, assume_sorted=True)
+
+        with patch('w2re.cache.iterable_to_regexp', return_value='i[nst]') as mock_convert:
+            cached_iterable_to_regexp(['is'], cache=self._cache, options=options)
+
+        mock_convert.assert_called_once_with(['is'], PythonFormatter, options)
+
+    def test_it_refuses_options_changing_regexp_of_same_words(self):
+        for options in (
+                ConversionOptions(weighted=True),
+                ConversionOptions(presort=True),
+                ConversionOptions(cost_model=PatternLengthCost()),
+        ):
+            with self.assertRaises(ValueError):
+                cached_iterable_to_regexp(['is'], cache=self._cache, options=options)
+
+            with self.assertRaises(ValueError):
+                compile_iterable(['is'], cache=self._cache, options=options)
+
+    def test_it_distinguishes_merged_suffixes(self):
+        options = ConversionOptions(merge_suffixes=True)
+
+        self.assertEqual('i[nst]', cached_iterable_to_regexp(
+            ['is', 'in', 'it'], cache=self._cache
+        ))
+        self.assertEqual('(?:ab|cd)e', cached_iterable_to_regexp(
+            ['abe', 'cde'], cache=self._cache, options=options
+        ))
+
+    def test_it_keeps_compiled_regexps_in_memory(self):
+        compiled = compile_iterable(['is', 'in'], cache=self._cache)
+
+        self.assertEqual(re.compile('i[ns]'), compiled)
+        self.assertIs(compiled, compile_iterable(iter(['is', 'in']), cache=self._cache))
+        self.assertIsNot(
+            compiled, compile_iterable(['is', 'in'], flags=re.I, cache=self._cache)
+        )
+
+    def test_it_keeps_only_recently_compiled_regexps(self):
+        first = compile_iterable(['0'], cache=self._cache)
+
+        for number in range(1, COMPILED_CACHE_SIZE + 1):
+            compile_iterable([str(number)], cache=self._cache)
+
+        re.purge()  # compiled patterns are cached by re as well
+        self.assertIsNot(first, compile_iterable(['0'], cache=self._cache))
+        last = compile_iterable([str(COMPILED_CACHE_SIZE)], cache=self._cache)
+        self.assertIs(last, compile_iterable([str(COMPILED_CACHE_SIZE)], cache=self._cache))
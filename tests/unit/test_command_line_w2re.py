@@ -1,10 +1,20 @@
+import bz2
+import gzip
+import os
 import sys
-from io import (
-    StringIO,
-    TextIOWrapper,
+from argparse import (
+    ArgumentParser,
+    Namespace,
+)
+from io import StringIO
+from tempfile import (
+    NamedTemporaryFile,
+    TemporaryDirectory,
+)
+from unittest import (
+    TestCase,
+    skipIf,
 )
-from tempfile import NamedTemporaryFile
-from unittest import TestCase
 from unittest.mock import (
     ANY,
     patch,
@@ -15,20 +25,27 @@ from w2re import (
     CHANGELOG_URL,
     __version__ as VERSION,
 )
-from w2re.command_line_w2re import main
+from w2re.command_line_w2re import (
+    main,
+    validate_args,
+)
 from w2re.formatters import (
     ALL_FORMATTERS,
+    PythonAtomicFormatter,
     PythonFormatter,
 )
+from w2re.prefix_tree.optimizer import MatchStepsCost
 
 
-class Main(TestCase):
+class MainTestCase(TestCase):
     def setUp(self):
         mock_stream_to_regexp_patcher = patch('w2re.command_line_w2re.stream_to_regexp')
         self._mock_stream_to_regexp = mock_stream_to_regexp_patcher.start()
         self._mock_stream_to_regexp.return_value = ''
         self.addCleanup(mock_stream_to_regexp_patcher.stop)
 
+
+class Main(MainTestCase):
     @patch('sys.stdout', new_callable=StringIO)
     def test_it_can_print_help(self, mock_stdout):
         with self.assertRaises(SystemExit) as exception_context:
@@ -57,17 +74,36 @@ class Main(TestCase):
         self.assertNotEqual(0, exception_context.exception.code)
         self._mock_stream_to_regexp.assert_not_called()
 
-    def test_it_opens_custom_file(self):
-        with NamedTemporaryFile() as temp_file:
-            main(['-i', temp_file.name])
-            file_object = self._mock_stream_to_regexp.call_args[0][0]
+    def test_it_refuses_unsorted_input(self):
+        self._mock_stream_to_regexp.side_effect = ValueError('Words must be sorted')
 
-            self.assertIsInstance(file_object, TextIOWrapper)
-            self.assertEqual(temp_file.name, file_object.name)
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            with self.assertRaises(SystemExit) as exception_context:
+                main(['--sorted'])
 
-    def test_it_uses_stdin_as_input_by_default(self):
-        main([])
-        self._mock_stream_to_regexp.called_with([sys.stdin, ANY])
+        self.assertNotEqual(0, exception_context.exception.code)
+        self.assertIn('Words must be sorted', mock_stderr.getvalue())
+
+    @skipIf(sys.version_info >= (3, 11), 'Atomic groups are supported.')
+    def test_it_does_not_offer_atomic_groups_before_python_3_11(self):
+        with patch('sys.stderr', new_callable=StringIO):
+            with self.assertRaises(SystemExit) as exception_context:
+                main(['-f', 'pya'])
+
+        self.assertNotEqual(0, exception_context.exception.code)
+        self._mock_stream_to_regexp.assert_not_called()
+
+    def test_it_prints_stats_to_stderr_on_request(self):
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            main(['--stats'])
+
+        self.assertIn('time [s]', mock_stderr.getvalue())
+
+    def test_it_prints_no_stats_by_default(self):
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            main([])
+
+        self.assertEqual('', mock_stderr.getvalue())
 
     def test_it_prints_out_version(self):
         with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
@@ -80,6 +116,166 @@ class Main(TestCase):
         self.assertIn(CHANGELOG_URL, output)
 
 
+class MainInputs(MainTestCase):
+    @patch('w2re.command_line_w2re.files_to_regexp', return_value='')
+    def test_it_reads_custom_file(self, mock_files_to_regexp):
+        with NamedTemporaryFile() as temp_file:
+            main(['-i', temp_file.name])
+
+        self.assertEqual([temp_file.name], mock_files_to_regexp.call_args[0][0])
+        self._mock_stream_to_regexp.assert_not_called()
+
+    @patch('w2re.command_line_w2re.files_to_regexp', return_value='')
+    def test_it_reads_files_matching_patterns_in_order(self, mock_files_to_regexp):
+        with TemporaryDirectory() as directory:
+            for name in ('b.txt', 'a.txt', 'c.gz'):
+                open(os.path.join(directory, name), 'w').close()
+
+            main(['-i', os.path.join(directory, '*.txt'),
+                  '-i', os.path.join(directory, 'c.gz'), os.path.join(directory, 'a*')])
+
+        self.assertEqual(
+            [os.path.join(directory, name) for name in ('a.txt', 'b.txt', 'c.gz', 'a.txt')],
+            mock_files_to_regexp.call_args[0][0]
+        )
+
+    def test_it_refuses_patterns_matching_no_file(self):
+        with TemporaryDirectory() as directory:
+            with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+                with self.assertRaises(SystemExit) as exception_context:
+                    main(['-i', os.path.join(directory, '*.txt')])
+
+        self.assertNotEqual(0, exception_context.exception.code)
+        self.assertIn('No input file matches', mock_stderr.getvalue())
+        self._mock_stream_to_regexp.assert_not_called()
+
+    @patch('w2re.command_line_w2re.files_to_regexp', return_value='')
+    def test_it_reads_existing_files_with_glob_characters(self, mock_files_to_regexp):
+        with TemporaryDirectory() as directory:
+            for name in ('words[1].txt', 'words1.txt'):
+                open(os.path.join(directory, name), 'w').close()
+
+            main(['-i', os.path.join(directory, 'words[1].txt')])
+
+        self.assertEqual(
+            [os.path.join(directory, 'words[1].txt')], mock_files_to_regexp.call_args[0][0]
+        )
+
+    @patch('w2re.command_line_w2re.files_to_regexp', return_value='')
+    def test_it_refuses_stdin_with_other_inputs(self, mock_files_to_regexp):
+        with NamedTemporaryFile() as temp_file:
+            with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+                with self.assertRaises(SystemExit) as exception_context:
+                    main(['-i', '-', temp_file.name])
+
+        self.assertNotEqual(0, exception_context.exception.code)
+        self.assertIn('stdin', mock_stderr.getvalue())
+        self.assertNotIn('No input file matches', mock_stderr.getvalue())
+        mock_files_to_regexp.assert_not_called()
+        self._mock_stream_to_regexp.assert_not_called()
+
+    def test_it_uses_stdin_for_dash(self):
+        main(['-i', '-'])
+        self.assertIs(sys.stdin, self._mock_stream_to_regexp.call_args[0][0])
+
+    def test_it_uses_stdin_as_input_by_default(self):
+        main([])
+        self._mock_stream_to_regexp.called_with([sys.stdin, ANY])
+
+
+class MainOptions(MainTestCase):
+    def test_it_merges_suffixes_on_request(self):
+        main(['--dafsa'])
+        self.assertTrue(self._mock_stream_to_regexp.call_args[0][2].merge_suffixes)
+
+    def test_it_merges_only_prefixes_by_default(self):
+        main([])
+        self.assertFalse(self._mock_stream_to_regexp.call_args[0][2].merge_suffixes)
+
+    def test_it_uses_one_process_by_default(self):
+        main([])
+        self.assertEqual(1, self._mock_stream_to_regexp.call_args[0][2].jobs)
+
+    def test_it_uses_all_cpus_for_zero_processes(self):
+        main(['-j', '0'])
+        self.assertIsNone(self._mock_stream_to_regexp.call_args[0][2].jobs)
+
+    def test_it_assumes_sorted_input_on_request(self):
+        main(['--sorted'])
+        self.assertTrue(self._mock_stream_to_regexp.call_args[0][2].assume_sorted)
+
+    def test_it_reads_weighted_words_on_request(self):
+        main(['--weighted'])
+        self.assertTrue(self._mock_stream_to_regexp.call_args[0][2].weighted)
+
+    def test_it_presorts_words_on_request(self):
+        main(['--presort'])
+        self.assertTrue(self._mock_stream_to_regexp.call_args[0][2].presort)
+
+    def test_it_optimizes_the_regexp_on_request(self):
+        main(['--optimize', 'steps'])
+        self.assertIsInstance(
+            self._mock_stream_to_regexp.call_args[0][2].cost_model, MatchStepsCost
+        )
+
+    def test_it_refuses_unknown_cost_models(self):
+        with patch('sys.stderr', new_callable=StringIO):
+            with self.assertRaises(SystemExit) as exception_context:
+                main(['--optimize', 'size'])
+
+        self.assertNotEqual(0, exception_context.exception.code)
+        self._mock_stream_to_regexp.assert_not_called()
+
+
+class ValidateArgs(TestCase):
+    DEFAULTS = {
+        'jobs': 1, 'merge_suffixes': False, 'weighted': False, 'assume_sorted': False,
+        'presort': False, 'max_pattern_size': None, 'cost_model': None,
+        'formatter': PythonFormatter.code(),
+    }
+
+    def assert_refused(self, **arguments):
+        args = Namespace(**dict(self.DEFAULTS, **arguments))
+
+        with self.subTest(**arguments):
+            with patch('sys.stderr', new_callable=StringIO):
+                with self.assertRaises(SystemExit) as exception_context:
+                    validate_args(ArgumentParser(), args)
+
+            self.assertNotEqual(0, exception_context.exception.code)
+
+    def test_it_accepts_defaults(self):
+        validate_args(ArgumentParser(), Namespace(**self.DEFAULTS))
+
+    def test_it_refuses_invalid_number_of_processes(self):
+        self.assert_refused(jobs=-1)
+        self.assert_refused(jobs=2, merge_suffixes=True)
+
+    def test_it_refuses_weighted_words_with_other_ways_of_building(self):
+        self.assert_refused(weighted=True, merge_suffixes=True)
+        self.assert_refused(weighted=True, assume_sorted=True)
+        self.assert_refused(weighted=True, jobs=2)
+
+    def test_it_refuses_presorting_sorted_or_weighted_words(self):
+        self.assert_refused(presort=True, assume_sorted=True)
+        self.assert_refused(presort=True, weighted=True)
+
+    def test_it_refuses_optimizing_with_dafsa_processes_or_shards(self):
+        self.assert_refused(cost_model='length', merge_suffixes=True)
+        self.assert_refused(cost_model='length', jobs=2)
+        self.assert_refused(cost_model='length', max_pattern_size=10)
+
+    def test_it_refuses_invalid_pattern_sizes(self):
+        self.assert_refused(max_pattern_size=0)
+        self.assert_refused(max_pattern_size=10, merge_suffixes=True)
+        self.assert_refused(max_pattern_size=10, jobs=2)
+        self.assert_refused(max_pattern_size=10, weighted=True)
+
+    def test_it_refuses_atomic_groups_with_dafsa_or_shards(self):
+        self.assert_refused(formatter=PythonAtomicFormatter.code(), merge_suffixes=True)
+        self.assert_refused(formatter=PythonAtomicFormatter.code(), max_pattern_size=10)
+
+
 class MainIntegration(TestCase):
     @patch('sys.stdout', new_callable=StringIO)
     def test_it_converts_stream_to_regular_expression(self, mock_stdout):
@@ -87,3 +283,49 @@ class MainIntegration(TestCase):
             main(['-i', temp_file.name])
 
         self.assertEqual(PythonFormatter._EMPTY_STRING_MATCH, mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_it_prints_one_shard_per_line(self, mock_stdout):
+        with NamedTemporaryFile('w') as temp_file:
+            temp_file.write('foo\nfoobar\nbar\n')
+            temp_file.flush()
+            main(['-i', temp_file.name, '--max-pattern-size', '10'])
+
+        self.assertEqual('bar\nfo{2}\nfo{2}bar', mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_it_prints_shards_of_presorted_words(self, mock_stdout):
+        with NamedTemporaryFile('w') as temp_file:
+            temp_file.write('foobar\nbar\nfoo\nbar\n')
+            temp_file.flush()
+            main(['-i', temp_file.name, '--max-pattern-size', '10', '--presort'])
+
+        self.assertEqual('bar\nfo{2}\nfo{2}bar', mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_it_reads_compressed_files(self, mock_stdout):
+        with TemporaryDirectory() as directory:
+            with gzip.open(os.path.join(directory, 'shard1.gz'), 'wt') as shard:
+                shard.write('foo\nfoobar\n')
+
+            with bz2.open(os.path.join(directory, 'shard2.bz2'), 'wt') as shard:
+                shard.write('bar\n')
+
+            with open(os.path.join(directory, 'shard3.txt'), 'w') as shard:
+                shard.write('baz\n')
+
+            main(['-i', os.path.join(directory, 'shard*')])
+
+        self.assertEqual('(?:fo{2}(?:bar)?|ba[rz])', mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_it_prints_stats_of_the_conversion(self, mock_stdout):
+        with NamedTemporaryFile('w') as temp_file:
+            temp_file.write('foo\nfoobar\nbar\n')
+            temp_file.flush()
+
+            with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+                main(['-i', temp_file.name, '--stats'])
+
+        self.assertEqual('(?:fo{2}(?:bar)?|bar)', mock_stdout.getvalue())
+        self.assertRegex(mock_stderr.getvalue(), r'read +3 ')
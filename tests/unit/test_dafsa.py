@@ -0,0 +1,111 @@
+import re
+import sys
+from itertools import product
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from tests.helpers.hypothesis import (
+    NON_EMPTY_TEXT_ITERABLES,
+    SPECIAL_CHARACTER_STRINGS,
+)
+from tests.unit.prefix_tree.test_tree import assert_strings_can_be_matched
+from w2re.dafsa import Dafsa
+from w2re.formatters import PythonFormatter
+
+_ALPHABET = 'ab.'
+_MAX_LENGTH = 4
+
+WORDS_OF_SMALL_ALPHABET = st.lists(
+    st.text(alphabet=_ALPHABET, min_size=1, max_size=_MAX_LENGTH), max_size=20
+)
+
+
+def all_strings_of_small_alphabet():
+    for length in range(1, _MAX_LENGTH + 1):
+        for characters in product(_ALPHABET, repeat=length):
+            yield ''.join(characters)
+
+
+class DafsaTest(TestCase):
+    SAMPLES = {
+        ('running', 'walking'): '(?:run{2}|walk)ing',
+        ('bat', 'cat'): '[bc]at',
+        ('tap', 'taps', 'top', 'tops'): 't[ao]ps?',
+        ('a', 'ab', 'abc'): 'a(?:bc?)?',
+        ('a', 'abc', 'adc'): 'a(?:[bd]c)?',
+        ('bar.org', 'example.com', 'foo.org', 'test.com'):
+            r'(?:(?:bar|fo{2})\.org|(?:example|test)\.com)',
+        ('q', 'xab', 'yab', 'zb'): '(?:q|[xy]ab|zb)',
+    }
+
+    def test_it_merges_common_suffixes(self):
+        for words, expected_regexp in self.SAMPLES.items():
+            with self.subTest(words=words):
+                self.assertEqual(expected_regexp, Dafsa(words).to_regexp(PythonFormatter))
+
+    def test_correctly_encodes_strings_with_special_characters(self):
+        for input_string, expected_regexp in SPECIAL_CHARACTER_STRINGS.items():
+            with self.subTest(input_string=input_string):
+                self.assertEqual(
+                    expected_regexp, Dafsa([input_string]).to_regexp(PythonFormatter)
+                )
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_can_be_instantiated_with_sorted_strings(self, expected_strings):
+        dafsa = Dafsa(sorted(expected_strings))
+        assert_strings_can_be_matched(
+            self, dafsa.to_regexp(PythonFormatter), expected_strings
+        )
+
+    @given(WORDS_OF_SMALL_ALPHABET)
+    def test_matches_exactly_the_given_words(self, words):
+        regexp = re.compile(Dafsa(sorted(words)).to_regexp(PythonFormatter))
+        matched_strings = {
+            string for string in all_strings_of_small_alphabet()
+            if regexp.fullmatch(string)
+        }
+
+        self.assertEqual(set(words), matched_strings, msg=regexp.pattern)
+
+    @given(WORDS_OF_SMALL_ALPHABET, WORDS_OF_SMALL_ALPHABET)
+    def test_accepts_more_words_after_conversion(self, first_words, second_words):
+        words = sorted(first_words + second_words)
+        middle = len(first_words)
+        dafsa = Dafsa(words[:middle])
+        dafsa.to_regexp(PythonFormatter)
+        dafsa.extend(words[middle:])
+
+        self.assertEqual(
+            Dafsa(words).to_regexp(PythonFormatter), dafsa.to_regexp(PythonFormatter)
+        )
+
+    def test_it_ignores_empty_and_repeated_strings(self):
+        self.assertEqual(
+            PythonFormatter._EMPTY_STRING_MATCH, Dafsa(['']).to_regexp(PythonFormatter)
+        )
+        self.assertEqual('ab?', Dafsa(['', 'a', 'a', 'ab']).to_regexp(PythonFormatter))
+
+    def test_it_accepts_words_added_one_by_one(self):
+        dafsa = Dafsa()
+        dafsa.add('ab')
+        dafsa.add('cb')
+
+        self.assertEqual('[ac]b', dafsa.to_regexp(PythonFormatter))
+
+    def test_it_refuses_unsorted_strings(self):
+        dafsa = Dafsa(['b'])
+
+        with self.assertRaises(ValueError):
+            dafsa.add('a')
+
+    def test_it_serializes_automata_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 3
+        regexp = Dafsa('a' * length for length in range(1, depth + 1)).to_regexp(
+            PythonFormatter
+        )
+
+        self.assertEqual('a' + '(?:a' * (depth - 2) + 'a?' + ')?' * (depth - 2), regexp)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from hypothesis import given
+from hypothesis.strategies import (
+    binary,
+    integers,
+    lists,
+    text,
+)
+
+from w2re.external_sort import iter_sorted_unique
+from w2re.stats import collect_stats
+
+
+class IterSortedUnique(TestCase):
+    @given(lists(text(alphabet='abc\n')), integers(1, 4))
+    def test_it_sorts_words_and_skips_duplicates(self, words, run_size):
+        self.assertEqual(sorted(set(words)), list(iter_sorted_unique(words, run_size)))
+
+    @given(lists(binary(max_size=3)), integers(1, 4))
+    def test_it_sorts_bytes(self, words, run_size):
+        self.assertEqual(sorted(set(words)), list(iter_sorted_unique(words, run_size)))
+
+    def test_it_writes_runs_to_temporary_files_only_if_needed(self):
+        words = ['b', 'a', 'b', 'c', 'a', 'd']
+
+        for run_size, runs in ((10, 0), (3, 1), (1, 6)):
+            with self.subTest(run_size=run_size):
+                with collect_stats() as stats:
+                    sorted_words = list(iter_sorted_unique(words, run_size))
+
+                self.assertEqual(['a', 'b', 'c', 'd'], sorted_words)
+                self.assertEqual(runs, stats.counters['presort runs'])
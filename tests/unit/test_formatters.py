@@ -1,22 +1,34 @@
 import re
+import sys
 from typing import (
     Any,
     Callable,
     Iterable,
     Type,
 )
-from unittest import TestCase
+from unittest import (
+    TestCase,
+    skipIf,
+)
 
 from hypothesis import (
     given,
+    strategies as st,
 )
 
 from w2re.formatters import (
     ALL_FORMATTERS,
     BaseFormatter,
+    PythonAtomicFormatter,
+    PythonBytesFormatter,
     PythonFormatter,
     PythonWordMatchFormatter,
 )
+from w2re.dafsa import Dafsa
+from w2re.prefix_tree.bytes_tree import BytesPrefixTree
+from w2re.prefix_tree.compact import CompactPrefixTree
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.primitives import PrerenderedNode
 from w2re.prefix_tree.tree import PrefixTree
 from tests.helpers.hypothesis import (
     LISTS_OF_WORDS,
@@ -25,6 +37,11 @@ from tests.helpers.hypothesis import (
     SPECIAL_CHARACTER_STRINGS,
 )
 
+# only compiling regular expressions with atomic groups requires it
+REQUIRES_ATOMIC_GROUPS = skipIf(
+    sys.version_info < (3, 11), 'Atomic groups require Python 3.11.'
+)
+
 
 class BaseFormatterTestCase(TestCase):
     def assert_method_raises(
@@ -104,6 +121,9 @@ class PythonFormatterTest(BaseTestCase):
     def test_it_generates_regexp_that_can_match_empty_input(self):
         self.check_formatter_output_matches_empty_string()
 
+    def test_it_escapes_single_special_character_next_to_strings(self):
+        self.check_formatter_output(['[', 'ab', 'cd'])
+
 
 class PythonWordMatchingFormatterTest(BaseTestCase):
     _Formatter = PythonWordMatchFormatter
@@ -114,3 +134,109 @@ class PythonWordMatchingFormatterTest(BaseTestCase):
 
     def test_it_generates_regexp_that_can_match_empty_input(self):
         self.check_formatter_output_matches_empty_string()
+
+
+class PythonAtomicFormatterTest(BaseTestCase):
+    _Formatter = PythonAtomicFormatter
+    WORDS = st.lists(
+        st.text(alphabet='ab.[', min_size=1, max_size=5), min_size=1, max_size=10
+    )
+    TEXT = st.text(alphabet='ab.[x', max_size=30)
+
+    @REQUIRES_ATOMIC_GROUPS
+    def test_it_generates_regexps_that_can_match_special_characters(self):
+        self.check_formatter_output(list(SPECIAL_CHARACTER_STRINGS.keys()))
+
+    @REQUIRES_ATOMIC_GROUPS
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_it_generates_regexp_that_can_match_input_strings(self, strings):
+        self.check_formatter_output(strings)
+
+    def test_it_generates_regexp_that_can_match_empty_input(self):
+        self.check_formatter_output_matches_empty_string()
+
+    @REQUIRES_ATOMIC_GROUPS
+    @given(WORDS, TEXT)
+    def test_it_matches_the_same_as_python_formatter(self, words, text):
+        tree = PrefixTree(words)
+        expected = re.compile(tree.to_regexp(PythonFormatter))
+        atomic = re.compile(tree.to_regexp(PythonAtomicFormatter))
+
+        self.assertEqual(expected.findall(text), atomic.findall(text), msg=atomic.pattern)
+
+        for string in words + [word + text for word in words] + [text]:
+            self.assertEqual(
+                bool(expected.fullmatch(string)), bool(atomic.fullmatch(string)),
+                msg=atomic.pattern
+            )
+
+    def test_it_uses_atomic_groups_below_plain_root(self):
+        self.assertEqual(
+            '(?:a(?>ab|bc?+)?+|th(?>e|an)|i[fnst])',
+            PrefixTree(
+                ['is', 'in', 'it', 'if', 'the', 'than', 'aab', 'a', 'ab', 'abc']
+            ).to_regexp(PythonAtomicFormatter)
+        )
+
+    def test_it_starts_root_alternatives_with_a_letter(self):
+        self.assertEqual('(?:b|c|aa{2})', PrefixTree(['b', 'c', 'aaa']).to_regexp(
+            PythonAtomicFormatter
+        ))
+
+    def test_it_orders_root_alternatives_by_size(self):
+        self.assertEqual(
+            '(?:b(?>a[rz]|e{2})|a)',
+            PrefixTree(['a', 'bar', 'baz', 'bee']).to_regexp(PythonAtomicFormatter)
+        )
+
+    def test_it_converts_compact_tree_the_same(self):
+        words = ['foo', 'foobar', 'baz', 'bar']
+
+        self.assertEqual(
+            PrefixTree(words).to_regexp(PythonAtomicFormatter),
+            CompactPrefixTree(words).to_regexp(PythonAtomicFormatter)
+        )
+
+    def test_it_converts_cached_tree_the_same(self):
+        words = ['foo', 'foobar', 'baz', 'bar']
+        tree = PrefixTree(words, cache_regexp=True)
+
+        self.assertEqual(tree.to_regexp(PythonFormatter), PrefixTree(words).to_regexp(
+            PythonFormatter
+        ))
+        self.assertEqual(
+            PrefixTree(words).to_regexp(PythonAtomicFormatter),
+            tree.to_regexp(PythonAtomicFormatter)
+        )
+
+    def test_it_refuses_emitters_without_atomic_groups(self):
+        with self.assertRaises(ValueError):
+            PrefixTree(['ab', 'a']).to_regexp(PythonAtomicFormatter, RegexpEmitter())
+
+    def test_it_refuses_merged_suffixes(self):
+        with self.assertRaises(ValueError):
+            Dafsa(['running', 'walking']).to_regexp(PythonAtomicFormatter)
+
+
+class PythonBytesFormatterTest(TestCase):
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_it_matches_encoded_input_strings(self, strings):
+        words = [string.encode('utf-8', 'surrogatepass') for string in strings]
+        regexp = BytesPrefixTree(words).to_regexp(PythonBytesFormatter)
+
+        self.assertEqual(
+            sorted(set(words)), sorted(set(re.compile(regexp).findall(b' '.join(words)))),
+            msg=regexp
+        )
+
+    def test_it_matches_empty_input(self):
+        self.assertEqual([b''], re.findall(BytesPrefixTree().to_regexp(), b''))
+
+    def test_it_wraps_bytes_or_str_regexp(self):
+        node = PrerenderedNode('i[ns]')
+
+        self.assertEqual(b'i[ns]', PythonBytesFormatter.wrap_bytes_regexp(node))
+        self.assertEqual('i[ns]', PythonBytesFormatter.wrap_regexp(node))
+
+    def test_it_is_not_offered_for_text(self):
+        self.assertNotIn(PythonBytesFormatter, ALL_FORMATTERS)
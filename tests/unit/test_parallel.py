@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+from hypothesis import given
+
+from tests.helpers.hypothesis import (
+    LISTS_OF_WORDS,
+    NON_EMPTY_TEXT_ITERABLES,
+)
+from w2re.formatters import (
+    PythonAtomicFormatter,
+    PythonFormatter,
+    PythonWordMatchFormatter,
+)
+from w2re.parallel import (
+    parallel_iterable_to_regexp,
+    partition_by_first_letter,
+    subtree_to_regexp,
+)
+from w2re.utils import (
+    ConversionOptions,
+    iterable_to_regexp,
+)
+
+
+class PartitionByFirstLetter(TestCase):
+    def test_it_keeps_order_of_first_appearance(self):
+        self.assertEqual(
+            [['is', 'in', 'it'], ['the', 'than'], ['a']],
+            partition_by_first_letter(['is', 'the', '', 'in', 'a', 'than', 'it'])
+        )
+
+
+class SubtreeToRegexp(TestCase):
+    def test_it_serializes_the_only_edge_of_the_root(self):
+        self.assertEqual((0, 'th(?:e|an)'), subtree_to_regexp(['the', 'than']))
+
+    def test_it_orders_atomic_alternatives_by_size(self):
+        small_key, small = subtree_to_regexp(['cd'], atomic=True)
+        big_key, big = subtree_to_regexp(['ab', 'a', 'abc'], atomic=True)
+
+        self.assertEqual(('cd', 'a(?:bc?+)?+'), (small, big))
+        self.assertLess(big_key, small_key)
+
+
+class ParallelIterableToRegexp(TestCase):
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_produces_the_same_output_as_single_process(self, words):
+        self.assertEqual(
+            iterable_to_regexp(words), parallel_iterable_to_regexp(words, jobs=1)
+        )
+
+    @given(LISTS_OF_WORDS)
+    def test_produces_the_same_output_for_words(self, words):
+        self.assertEqual(
+            iterable_to_regexp(words), parallel_iterable_to_regexp(words, jobs=1)
+        )
+
+    def test_it_builds_sub_trees_in_multiple_processes(self):
+        words = ['is', 'in', 'it', 'if', 'the', 'than', 'a', 'an', 'and', '*', '+']
+
+        for formatter in (PythonFormatter, PythonWordMatchFormatter, PythonAtomicFormatter):
+            with self.subTest(formatter=formatter):
+                self.assertEqual(
+                    iterable_to_regexp(words, formatter),
+                    parallel_iterable_to_regexp(words, formatter, jobs=2)
+                )
+
+    def test_it_orders_atomic_alternatives_of_the_root_by_size(self):
+        self.assertEqual(
+            '(?:ab?+|cd)',
+            parallel_iterable_to_regexp(['cd', 'ab', 'a'], PythonAtomicFormatter, jobs=2)
+        )
+
+    def test_it_ignores_empty_strings(self):
+        self.assertEqual(
+            PythonFormatter._EMPTY_STRING_MATCH, parallel_iterable_to_regexp([''], jobs=2)
+        )
+
+    def test_it_uses_all_cpus_if_number_of_processes_is_zero(self):
+        words = ['is', 'in', 'the', 'than']
+
+        self.assertEqual(
+            iterable_to_regexp(words), parallel_iterable_to_regexp(words, jobs=0)
+        )
+        self.assertEqual(
+            iterable_to_regexp(words),
+            iterable_to_regexp(words, options=ConversionOptions(jobs=0))
+        )
+
+    def test_it_refuses_negative_number_of_processes(self):
+        with self.assertRaises(ValueError):
+            parallel_iterable_to_regexp(['is', 'the'], jobs=-1)
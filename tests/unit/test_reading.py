@@ -0,0 +1,163 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+from io import (
+    BytesIO,
+    StringIO,
+)
+from tempfile import (
+    TemporaryDirectory,
+    TemporaryFile,
+)
+from unittest import TestCase
+
+from hypothesis import given
+
+from tests.helpers.hypothesis import NON_EMPTY_TEXT_ITERABLES
+from w2re.reading import (
+    iter_files_lines,
+    iter_stream_byte_lines,
+    iter_stream_lines,
+    parse_weighted_lines,
+)
+
+
+class IterStreamLines(TestCase):
+    def assert_lines(self, stream, expected_lines, **kwargs):
+        self.assertEqual(expected_lines, list(iter_stream_lines(stream, **kwargs)))
+
+    def test_it_splits_on_any_newline_convention(self):
+        for chunk_size in (1, 2, 3, 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assert_lines(
+                    StringIO('unix\nwindows\r\nmac\rlast'),
+                    ['unix', 'windows', 'mac', 'last'],
+                    chunk_size=chunk_size
+                )
+
+    def test_it_skips_empty_lines(self):
+        self.assert_lines(StringIO('\n\r\n\ra\r\r\n\nb\n\n'), ['a', 'b'])
+
+    def test_it_decodes_binary_streams(self):
+        for chunk_size in (1, 2, 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assert_lines(
+                    BytesIO('žluťoučký\r\nkůň'.encode('utf-8')),
+                    ['žluťoučký', 'kůň'],
+                    chunk_size=chunk_size
+                )
+
+    def test_it_uses_custom_encoding(self):
+        self.assert_lines(
+            BytesIO('žluťoučký\nkůň'.encode('cp1250')), ['žluťoučký', 'kůň'],
+            encoding='cp1250'
+        )
+
+    def test_it_returns_text_held_back_by_the_decoder_at_the_end(self):
+        # the IDNA decoder holds back the last label until the input ends
+        self.assert_lines(
+            BytesIO(b'is.in\nit'), ['is.in', 'it'], encoding='idna', chunk_size=4
+        )
+
+    def test_it_reads_memory_mapped_files(self):
+        with TemporaryFile() as temp_file:
+            temp_file.write(b'is\nin\r\nit')
+            temp_file.flush()
+
+            with mmap.mmap(temp_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assert_lines(mapped, ['is', 'in', 'it'], chunk_size=4)
+
+    @given(NON_EMPTY_TEXT_ITERABLES)
+    def test_it_returns_all_lines(self, expected_strings):
+        expected_strings = [
+            string for string in expected_strings if string not in '\r\n'
+        ]
+        self.assert_lines(
+            StringIO('\n'.join(expected_strings)), expected_strings, chunk_size=3
+        )
+
+
+class IterStreamByteLines(TestCase):
+    def test_it_splits_on_any_newline_convention_without_decoding(self):
+        for chunk_size in (1, 2, 3, 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(
+                    [b'a', b'\xff', b'c', b'd'],
+                    list(iter_stream_byte_lines(
+                        BytesIO(b'a\r\n\xff\r\rc\nd\r'), chunk_size=chunk_size
+                    ))
+                )
+
+
+class IterFilesLines(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.directory = directory.name
+        self.addCleanup(directory.cleanup)
+
+    def write(self, name, content, opener=open):
+        path = os.path.join(self.directory, name)
+
+        with opener(path, 'wb') as file_object:
+            file_object.write(content.encode('utf-8'))
+
+        return path
+
+    def test_it_returns_lines_in_order_of_files(self):
+        paths = [
+            self.write('{}.txt'.format(index), 'word{0}\nxy\r\n\nz{0}'.format(index))
+            for index in range(20)
+        ]
+
+        expected_lines = [
+            line
+            for index in range(20)
+            for line in ('word{}'.format(index), 'xy', 'z{}'.format(index))
+        ]
+
+        self.assertEqual(
+            expected_lines, list(iter_files_lines(paths, chunk_size=3, threads=3))
+        )
+
+    def test_it_decompresses_files_by_extension(self):
+        paths = [
+            self.write('words.gz', 'gzip\n', gzip.open),
+            self.write('words.bz2', 'bzip2\n', bz2.open),
+            self.write('words.xz', 'xz\n', lzma.open),
+            self.write('words.lzma', 'ž\n', lzma.open),
+        ]
+
+        self.assertEqual(['gzip', 'bzip2', 'xz', 'ž'], list(iter_files_lines(paths)))
+
+    def test_it_raises_errors_of_readers(self):
+        lines = iter_files_lines(
+            [self.write('a.txt', 'a\n'), os.path.join(self.directory, 'missing.txt')]
+        )
+
+        self.assertEqual('a', next(lines))
+
+        with self.assertRaises(FileNotFoundError):
+            next(lines)
+
+    def test_it_stops_readers_when_closed(self):
+        paths = [self.write('{}.txt'.format(index), 'a\n' * 1000) for index in range(10)]
+        lines = iter_files_lines(paths, chunk_size=2, threads=2)
+
+        self.assertEqual('a', next(lines))
+        lines.close()  # doesn't wait for readers blocked by full queues
+
+
+class ParseWeightedLines(TestCase):
+    def test_it_splits_count_after_the_last_tab(self):
+        self.assertEqual(
+            [('the', 12), ('a\tb', 0), ('than', 1)],
+            list(parse_weighted_lines(['the\t12', 'a\tb\t0', 'than']))
+        )
+
+    def test_it_refuses_invalid_counts(self):
+        for line in ('the\t', 'the\t-1', 'the\tmany'):
+            with self.subTest(line=line):
+                with self.assertRaises(ValueError):
+                    list(parse_weighted_lines([line]))
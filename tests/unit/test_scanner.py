@@ -0,0 +1,74 @@
+import io
+import re
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from w2re.formatters import PythonWordMatchFormatter
+from w2re.prefix_tree.tree import PrefixTree
+from w2re.scanner import WordScanner
+
+# word and non-word characters, so words can contain and be surrounded by both
+ALPHABET = 'ab -'
+
+
+class WordScannerTest(TestCase):
+    WORDS = st.lists(st.text(alphabet=ALPHABET, min_size=1, max_size=4), max_size=6)
+    TEXT = st.text(alphabet=ALPHABET + 'c', max_size=40)
+
+    @given(WORDS.filter(bool), TEXT)
+    def test_finds_the_same_words_as_word_match_regexp(self, words, text):
+        regexp = PrefixTree(words).to_regexp(PythonWordMatchFormatter)
+
+        self.assertEqual(
+            [(match.start(1), match.group(1)) for match in re.finditer(regexp, text)],
+            list(WordScanner.from_words(words).finditer(text)),
+            msg=regexp
+        )
+
+    @given(WORDS, TEXT, st.integers(min_value=1, max_value=5))
+    def test_finds_the_same_words_in_chunks(self, words, text, chunk_size):
+        scanner = WordScanner.from_words(words)
+        chunks = [
+            text[start:start + chunk_size] for start in range(0, len(text), chunk_size)
+        ]
+
+        self.assertEqual(list(scanner.finditer(text)), list(scanner.scan(chunks)))
+
+    def test_finds_whole_words_only(self):
+        self.assertEqual(
+            ['Python', 'is'],
+            WordScanner.from_words(['Python', 'is']).findall('Python is, Pythonista isn\'t')
+        )
+
+    def test_prefers_longest_word(self):
+        self.assertEqual(
+            [(0, 'foo bar'), (8, 'foo')],
+            list(WordScanner.from_words(['foo', 'foo bar']).finditer('foo bar foo'))
+        )
+
+    def test_skips_words_within_previous_match(self):
+        self.assertEqual(
+            [(0, 'foo bar'), (8, 'bar')],
+            list(WordScanner.from_words(['foo bar', 'bar']).finditer('foo bar bar'))
+        )
+
+    def test_finds_nothing_without_words(self):
+        self.assertEqual([], WordScanner.from_words([]).findall('foo bar'))
+
+    def test_scans_binary_stream(self):
+        stream = io.BytesIO('čaj a káva\nkáva\n'.encode('utf-8'))
+
+        self.assertEqual(
+            [(4, 'a'), (6, 'káva'), (11, 'káva')],
+            list(WordScanner.from_words(['a', 'káva']).scan_stream(stream, chunk_size=3))
+        )
+
+    def test_scans_text_stream(self):
+        self.assertEqual(
+            [(0, 'foo')],
+            list(WordScanner.from_words(['foo']).scan_stream(io.StringIO('foo\nbar')))
+        )
@@ -0,0 +1,128 @@
+import re
+from unittest import TestCase
+
+from hypothesis import (
+    given,
+    strategies as st,
+)
+
+from tests.unit.prefix_tree.test_tree import all_strings
+from w2re.formatters import (
+    PythonAtomicFormatter,
+    PythonFormatter,
+    PythonWordMatchFormatter,
+)
+from w2re.prefix_tree.tree import PrefixTree
+from w2re.sharding import (
+    iterable_to_sharded_regexp,
+    shard_prefix_tree,
+)
+
+
+class ShardPrefixTree(TestCase):
+    WORDS = st.lists(st.text(alphabet='abc', min_size=1, max_size=4), max_size=30)
+
+    @given(WORDS, st.integers(min_value=1, max_value=60))
+    def test_shards_match_the_same_words_as_one_regexp(self, words, max_pattern_size):
+        sharded_regexp = iterable_to_sharded_regexp(words, max_pattern_size)
+
+        self.assertEqual(
+            set(words),
+            {string for string in all_strings('abc', 4)
+             if sharded_regexp.fullmatch(string)},
+            msg=sharded_regexp.patterns
+        )
+
+    @given(WORDS, st.integers(min_value=1, max_value=60))
+    def test_shards_match_the_same_prefixes_as_one_regexp(self, words, max_pattern_size):
+        sharded_regexp = iterable_to_sharded_regexp(words, max_pattern_size)
+        compiled = re.compile(PrefixTree(words).to_regexp(PythonFormatter))
+
+        for string in all_strings('abc', 5):
+            expected = compiled.match(string)
+            matched = sharded_regexp.match(string)
+            self.assertEqual(
+                None if expected is None else expected.group(),
+                None if matched is None else matched.group(),
+                msg=(string, sharded_regexp.patterns)
+            )
+
+    def test_it_matches_shorter_words_of_other_shards(self):
+        sharded_regexp = shard_prefix_tree(PrefixTree(['a', 'abc']), 4)
+
+        self.assertEqual(['a', 'abc'], sharded_regexp.patterns)
+        self.assertEqual({'a': 0, 'ab': 1}, sharded_regexp.keys)
+        self.assertEqual('a', sharded_regexp.match('ab').group())
+        self.assertEqual('abc', sharded_regexp.match('abcd').group())
+
+    @given(WORDS.filter(bool), st.integers(min_value=1, max_value=60))
+    def test_only_single_words_exceed_the_maximal_size(self, words, max_pattern_size):
+        for pattern in iterable_to_sharded_regexp(words, max_pattern_size).patterns:
+            if len(pattern) > max_pattern_size:
+                compiled = re.compile(pattern)
+                matched_words = [word for word in set(words) if compiled.fullmatch(word)]
+                self.assertEqual(1, len(matched_words), msg=pattern)
+
+    @given(WORDS)
+    def test_it_keeps_one_shard_if_the_regexp_fits(self, words):
+        sharded_regexp = iterable_to_sharded_regexp(words, 10 ** 6)
+
+        self.assertEqual([PrefixTree(words).to_regexp(PythonFormatter)],
+                         sharded_regexp.patterns)
+
+    def test_it_splits_sub_trees_too_big_for_a_shard(self):
+        tree = PrefixTree(['foo', 'foobar', 'foobaz', 'bar', 'barista'])
+        sharded_regexp = shard_prefix_tree(tree, 16)
+
+        self.assertEqual(
+            ['fo{2}', 'fo{2}ba[rz]', 'bar(?:ista)?'], sharded_regexp.patterns
+        )
+        self.assertEqual('fo{2}ba[rz]', sharded_regexp.pattern_for('foobaz'))
+        self.assertEqual('fo{2}', sharded_regexp.pattern_for('foo'))
+        self.assertIsNone(sharded_regexp.pattern_for('x'))
+        self.assertIsNone(sharded_regexp.match('x'))
+        self.assertIsNone(sharded_regexp.fullmatch('x'))
+        self.assertEqual('bar', sharded_regexp.match('barometer').group())
+
+    def test_it_measures_nested_fragments_of_long_sub_trees(self):
+        # letters without shorter escapes, so the sub-tree isn't joined into one string
+        label = ''.join(chr(0x100 + index) for index in range(300))
+        tree = PrefixTree(['a' + label, 'a' + label + 'b', 'c'])
+
+        self.assertEqual(
+            [tree.to_regexp(PythonFormatter)], shard_prefix_tree(tree, 400).patterns
+        )
+        self.assertEqual(
+            ['c', 'a' + label, 'a' + label + 'b'], shard_prefix_tree(tree, 300).patterns
+        )
+
+    def test_each_shard_is_formatted(self):
+        sharded_regexp = iterable_to_sharded_regexp(
+            ['foo', 'bar'], 30, PythonWordMatchFormatter
+        )
+
+        self.assertEqual(
+            [r'(?:\W+|\A)(fo{2})(?=\W+|\Z)', r'(?:\W+|\A)(bar)(?=\W+|\Z)'],
+            sharded_regexp.patterns
+        )
+
+    def test_it_matches_empty_string_without_words(self):
+        sharded_regexp = iterable_to_sharded_regexp([''], 10)
+
+        self.assertEqual([PythonFormatter._EMPTY_STRING_MATCH], sharded_regexp.patterns)
+        self.assertEqual(1, len(sharded_regexp))
+
+    def test_it_adds_sorted_words_on_request(self):
+        with self.assertRaises(ValueError):
+            iterable_to_sharded_regexp(['b', 'a'], 10, assume_sorted=True)
+
+        sharded_regexp = iterable_to_sharded_regexp(['a', 'ab'], 10, assume_sorted=True)
+        self.assertEqual(['ab?'], sharded_regexp.patterns)
+
+    def test_it_refuses_non_positive_sizes(self):
+        with self.assertRaises(ValueError):
+            iterable_to_sharded_regexp(['a'], 0)
+
+    def test_it_refuses_atomic_groups(self):
+        with self.assertRaises(ValueError):
+            iterable_to_sharded_regexp(['a', 'ab'], 10, PythonAtomicFormatter)
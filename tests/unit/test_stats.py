@@ -0,0 +1,103 @@
+from unittest import TestCase
+
+from w2re.dafsa import Dafsa
+from w2re.formatters import PythonFormatter
+from w2re.prefix_tree.emitter import escape_label
+from w2re.prefix_tree.primitives import PrefixTreeEdge
+from w2re.stats import (
+    Stats,
+    active_stats,
+    collect_stats,
+    timer,
+)
+from w2re.utils import (
+    ConversionOptions,
+    iterable_to_regexp,
+)
+
+
+class CollectStats(TestCase):
+    def setUp(self):
+        escape_label.cache_clear()
+
+    def test_it_counts_events_of_the_conversion(self):
+        with collect_stats() as stats:
+            regexp = iterable_to_regexp(['foo', 'foobar', 'foobaz', 'bar'])
+
+        self.assertEqual({
+            'read': 4,
+            'nodes': 6,  # including the root
+            'edges': 5,
+            'branches': 1,
+            'build': 1,
+            'to_regexp': 1,
+            'compress': 3,
+            'collapse_letter_ranges': 1,
+            'output length': len(regexp),
+        }, stats.counters)
+        self.assertEqual(
+            {'read', 'build', 'to_regexp', 'compress', 'collapse_letter_ranges'},
+            set(stats.timers)
+        )
+
+    def test_it_counts_splits_and_dafsa_states(self):
+        with collect_stats() as stats:
+            iterable_to_regexp(['foobar', 'foo'])
+            iterable_to_regexp(['ab', 'b'], options=ConversionOptions(merge_suffixes=True))
+
+        self.assertEqual(1, stats.counters['splits'])
+        self.assertEqual(4, stats.counters['dafsa states'])
+        self.assertEqual(2, stats.counters['build'])
+
+    def test_it_restores_instrumented_functions(self):
+        split, dafsa_init = PrefixTreeEdge._split, Dafsa.__init__
+
+        with self.assertRaises(KeyError):
+            with collect_stats():
+                self.assertIsNot(split, PrefixTreeEdge._split)
+                raise KeyError()
+
+        self.assertIs(split, PrefixTreeEdge._split)
+        self.assertIs(dafsa_init, Dafsa.__init__)
+        self.assertIsNone(active_stats())
+
+    def test_it_refuses_nested_collection(self):
+        with collect_stats():
+            with self.assertRaises(RuntimeError):
+                with collect_stats():
+                    pass  # pragma: no cover
+
+    def test_it_measures_nothing_if_not_active(self):
+        with timer('build'):
+            pass
+
+        self.assertIsNone(active_stats())
+        self.assertEqual('bar', iterable_to_regexp(['bar'], PythonFormatter))
+
+
+class StatsTest(TestCase):
+    def test_it_reports_counters_and_timers(self):
+        stats = Stats()
+        stats.count('nodes', 3)
+        stats.add_time('compress', 0.5)
+
+        self.assertEqual(
+            [['count', 'time', '[s]'], ['compress', '0.500000'], ['nodes', '3']],
+            [line.split() for line in stats.report().splitlines()]
+        )
+
+    def test_it_counts_items_of_timed_iterable(self):
+        stats = Stats()
+
+        self.assertEqual(['a', 'b'], list(stats.timed_iterable('read', 'ab')))
+        self.assertEqual({'read': 2}, stats.counters)
+        self.assertIn('read', stats.timers)
+
+    def test_it_counts_and_times_wrapped_functions(self):
+        stats = Stats()
+
+        self.assertEqual(3, stats.timed('len', len)('abc'))
+        self.assertEqual(3, stats.counted('calls', len)('abc'))
+        self.assertEqual({'len': 1, 'calls': 1}, stats.counters)
+        self.assertEqual({'len'}, set(stats.timers))
+        self.assertIn('Stats(counters=', repr(stats))
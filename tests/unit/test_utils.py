@@ -1,11 +1,29 @@
+import gzip
+import os
+from io import (
+    BytesIO,
+    StringIO,
+)
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from hypothesis import given
 
 from tests.helpers.hypothesis import NON_EMPTY_TEXT_ITERABLES
 from tests.unit.prefix_tree.test_tree import assert_strings_can_be_matched
-from w2re import PythonFormatter
-from w2re.utils import iterable_to_regexp
+from w2re import (
+    PythonAtomicFormatter,
+    PythonFormatter,
+)
+from w2re.prefix_tree.optimizer import PatternLengthCost
+from w2re.stats import collect_stats
+from w2re.utils import (
+    ConversionOptions,
+    bytes_stream_to_regexp,
+    files_to_regexp,
+    iterable_to_regexp,
+    stream_to_regexp,
+)
 
 
 class IterableToRegexp(TestCase):
@@ -24,3 +42,184 @@ class IterableToRegexp(TestCase):
         self.assertEqual(
             PythonFormatter._EMPTY_STRING_MATCH, iterable_to_regexp([''])
         )
+
+    def test_it_can_merge_suffixes_of_unsorted_strings(self):
+        self.assertEqual(
+            '(?:run{2}|walk)ing',
+            iterable_to_regexp(
+                ['walking', 'running', 'walking'],
+                options=ConversionOptions(merge_suffixes=True)
+            )
+        )
+
+    def test_it_accepts_sorted_strings(self):
+        words = ['if', 'in', 'is', 'it', 'than', 'the']
+
+        for merge_suffixes in (False, True):
+            with self.subTest(merge_suffixes=merge_suffixes):
+                self.assertEqual(
+                    iterable_to_regexp(
+                        words, options=ConversionOptions(merge_suffixes=merge_suffixes)
+                    ),
+                    iterable_to_regexp(words, options=ConversionOptions(
+                        merge_suffixes=merge_suffixes, assume_sorted=True
+                    ))
+                )
+
+    def test_it_refuses_unsorted_strings_if_assumed_sorted(self):
+        with self.assertRaises(ValueError):
+            iterable_to_regexp(['b', 'a'], options=ConversionOptions(assume_sorted=True))
+
+    def test_it_can_use_multiple_processes(self):
+        self.assertEqual(
+            '(?:i[fnst]|th(?:e|an))',
+            iterable_to_regexp(
+                ['is', 'in', 'it', 'if', 'the', 'than'], options=ConversionOptions(jobs=2)
+            )
+        )
+
+    def test_it_can_presort_strings(self):
+        words = ['walking', 'running', 'walking', 'run']
+
+        for merge_suffixes in (False, True):
+            with self.subTest(merge_suffixes=merge_suffixes):
+                self.assertEqual(
+                    iterable_to_regexp(
+                        sorted(set(words)),
+                        options=ConversionOptions(merge_suffixes=merge_suffixes)
+                    ),
+                    iterable_to_regexp(words, options=ConversionOptions(
+                        merge_suffixes=merge_suffixes, presort=True
+                    ))
+                )
+
+    def test_it_orders_alternatives_by_weight_on_request(self):
+        self.assertEqual(
+            '(?:th(?:an|e)|i[ns])',
+            iterable_to_regexp(
+                [('is', 1), ('in', 2), ('the', 3), ('than', 4)],
+                options=ConversionOptions(weighted=True)
+            )
+        )
+
+    def test_it_orders_atomic_alternatives_by_weight(self):
+        self.assertEqual(
+            '(?:cd|ab?+)',
+            iterable_to_regexp(
+                [('ab', 1), ('a', 1), ('cd', 3)], PythonAtomicFormatter,
+                ConversionOptions(weighted=True)
+            )
+        )
+
+    def test_it_optimizes_the_regexp_on_request(self):
+        words = ['walked', 'walking', 'talked', 'talking']
+
+        with collect_stats() as stats:
+            self.assertEqual(
+                '[tw]alk(?:ed|ing)',
+                iterable_to_regexp(
+                    words, options=ConversionOptions(cost_model=PatternLengthCost())
+                )
+            )
+
+        self.assertEqual(16, stats.counters['optimizer saved bytes'])
+        self.assertEqual(
+            '[tw]alk(?:ing|ed)',
+            iterable_to_regexp(
+                [(word, 2 if word.endswith('ing') else 1) for word in words],
+                options=ConversionOptions(weighted=True, cost_model=PatternLengthCost())
+            )
+        )
+        self.assertEqual(
+            '(?:walk(?>ed|ing)|talk(?>ed|ing))',
+            iterable_to_regexp(
+                words, PythonAtomicFormatter,
+                ConversionOptions(cost_model=PatternLengthCost())
+            )
+        )
+
+
+class StreamToRegexp(TestCase):
+    def test_it_converts_text_stream(self):
+        self.assertEqual(
+            '(?:i[fnst]|th(?:e|an))',
+            stream_to_regexp(StringIO('is\nin\r\nit\rif\nthe\nthan'))
+        )
+
+    def test_it_converts_binary_stream(self):
+        self.assertEqual(
+            '(?:i[fnst]|th(?:e|an))',
+            stream_to_regexp(BytesIO(b'is\nin\r\nit\rif\nthe\nthan'), chunk_size=2)
+        )
+
+    def test_it_converts_binary_stream_to_bytes(self):
+        self.assertEqual(
+            b'(?:i[fnst]|th(?:e|an)|\xff\xfe)',
+            bytes_stream_to_regexp(
+                BytesIO(b'is\nin\r\nit\rif\nthe\nthan\n\xff\xfe'), chunk_size=2
+            )
+        )
+
+    def test_it_times_presorting(self):
+        with collect_stats() as stats:
+            stream_to_regexp(
+                StringIO('the\nis\nthe'), options=ConversionOptions(presort=True)
+            )
+
+        self.assertEqual(2, stats.counters['presort'])
+        self.assertIn('presort', stats.timers)
+
+    def test_it_collects_stats_of_binary_stream(self):
+        with collect_stats() as stats:
+            regexp = bytes_stream_to_regexp(BytesIO(b'is\nin\nit'))
+
+        self.assertEqual(3, stats.counters['read'])
+        self.assertEqual(len(regexp), stats.counters['output length'])
+        self.assertIn('to_regexp', stats.timers)
+
+    def test_it_converts_sorted_binary_stream(self):
+        self.assertEqual(
+            b'(?:i[fnst]|th(?:e|an))',
+            bytes_stream_to_regexp(
+                BytesIO(b'if\nin\nis\nit\nthan\nthe'),
+                options=ConversionOptions(assume_sorted=True)
+            )
+        )
+
+    def test_it_converts_weighted_stream(self):
+        self.assertEqual(
+            '(?:th(?:an|e)|i[ns])',
+            stream_to_regexp(
+                StringIO('is\nin\t2\nthe\t3\nthan\t4'),
+                options=ConversionOptions(weighted=True)
+            )
+        )
+
+    def test_it_converts_presorted_stream(self):
+        self.assertEqual(
+            '(?:i[fnst]|th(?:e|an))',
+            stream_to_regexp(
+                StringIO('the\nis\nin\nit\nis\nif\nthan\n'),
+                options=ConversionOptions(presort=True)
+            )
+        )
+
+    def test_it_converts_files(self):
+        with TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ('1.gz', '2.txt')]
+
+            with gzip.open(paths[0], 'wb') as file_object:
+                file_object.write(b'if\nin\nis\nit\n')
+
+            with open(paths[1], 'wb') as file_object:
+                file_object.write(b'than\nthe\n')
+
+            self.assertEqual(
+                '(?:i[fnst]|th(?:e|an))',
+                files_to_regexp(paths, options=ConversionOptions(assume_sorted=True))
+            )
+
+    def test_it_matches_empty_string_on_empty_stream(self):
+        self.assertEqual(
+            PythonFormatter._EMPTY_STRING_MATCH, stream_to_regexp(StringIO('\n\n'))
+        )
@@ -1,14 +1,40 @@
+import sys
+
 from w2re.formatters import (
     BaseFormatter,
+    PythonAtomicFormatter,
+    PythonBytesFormatter,
     PythonFormatter,
     PythonWordMatchFormatter,
 )
+from w2re.dafsa import Dafsa
+from w2re.parallel import parallel_iterable_to_regexp
+from w2re.prefix_tree.bytes_tree import BytesPrefixTree
+from w2re.prefix_tree.compact import CompactPrefixTree
+from w2re.prefix_tree.mapped import MappedPrefixTree
 from w2re.prefix_tree.tree import PrefixTree
+from w2re.scanner import WordScanner
+from w2re.sharding import (
+    ShardedRegexp,
+    iterable_to_sharded_regexp,
+    shard_prefix_tree,
+)
+from w2re.stats import collect_stats
 from w2re.utils import (
+    ConversionOptions,
+    bytes_stream_to_regexp,
+    files_to_regexp,
     iterable_to_regexp,
     stream_to_regexp,
 )
 
+# syntax and protocol of asynchronous iteration
+if sys.version_info >= (3, 5, 2):  # pragma: no branch
+    from w2re.aio import (
+        async_iterable_to_regexp,
+        async_stream_to_regexp,
+    )
+
 __version__ = '3.1.0'
 
 APPLICATION_NAME = 'w2re'
@@ -0,0 +1,116 @@
+"""Conversion of words from asynchronous iterables and streams, for ``asyncio``
+applications. Requires Python 3.5.2.
+
+Words are added to the prefix tree in batches and other tasks run between
+them, so converting millions of words doesn't block the event loop for long.
+Serialization of the tree can't be split like that, so it runs in an executor.
+"""
+import asyncio
+import codecs
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterable,
+    List,
+    Optional,
+    Type,
+)
+
+from w2re.formatters import (
+    BaseFormatter,
+    PythonFormatter,
+)
+from w2re.prefix_tree.tree import PrefixTree
+from w2re.reading import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_ENCODING,
+    split_lines,
+)
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+async def _extend(tree: PrefixTree, words: List[str], batch_size: int) -> None:
+    """Adds words in batches and lets other tasks run after each of them."""
+    for start in range(0, len(words), batch_size):
+        tree.extend(words[start:start + batch_size])
+        await asyncio.sleep(0)
+
+
+async def _to_regexp(
+        tree: PrefixTree, formatter: Type[BaseFormatter], executor: Optional[Executor]
+) -> str:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, tree.to_regexp, formatter)
+
+
+async def async_iterable_to_regexp(
+        aiterable: AsyncIterable[str],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        executor: Optional[Executor] = None
+) -> str:
+    """Same as `iterable_to_regexp`, but reads words from an asynchronous iterable.
+
+    :param batch_size: Number of words added to the tree at once, before other
+        tasks can run.
+    :param executor: Runs serialization of the tree. Defaults to the default
+        executor of the event loop, which is a thread pool. The event loop
+        still shares the interpreter with it, but it isn't blocked.
+    """
+    tree = PrefixTree()
+    batch = []  # type: List[str]
+
+    async for word in aiterable:
+        batch.append(word)
+
+        if len(batch) >= batch_size:
+            await _extend(tree, batch, batch_size)
+            batch = []
+
+    await _extend(tree, batch, batch_size)
+    return await _to_regexp(tree, formatter, executor)
+
+
+async def async_stream_to_regexp(
+        stream: Any,
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        encoding: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        executor: Optional[Executor] = None
+) -> str:
+    """Same as `stream_to_regexp`, but reads lines from an asynchronous stream.
+    See `async_iterable_to_regexp` for the other parameters.
+
+    :param stream: Object with a coroutine ``read(size)`` method returning text
+        or bytes, such as ``asyncio.StreamReader``.
+    :param encoding: Used to decode ``bytes`` returned by the stream.
+    :param chunk_size: Number of characters (or bytes) read at once.
+    """
+    tree = PrefixTree()
+    decoder = None
+    pending = ''
+
+    while True:
+        chunk = await stream.read(chunk_size)
+
+        if not chunk:
+            break
+
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+
+        lines, pending = split_lines(pending + chunk)
+        await _extend(tree, lines, batch_size)
+
+    if decoder is not None:
+        pending += decoder.decode(b'', True)
+
+    lines, _ = split_lines(pending + '\n')  # ends the last line
+    await _extend(tree, lines, batch_size)
+    return await _to_regexp(tree, formatter, executor)
@@ -0,0 +1,241 @@
+"""Caches of regular expressions of word lists.
+
+Regular expressions are stored on disk under a digest of the words, the code of
+the formatter and the version of w2re, so a restarted process gets the same
+regular expression without building the tree again. Compiled regular
+expressions are also kept in memory of the process.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from typing import (
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+)
+
+from w2re import __version__
+from w2re.formatters import (
+    BaseFormatter,
+    PythonFormatter,
+)
+from w2re.utils import (
+    ConversionOptions,
+    iterable_to_regexp,
+)
+
+DEFAULT_MAX_CACHE_SIZE = 256 * 2 ** 20  # bytes
+COMPILED_CACHE_SIZE = 32
+_FILE_SUFFIX = '.re'
+
+_COMPILED_PATTERNS = OrderedDict()  # type: OrderedDict
+
+
+def default_cache_directory() -> str:
+    """:return: ``w2re`` directory in ``$XDG_CACHE_HOME`` or ``~/.cache``."""
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+        'w2re'
+    )
+
+
+def words_digest(
+        words: Iterable[str], formatter: Type[BaseFormatter], merge_suffixes: bool = False
+) -> str:
+    """:return: Hexadecimal digest identifying the regular expression of ``words``.
+        Order of words matters, because it changes the order of alternatives.
+        The formatter is identified by its class, because subclasses can
+        format differently with the same code.
+    """
+    digest = hashlib.sha256('{}\0{}\0{}.{}\0{:d}\0'.format(
+        __version__, formatter.code(), formatter.__module__, formatter.__qualname__,
+        merge_suffixes
+    ).encode('utf-8', 'surrogatepass'))
+
+    for word in words:
+        encoded_word = word.encode('utf-8', 'surrogatepass')
+        digest.update(str(len(encoded_word)).encode('ascii') + b':' + encoded_word)
+
+    return digest.hexdigest()
+
+
+class RegexpCache:
+    """Regular expressions stored in files of a directory, by digest.
+
+    Once the files exceed ``max_size`` bytes in total, the least recently used
+    ones are removed. Files are written atomically, so the directory can be
+    shared by multiple processes.
+
+    :param directory: Created if it doesn't exist. Defaults to
+        `default_cache_directory`.
+    :param max_size: Total size of the files in bytes.
+    """
+
+    def __init__(
+            self, directory: Optional[str] = None, max_size: int = DEFAULT_MAX_CACHE_SIZE
+    ) -> None:
+        self.directory = directory or default_cache_directory()
+        self.max_size = max_size
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest + _FILE_SUFFIX)
+
+    def get(self, digest: str) -> Optional[str]:
+        """:return: Stored regular expression, or ``None`` if there is none."""
+        path = self._path(digest)
+
+        try:
+            with open(path, encoding='utf-8', newline='') as cache_file:
+                regexp = cache_file.read()
+
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+
+        return regexp
+
+    def put(self, digest: str, regexp: str) -> None:
+        """Stores the regular expression, unless it is bigger than the cache."""
+        encoded_regexp = regexp.encode('utf-8', 'surrogatepass')
+
+        if len(encoded_regexp) > self.max_size:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            suffix='.tmp', dir=self.directory
+        )
+
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            cache_file.write(encoded_regexp)
+
+        os.replace(temporary_path, self._path(digest))
+        self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """:return: Modification time, size and path of each stored file."""
+        entries = []
+
+        for name in os.listdir(self.directory):
+            if name.endswith(_FILE_SUFFIX):
+                path = os.path.join(self.directory, name)
+
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:  # removed by another process
+                    continue
+
+                entries.append((status.st_mtime, status.st_size, path))
+
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # removed by another process
+                pass
+
+            total_size -= size
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            os.remove(path)
+
+
+def _options_digest(
+        words: List[str], formatter: Type[BaseFormatter], options: ConversionOptions
+) -> str:
+    if options.weighted or options.presort or options.cost_model is not None:
+        raise ValueError(
+            'Only merge_suffixes, jobs and assume_sorted options can be cached.'
+        )
+
+    return words_digest(words, formatter, options.merge_suffixes)
+
+
+def _cached_regexp(
+        words: List[str],
+        digest: str,
+        formatter: Type[BaseFormatter],
+        cache: Optional[RegexpCache],
+        options: ConversionOptions
+) -> str:
+    cache = cache or RegexpCache()
+    regexp = cache.get(digest)
+
+    if regexp is None:
+        regexp = iterable_to_regexp(words, formatter, options)
+        cache.put(digest, regexp)
+
+    return regexp
+
+
+def cached_iterable_to_regexp(
+        iterable: Iterable[str],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        cache: Optional[RegexpCache] = None,
+        options: Optional[ConversionOptions] = None
+) -> str:
+    """Same as `iterable_to_regexp`, but the regular expression is taken from
+    ``cache`` if the same words were converted before. All words are held in
+    memory, because they are hashed before the tree is built.
+
+    :param iterable: Words to convert.
+    :param formatter: Formatter of the regular expression.
+    :param cache: Defaults to a `RegexpCache` in `default_cache_directory`.
+    :param options: `ConversionOptions` other than ``weighted``, ``presort``
+        and ``cost_model``, which change the regular expression of the same
+        words in ways the digest doesn't capture.
+    :raises ValueError: If any of those options is set.
+    """
+    options = options or ConversionOptions()
+    words = list(iterable)
+    digest = _options_digest(words, formatter, options)
+
+    return _cached_regexp(words, digest, formatter, cache, options)
+
+
+def compile_iterable(
+        iterable: Iterable[str],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        flags: int = 0,
+        cache: Optional[RegexpCache] = None,
+        options: Optional[ConversionOptions] = None
+) -> Pattern:
+    """Same as `cached_iterable_to_regexp`, but returns the compiled regular
+    expression. The last `COMPILED_CACHE_SIZE` of them are kept in memory of the
+    process, so the same words are converted and compiled only once.
+    """
+    options = options or ConversionOptions()
+    words = list(iterable)
+    digest = _options_digest(words, formatter, options)
+    key = (digest, flags)
+    compiled = _COMPILED_PATTERNS.get(key)
+
+    if compiled is not None:
+        _COMPILED_PATTERNS.move_to_end(key)
+        return compiled
+
+    compiled = re.compile(_cached_regexp(words, digest, formatter, cache, options), flags)
+    _COMPILED_PATTERNS[key] = compiled
+
+    if len(_COMPILED_PATTERNS) > COMPILED_CACHE_SIZE:
+        _COMPILED_PATTERNS.popitem(last=False)
+
+    return compiled
+
+
+def clear_compiled_cache() -> None:
+    _COMPILED_PATTERNS.clear()
@@ -1,8 +1,14 @@
 #!/usr/bin/python
 import argparse
+import glob
+import os
 import sys
+from contextlib import ExitStack
 from typing import (  # pylint: disable=unused-import; false positive
     Dict,
+    Iterable,
+    List,
+    Optional,
     Type,
 )
 
@@ -11,11 +17,24 @@ from w2re import (
     CHANGELOG_URL,
     __version__ as VERSION
 )
+from w2re.external_sort import iter_sorted_unique
 from w2re.formatters import (  # pylint: disable=unused-import; false positive
     ALL_FORMATTERS,
     BaseFormatter,
+    PythonAtomicFormatter,
+)
+from w2re.prefix_tree.optimizer import COST_MODELS
+from w2re.reading import (
+    iter_files_lines,
+    iter_stream_lines,
+)
+from w2re.sharding import iterable_to_sharded_regexp
+from w2re.stats import collect_stats
+from w2re.utils import (
+    ConversionOptions,
+    files_to_regexp,
+    stream_to_regexp,
 )
-from w2re.utils import stream_to_regexp
 
 FORMATTERS_BY_CODE = {
     formatter.code(): formatter
@@ -29,6 +48,119 @@ APPLICATION_DESCRIPTION = (
 )
 
 
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """:return: Sorted paths matching each glob pattern, in order of patterns.
+        Existing paths are used as they are, even if they contain glob
+        characters, such as ``words[1].txt``.
+    :raises ValueError: If a pattern matches no file.
+    """
+    paths = []  # type: List[str]
+
+    for pattern in patterns:
+        matches = [pattern] if os.path.exists(pattern) else sorted(glob.glob(pattern))
+
+        if not matches:
+            raise ValueError("No input file matches '{}'.".format(pattern))
+
+        paths.extend(matches)
+
+    return paths
+
+
+def validate_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Exits by ``parser.error`` if arguments can't be combined."""
+    if args.jobs < 0:
+        parser.error('number of processes must not be negative')
+
+    if args.merge_suffixes and args.jobs != 1:
+        parser.error('--dafsa can not be combined with -j')
+
+    if args.weighted and (args.merge_suffixes or args.assume_sorted or args.jobs != 1):
+        parser.error('--weighted can not be combined with --dafsa, --sorted or -j')
+
+    if args.presort and (args.assume_sorted or args.weighted):
+        parser.error('--presort can not be combined with --sorted or --weighted')
+
+    if args.max_pattern_size is not None:
+        if args.max_pattern_size <= 0:
+            parser.error('maximal pattern size must be positive')
+
+        if args.merge_suffixes or args.jobs != 1 or args.weighted:
+            parser.error(
+                '--max-pattern-size can not be combined with --dafsa, -j or --weighted'
+            )
+
+    if args.cost_model is not None and (
+            args.merge_suffixes or args.jobs != 1 or args.max_pattern_size is not None
+    ):
+        parser.error(
+            '--optimize can not be combined with --dafsa, -j or --max-pattern-size'
+        )
+
+    if args.formatter == PythonAtomicFormatter.code() and (
+            args.merge_suffixes or args.max_pattern_size is not None
+    ):
+        parser.error('-f {} can not be combined with --dafsa or --max-pattern-size'.format(
+            args.formatter
+        ))
+
+
+def input_paths(
+        parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> Optional[List[str]]:
+    """Exits by ``parser.error`` if stdin is combined with files or a pattern
+    matches no file.
+
+    :return: Paths of input files, or ``None`` to read stdin.
+    """
+    patterns = [pattern for group in args.inputs or () for pattern in group]
+    paths = None  # type: Optional[List[str]]
+
+    if '-' in patterns and patterns != ['-']:
+        parser.error("stdin ('-') can not be combined with other inputs")
+
+    try:
+        if patterns and patterns != ['-']:
+            paths = expand_inputs(patterns)
+    except ValueError as error:
+        parser.error(str(error))
+
+    return paths
+
+
+def convert_inputs(args: argparse.Namespace, paths: Optional[List[str]]) -> str:
+    """Converts lines of files at ``paths``, or of stdin if it is ``None``,
+    as requested by ``args``.
+
+    :raises OSError: If an input can't be read.
+    :raises ValueError: If the input is not valid for ``args``, such as unsorted.
+    """
+    formatter = FORMATTERS_BY_CODE[args.formatter]
+
+    if args.max_pattern_size is not None:
+        lines = iter_stream_lines(sys.stdin) if paths is None else iter_files_lines(paths)
+        return '\n'.join(iterable_to_sharded_regexp(
+            iter_sorted_unique(lines) if args.presort else lines,
+            args.max_pattern_size,
+            formatter,
+            assume_sorted=args.assume_sorted or args.presort
+        ).patterns)
+
+    options = ConversionOptions(
+        merge_suffixes=args.merge_suffixes,
+        jobs=args.jobs or None,
+        assume_sorted=args.assume_sorted,
+        weighted=args.weighted,
+        presort=args.presort,
+        cost_model=None if args.cost_model is None else COST_MODELS[args.cost_model]()
+    )
+
+    if paths is None:
+        return stream_to_regexp(sys.stdin, formatter, options)
+
+    return files_to_regexp(paths, formatter, options)
+
+
 def main(mock_args=None):
     parser = argparse.ArgumentParser(
         description=APPLICATION_DESCRIPTION,
@@ -55,11 +187,95 @@ def main(mock_args=None):
 
     parser.add_argument(
         '-i',
-        dest='input',
-        default=sys.stdin,
+        dest='inputs',
+        default=None,
         metavar='<filename>',
-        type=argparse.FileType('r'),
-        help='Input file. If none specified, stdin will be used instead.'
+        nargs='+',
+        action='append',
+        help='Input files or glob patterns, such as "shards/*.gz". Files\n'
+             'ending with .gz, .bz2 or .xz are decompressed. Files are read\n'
+             'concurrently, but words are added in the order of the files.\n'
+             "If none specified, or only '-', stdin will be used instead."
+    )
+
+    parser.add_argument(
+        '--dafsa',
+        dest='merge_suffixes',
+        default=False,
+        action='store_true',
+        help='Merge common suffixes of words as well as prefixes. All words\n'
+             'are loaded into memory to be sorted.'
+    )
+
+    parser.add_argument(
+        '--sorted',
+        dest='assume_sorted',
+        default=False,
+        action='store_true',
+        help='Input is lexicographically sorted, which makes processing\n'
+             'faster. With --dafsa, words are not loaded into memory.'
+    )
+
+    parser.add_argument(
+        '--presort',
+        dest='presort',
+        default=False,
+        action='store_true',
+        help='Sort words and remove duplicates before they are added,\n'
+             'using temporary files for big inputs, so memory is bounded.\n'
+             'Words are then processed like with --sorted.'
+    )
+
+    parser.add_argument(
+        '--weighted',
+        dest='weighted',
+        default=False,
+        action='store_true',
+        help='Each line is a word, tab and its count, such as number of\n'
+             'its occurrences. Alternatives matching more frequent words\n'
+             'are tried first. Lines without a tab have count 1.'
+    )
+
+    parser.add_argument(
+        '-j',
+        dest='jobs',
+        default=1,
+        metavar='<N>',
+        type=int,
+        help='Number of processes building the prefix tree. Default is 1,\n'
+             '0 uses all CPUs. All words are loaded into memory if not 1.'
+    )
+
+    parser.add_argument(
+        '--max-pattern-size',
+        dest='max_pattern_size',
+        default=None,
+        metavar='<N>',
+        type=int,
+        help='Split the output into regular expressions of at most N\n'
+             'characters, one per line. Each matches words starting with\n'
+             'different letters.'
+    )
+
+    parser.add_argument(
+        '--optimize',
+        dest='cost_model',
+        default=None,
+        metavar='<cost>',
+        choices=sorted(COST_MODELS),
+        help="Factor out common endings of alternatives where it lowers\n"
+             "the cost of the output: 'length' of the regular expression\n"
+             "or estimated 'steps' of matching it. --stats shows saved\n"
+             "bytes."
+    )
+
+    parser.add_argument(
+        '--stats',
+        dest='show_stats',
+        default=False,
+        action='store_true',
+        help='Print counters and times of phases of the conversion\n'
+             'to stderr.'
     )
 
     parser.add_argument(
@@ -71,13 +287,27 @@ def main(mock_args=None):
     )
 
     args = parser.parse_args(mock_args)
+    validate_args(parser, args)
 
     if args.show_version:
         print('{} {}\n\nFor changelog, see: {}'.format(
             APPLICATION_NAME, VERSION, CHANGELOG_URL
         ))
     else:
-        print(stream_to_regexp(args.input, FORMATTERS_BY_CODE[args.formatter]), end='')
+        paths = input_paths(parser, args)
+
+        with ExitStack() as stack:
+            stats = stack.enter_context(collect_stats()) if args.show_stats else None
+
+            try:
+                regexp = convert_inputs(args, paths)
+            except (OSError, ValueError) as error:  # such as unreadable or unsorted input
+                parser.error(str(error))
+
+        if stats is not None:
+            print(stats.report(), file=sys.stderr)
+
+        print(regexp, end='')
 
 
 if __name__ == '__main__':  # pragma: no cover
@@ -0,0 +1,419 @@
+"""Minimal deterministic acyclic finite state automaton (DAFSA) of a list of words.
+
+Unlike `PrefixTree`, which merges only common prefixes, the automaton merges
+common suffixes as well. It is built incrementally from sorted words by the
+algorithm of Daciuk et al.: states of the previous word, which can no longer
+change, are replaced by equivalent states from a register.
+"""
+import re
+from typing import (  # pylint: disable=unused-import; false positive
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from w2re.formatters import BaseFormatter
+from w2re.prefix_tree.letter_range_utils import collapse_letter_ranges
+from w2re.prefix_tree.primitives import RegexpNode
+from w2re.prefix_tree.repetitions import compress
+
+
+class DafsaState(RegexpNode):
+    __slots__ = ('final', 'transitions')
+
+    def __init__(self) -> None:
+        self.final = False
+        self.transitions = {}  # type: Dict[str, DafsaState]
+
+    def signature(self) -> Tuple:
+        """Key identifying equivalent states. Valid only if all target states
+        are already registered.
+        """
+        return self.final, tuple(
+            (character, id(state)) for character, state in self.transitions.items()
+        )
+
+    def copy(self) -> "DafsaState":
+        state = DafsaState()
+        state.final = self.final
+        state.transitions = dict(self.transitions)
+        return state
+
+    def to_regexp(self, atomic: bool = False) -> str:
+        """
+        :raises ValueError: If ``atomic``. Sub-expressions of merged suffixes are
+            followed by other ones, so backtracking into them can lead to a match.
+        """
+        if atomic:
+            raise ValueError('Automata can not be serialized with atomic groups.')
+
+        return _RegexpBuilder(self).build()
+
+
+_SINK = DafsaState()
+"""Virtual state following all final states."""
+
+# groups of transitions with the state where their paths join
+_Branches = List[Tuple[DafsaState, List[Tuple[str, DafsaState]]]]
+# letters of the chain leading to a branching state, the state, its immediate
+# post-dominator and its branches, see `_RegexpBuilder._plan`
+_Plan = Tuple[str, DafsaState, DafsaState, _Branches]
+
+
+class _RegexpBuilder:  # pylint: disable=too-few-public-methods
+    """Converts an automaton into a regular expression, factoring out common
+    suffixes.
+
+    All paths leaving a state pass through its immediate post-dominator. The
+    regular expression of a state is therefore the expression of paths to its
+    immediate post-dominator, followed by the expression of the post-dominator
+    itself. Paths from a state to its post-dominator branch only in the state.
+    """
+
+    def __init__(self, root: DafsaState) -> None:
+        self._root = root
+        self._post_dominators = {}  # type: Dict[int, DafsaState]
+        self._depths = {id(_SINK): 0}  # type: Dict[int, int]
+        self._regexps = {}  # type: Dict[Tuple[int, int], str]
+
+    @staticmethod
+    def _successors(state: DafsaState) -> List[DafsaState]:
+        successors = list(state.transitions.values())
+
+        if state.final:
+            successors.append(_SINK)
+
+        return successors
+
+    def _common_post_dominator(self, first: DafsaState, second: DafsaState) -> DafsaState:
+        while first is not second:
+            if self._depths[id(first)] < self._depths[id(second)]:
+                first, second = second, first
+
+            first = self._post_dominators[id(first)]
+
+        return first
+
+    def _find_post_dominators(self) -> None:
+        visited = {id(self._root)}
+        stack = [(self._root, iter(self._root.transitions.values()))]
+
+        while stack:  # post-order, so successors are processed first
+            state, targets = stack[-1]
+
+            for target in targets:
+                if id(target) not in visited:
+                    visited.add(id(target))
+                    stack.append((target, iter(target.transitions.values())))
+                    break
+            else:
+                stack.pop()
+                successors = self._successors(state)
+                post_dominator = successors[0]
+
+                for successor in successors[1:]:
+                    post_dominator = self._common_post_dominator(post_dominator, successor)
+
+                self._post_dominators[id(state)] = post_dominator
+                self._depths[id(state)] = self._depths[id(post_dominator)] + 1
+
+    def build(self) -> str:
+        if not self._root.transitions:
+            return ''
+
+        self._find_post_dominators()
+        return self._paths_regexp(self._root, _SINK)
+
+    def _paths_regexp(self, state: DafsaState, end: DafsaState) -> str:
+        """
+        :return: Regular expression of all paths from ``state`` to ``end``, which
+            must post-dominate it.
+        """
+        # each pair of states is planned when it is first on the top of the
+        # stack and joined when expressions of all pairs it needs are known
+        stack = [(state, end)]
+        plans = {}  # type: Dict[Tuple[int, int], _Plan]
+
+        while stack:
+            start, stop = stack[-1]
+            key = (id(start), id(stop))
+
+            if key in self._regexps:
+                stack.pop()
+                continue
+
+            plan = plans.get(key)
+
+            if plan is None:
+                plan = plans[key] = self._plan(start, stop)
+                missing = [
+                    pair for pair in self._needed_pairs(plan, stop)
+                    if (id(pair[0]), id(pair[1])) not in self._regexps
+                ]
+
+                if missing:
+                    stack.extend(missing)
+                    continue
+
+            self._regexps[key] = self._join(plan, stop)
+            del plans[key]
+            stack.pop()
+
+        return self._regexps[(id(state), id(end))]
+
+    def _plan(self, state: DafsaState, end: DafsaState) -> _Plan:
+        """Follows the chain of states without branching from ``state`` and
+        groups branches of the state it ends in, see `_branch_groups`.
+        """
+        characters = []  # type: List[str]
+
+        while state is not end and not state.final and len(state.transitions) == 1:
+            (character, state), = state.transitions.items()
+            characters.append(character)
+
+        prefix = compress(re.escape(''.join(characters))) if characters else ''
+
+        if state is end:
+            return prefix, state, end, []
+
+        post_dominator = self._post_dominators[id(state)]
+        return prefix, state, post_dominator, self._branch_groups(state, post_dominator)
+
+    @staticmethod
+    def _needed_pairs(plan: _Plan, end: DafsaState) -> List[Tuple[DafsaState, DafsaState]]:
+        """:return: Pairs of states with paths joined by `_join`."""
+        _, state, post_dominator, groups = plan
+
+        if state is end:
+            return []
+
+        pairs = [
+            (target, join)
+            for join, transitions in groups
+            for _, target in transitions
+            if target is not join
+        ]
+        pairs.extend(
+            (join, post_dominator) for join, _ in groups if join is not post_dominator
+        )
+
+        if post_dominator is not end:
+            pairs.append((post_dominator, end))
+
+        return pairs
+
+    def _join(self, plan: _Plan, end: DafsaState) -> str:
+        prefix, state, post_dominator, groups = plan
+
+        if state is end:
+            return prefix
+
+        regexp = prefix + self._branches_regexp(state, post_dominator, groups)
+
+        if post_dominator is not end:
+            regexp += self._regexps[(id(post_dominator), id(end))]
+
+        return regexp
+
+    def _post_dominator_chain(self, state: DafsaState, end: DafsaState) -> List[DafsaState]:
+        chain = []  # type: List[DafsaState]
+
+        while state is not end:
+            chain.append(state)
+            state = self._post_dominators[id(state)]
+
+        return chain
+
+    def _branch_groups(self, state: DafsaState, end: DafsaState) -> _Branches:
+        """Paths of some branches may join before ``end``, such as in 'foo.org'
+        and 'bar.org'. Such branches are grouped by the first state they share
+        with other branches, so that the rest is written only once.
+
+        :return: Groups of transitions of ``state`` with the state they join in.
+        """
+        chains = {}  # type: Dict[int, List[DafsaState]]
+        branch_counts = {}  # type: Dict[int, int]
+
+        for target in state.transitions.values():
+            if id(target) not in chains:
+                chains[id(target)] = self._post_dominator_chain(target, end)
+
+            for joined_state in chains[id(target)]:
+                branch_counts[id(joined_state)] = branch_counts.get(id(joined_state), 0) + 1
+
+        groups = {}  # type: Dict[int, Tuple[DafsaState, List[Tuple[str, DafsaState]]]]
+
+        for character, target in state.transitions.items():
+            join = end
+
+            for joined_state in chains[id(target)]:
+                if branch_counts[id(joined_state)] > 1:
+                    join = joined_state
+                    break
+
+            groups.setdefault(id(join), (join, []))[1].append((character, target))
+
+        return list(groups.values())
+
+    def _alternatives_regexp(
+            self, transitions: List[Tuple[str, DafsaState]], end: DafsaState
+    ) -> Tuple[List[str], bool]:
+        """
+        :return: Alternatives of paths starting with ``transitions`` and
+            ending in ``end``, and whether the only alternative is a single
+            letter or a class of letters.
+        """
+        # group characters by the rest of the paths, so that 'cat' and 'bat'
+        # become '[bc]at'
+        characters_by_rest = {}  # type: Dict[str, List[str]]
+
+        for character, target in transitions:
+            rest = self._regexps[(id(target), id(end))] if target is not end else ''
+            characters_by_rest.setdefault(rest, []).append(character)
+
+        alternatives = []  # type: List[str]
+
+        for rest, characters in characters_by_rest.items():
+            if len(characters) == 1:
+                alternatives.append(re.escape(characters[0]) + rest)
+            else:
+                alternatives.append(
+                    '[' + ''.join(collapse_letter_ranges(characters)) + ']' + rest
+                )
+
+        return alternatives, len(alternatives) == 1 and '' in characters_by_rest
+
+    def _branches_regexp(
+            self,
+            state: DafsaState,
+            end: DafsaState,
+            groups: _Branches
+    ) -> str:
+        if not state.transitions:  # final state ending the longest words
+            return ''
+
+        alternatives = []  # type: List[str]
+        is_atom = False
+
+        for join, transitions in groups:
+            group_alternatives, is_atom = self._alternatives_regexp(transitions, join)
+
+            if len(group_alternatives) > 1:
+                alternative = '(?:' + '|'.join(group_alternatives) + ')'
+            else:
+                alternative = group_alternatives[0]
+
+            if join is not end:
+                alternative += self._regexps[(id(join), id(end))]
+                is_atom = False
+
+            alternatives.append(alternative)
+
+        if len(alternatives) > 1:
+            return '(?:' + '|'.join(alternatives) + ')' + ('?' if state.final else '')
+
+        if not state.final:
+            return alternatives[0]
+
+        if is_atom:
+            return alternatives[0] + '?'
+
+        return '(?:' + alternatives[0] + ')?'
+
+
+class Dafsa:
+    """Minimal automaton of a list of words, with the same interface as `PrefixTree`.
+
+    Words must be added in lexicographical order.
+    """
+
+    def __init__(self, words: Optional[Iterable[str]] = None) -> None:
+        self._root = DafsaState()
+        self._register = {}  # type: Dict[Tuple, DafsaState]
+        # transitions of the last word, which are not minimized yet
+        self._unchecked = []  # type: List[Tuple[DafsaState, str, DafsaState]]
+        self._previous_word = ''
+        self._minimized = False
+
+        if words is not None:
+            self.extend(words)
+
+    def _minimize(self, down_to: int) -> None:
+        while len(self._unchecked) > down_to:
+            parent, character, child = self._unchecked.pop()
+            signature = child.signature()
+
+            if signature in self._register:
+                parent.transitions[character] = self._register[signature]
+            else:
+                self._register[signature] = child
+
+    def _reopen_previous_word(self) -> None:
+        """Replaces states of the previous word with unregistered copies, so
+        that they can be modified again.
+        """
+        state = self._root
+
+        for character in self._previous_word:
+            child = state.transitions[character].copy()
+            state.transitions[character] = child
+            self._unchecked.append((state, character, child))
+            state = child
+
+        self._minimized = False
+
+    def add(self, word: str) -> None:
+        """
+        :raises ValueError: If the word is lexicographically smaller than the
+            previous one.
+        """
+        if not word or word == self._previous_word:
+            return
+
+        if word < self._previous_word:
+            raise ValueError(
+                "Words must be sorted, but '{}' follows '{}'.".format(
+                    word, self._previous_word
+                )
+            )
+
+        if self._minimized:
+            self._reopen_previous_word()
+
+        common_prefix_length = 0
+
+        for previous_character, character in zip(self._previous_word, word):
+            if previous_character != character:
+                break
+
+            common_prefix_length += 1
+
+        self._minimize(common_prefix_length)
+        state = self._unchecked[-1][2] if self._unchecked else self._root
+
+        for character in word[common_prefix_length:]:
+            child = DafsaState()
+            state.transitions[character] = child
+            self._unchecked.append((state, character, child))
+            state = child
+
+        state.final = True
+        self._previous_word = word
+
+    def extend(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.add(word)
+
+    def to_regexp(self, formatter: Type[BaseFormatter]) -> str:
+        """
+        :return Returns regular expression representation of the structure.
+        If the structure is empty, returns regular expression matching
+        empty string.
+        :raises ValueError: If the formatter needs atomic groups.
+        """
+        self._minimize(0)
+        self._minimized = True
+        return formatter.wrap_regexp(self._root)
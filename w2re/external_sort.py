@@ -0,0 +1,96 @@
+"""Sorting of words in bounded memory by external merge sort.
+
+Unsorted words with many duplicates are added to a tree faster once they are
+sorted and unique, see `PrefixTree.extend_sorted`. Sorting them in memory would
+hold all of them at once, so sorted runs are written to temporary files instead
+and merged lazily.
+"""
+import heapq
+import pickle
+import tempfile
+from contextlib import ExitStack
+from typing import (  # pylint: disable=unused-import; false positive
+    AnyStr,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+from w2re.stats import active_stats
+
+DEFAULT_RUN_SIZE = 1000000  # unique words sorted in memory by iter_sorted_unique
+
+_RUN_BLOCK_SIZE = 1000  # words pickled at once into temporary files
+
+
+def iter_sorted_unique(
+        words: Iterable[AnyStr],
+        run_size: int = DEFAULT_RUN_SIZE,
+        temp_dir: Optional[str] = None
+) -> Iterator[AnyStr]:
+    """Sorts words lexicographically and skips duplicates by external merge sort,
+    so that any number of words is sorted in bounded memory.
+
+    Unique words are collected until there are ``run_size`` of them. If more
+    follow, each such run is sorted and written to a temporary file, and runs
+    are merged lazily, holding only a block of words from each of them in
+    memory. Words are returned without temporary files if they fit into a
+    single run.
+
+    :param words: Strings or ``bytes``, but not both.
+    :param run_size: Number of unique words sorted in memory at once.
+    :param temp_dir: Directory of temporary files, see ``tempfile``. Files are
+        deleted as soon as the iterator is exhausted or closed.
+    :return: Iterator of sorted unique words, which can be added by
+        `PrefixTree.extend_sorted`.
+    """
+    stats = active_stats()
+
+    with ExitStack() as stack:
+        runs = []  # type: List[IO]
+        run = set()  # type: Set[AnyStr]
+
+        for word in words:
+            run.add(word)
+
+            if len(run) >= run_size:
+                run_file = stack.enter_context(tempfile.TemporaryFile(dir=temp_dir))
+                _write_run(run_file, sorted(run))
+                runs.append(run_file)
+                run = set()
+
+        if stats is not None:
+            stats.count('presort runs', len(runs))
+
+        if not runs:
+            yield from sorted(run)
+            return
+
+        previous = None  # type: Optional[AnyStr]
+        sorted_runs = [sorted(run)]  # type: List[Iterable[AnyStr]]
+        sorted_runs.extend(_read_run(run_file) for run_file in runs)
+
+        for word in heapq.merge(*sorted_runs):
+            if word != previous:
+                yield word
+                previous = word
+
+
+def _write_run(run_file: IO, words: List[AnyStr]) -> None:
+    for start in range(0, len(words), _RUN_BLOCK_SIZE):
+        pickle.dump(words[start:start + _RUN_BLOCK_SIZE], run_file, pickle.HIGHEST_PROTOCOL)
+
+    run_file.seek(0)
+
+
+def _read_run(run_file: IO) -> Iterator[AnyStr]:
+    while True:
+        try:
+            block = pickle.load(run_file)  # type: List[AnyStr]
+        except EOFError:
+            return
+
+        yield from block
@@ -1,4 +1,13 @@
-from w2re.prefix_tree.primitives import PrefixTreeNode
+import sys
+from typing import (  # pylint: disable=unused-import; false positive
+    Tuple,
+    Type,
+)
+
+from w2re.prefix_tree.primitives import (
+    BYTES_ENCODING,
+    RegexpNode,
+)
 
 
 class BaseFormatter:
@@ -6,7 +15,7 @@ class BaseFormatter:
     _CODE = ''
 
     @staticmethod
-    def wrap_regexp(root_node: PrefixTreeNode) -> str:
+    def wrap_regexp(root_node: RegexpNode) -> str:
         raise NotImplementedError()
 
     @classmethod
@@ -26,7 +35,7 @@ class PythonFormatter(BaseFormatter):
     _EMPTY_STRING_MATCH = r"\A\Z"
 
     @staticmethod
-    def wrap_regexp(root_node: PrefixTreeNode) -> str:
+    def wrap_regexp(root_node: RegexpNode) -> str:
         regexp = root_node.to_regexp()
 
         if regexp:
@@ -40,7 +49,7 @@ class PythonWordMatchFormatter(PythonFormatter):
     _CODE = 'pyw'
 
     @staticmethod
-    def wrap_regexp(root_node: PrefixTreeNode) -> str:
+    def wrap_regexp(root_node: RegexpNode) -> str:
         regexp = root_node.to_regexp()
 
         if regexp:
@@ -49,4 +58,44 @@ class PythonWordMatchFormatter(PythonFormatter):
         return PythonFormatter._EMPTY_STRING_MATCH
 
 
-ALL_FORMATTERS = (PythonFormatter, PythonWordMatchFormatter)
+class PythonAtomicFormatter(PythonFormatter):
+    """Same matches as `PythonFormatter`, but non-matching strings are rejected
+    sooner, see ``atomic`` of `RegexpEmitter`. Requires Python 3.11 or newer,
+    so it is in `ALL_FORMATTERS` only there.
+    """
+
+    _DESCRIPTION = 'Python 3.11+ regular expression with atomic groups'
+    _CODE = 'pya'
+
+    @staticmethod
+    def wrap_regexp(root_node: RegexpNode) -> str:
+        regexp = root_node.to_regexp(atomic=True)
+
+        if regexp:
+            return regexp
+
+        return PythonFormatter._EMPTY_STRING_MATCH
+
+
+class PythonBytesFormatter(PythonFormatter):
+    """Same as `PythonFormatter`, but `wrap_bytes_regexp` returns a ``bytes``
+    regular expression, for trees of ``bytes`` words, see
+    `w2re.prefix_tree.bytes_tree`.
+    """
+
+    _DESCRIPTION = 'Python regular expression of bytes'
+    _CODE = 'pyb'
+
+    @staticmethod
+    def wrap_bytes_regexp(root_node: RegexpNode) -> bytes:
+        return PythonFormatter.wrap_regexp(root_node).encode(BYTES_ENCODING)
+
+
+# formatters of str regular expressions, offered by the command line, atomic
+# groups only where ``re`` supports them
+ALL_FORMATTERS = (
+    PythonFormatter, PythonWordMatchFormatter
+)  # type: Tuple[Type[BaseFormatter], ...]
+
+if sys.version_info >= (3, 11):  # pragma: no cover; depends on the Python version
+    ALL_FORMATTERS += (PythonAtomicFormatter,)
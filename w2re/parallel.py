@@ -0,0 +1,120 @@
+"""Conversion of words into a regular expression using multiple processes.
+
+Sub-trees of the root of a prefix tree are independent of each other, because
+each edge of the root starts with a different letter. Words are therefore split
+by their first letter, sub-trees are built and serialized in separate processes
+and only the alternation of the root is assembled at the end.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import (  # pylint: disable=unused-import; false positive
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from w2re.formatters import (
+    BaseFormatter,
+    PythonAtomicFormatter,
+    PythonFormatter,
+)
+from w2re.prefix_tree.emitter import (
+    RegexpEmitter,
+    join_fragments,
+)
+from w2re.prefix_tree.primitives import (
+    PrefixTreeNode,
+    PrerenderedNode,
+)
+
+_ATOMIC_EMITTER = RegexpEmitter(atomic=True)
+
+
+def partition_by_first_letter(words: Iterable[str]) -> List[List[str]]:
+    """
+    :return: Non-empty words grouped by their first letter, in order of first
+        appearance of the letter.
+    """
+    partitions = {}  # type: Dict[str, List[str]]
+
+    for word in words:
+        if word:
+            partitions.setdefault(word[0], []).append(word)
+
+    return list(partitions.values())
+
+
+def subtree_to_regexp(words: List[str], atomic: bool = False) -> Tuple[int, str]:
+    """
+    :param words: Non-empty words starting with the same letter.
+    :param atomic: See `RegexpEmitter`.
+    :return: Key ordering alternatives of the root of an atomic regular
+        expression, see `RegexpEmitter.root_alternative`, 0 otherwise, and regular
+        expression of the only edge of the root of their prefix tree.
+    """
+    root = PrefixTreeNode()
+
+    for word in words:
+        root.add(word)
+
+    # words start with the same letter, so the root has a single edge
+    edge = next(iter(root._edges.values()))  # pylint: disable=protected-access
+
+    if atomic:
+        key, fragment = _ATOMIC_EMITTER.root_alternative(
+            edge._label, edge._target_node  # pylint: disable=protected-access
+        )
+        return key, join_fragments(fragment)
+
+    return 0, edge.to_regexp()
+
+
+def parallel_iterable_to_regexp(
+        iterable: Iterable[str],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        jobs: Optional[int] = None
+) -> str:
+    """Same as `iterable_to_regexp`, but builds sub-trees of the root in
+    ``jobs`` processes. All words are held in memory.
+
+    Words are split only by their first letter, so there is no speed up if most
+    of them start with the same one.
+
+    :param iterable: Words to convert.
+    :param formatter: Formatter of the regular expression.
+    :param jobs: Number of processes. Defaults to the number of CPUs, as does 0.
+        With 1, no process is started.
+    :raises ValueError: If ``jobs`` is negative.
+    """
+    if jobs is not None and jobs < 0:
+        raise ValueError('Number of processes must not be negative, got {}.'.format(jobs))
+
+    partitions = partition_by_first_letter(iterable)
+    atomic = issubclass(formatter, PythonAtomicFormatter)
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(partitions) <= 1:
+        edge_regexps = [subtree_to_regexp(words, atomic) for words in partitions]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(partitions))) as executor:
+            # submit the biggest partitions first, so that no process is left
+            # with a big one at the end
+            futures = {
+                id(words): executor.submit(subtree_to_regexp, words, atomic)
+                for words in sorted(partitions, key=len, reverse=True)
+            }
+            edge_regexps = [futures[id(words)].result() for words in partitions]
+
+    if atomic:
+        root_fragment = _ATOMIC_EMITTER.combine_root(edge_regexps, False)
+    else:
+        root_fragment = RegexpEmitter().combine(
+            [regexp for _, regexp in edge_regexps], False
+        )
+
+    return formatter.wrap_regexp(PrerenderedNode(join_fragments(root_fragment), atomic))
@@ -0,0 +1,95 @@
+"""Prefix trees of ``bytes`` words, converted into ``bytes`` regular expressions.
+
+Nodes and edges are the same as those of `PrefixTree`, only their labels are
+``bytes``, so words read from binary streams are never decoded. Each byte is
+serialized as the letter with the same code point, 0 to 255, and the regular
+expression is then encoded by ``latin-1`` (see `PythonBytesFormatter`). This
+maps letters back to the same bytes, so bytes are escaped exactly like by
+``re.escape`` of ``bytes`` and character sets can contain any byte value.
+"""
+import re
+from functools import lru_cache
+from typing import (
+    Any,
+    Iterable,
+    Optional,
+    Type,
+    Union,
+)
+
+from w2re.formatters import (
+    BaseFormatter,
+    PythonBytesFormatter,
+)
+from w2re.prefix_tree.emitter import (
+    LABEL_CACHE_SIZE,
+    Fragment,
+    RegexpEmitter,
+    concatenate,
+)
+from w2re.prefix_tree.primitives import BYTES_ENCODING
+from w2re.prefix_tree.repetitions import compress
+from w2re.prefix_tree.tree import BasePrefixTree
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def escape_bytes_label(label: bytes) -> str:
+    """Same as `escape_label`, but cached by ``bytes`` labels of the tree, whose
+    hashes are computed only once, unlike those of decoded labels.
+    """
+    return compress(re.escape(label.decode(BYTES_ENCODING)))
+
+
+class BytesRegexpEmitter(RegexpEmitter):
+    """Serializes trees with ``bytes`` labels into regular expressions of letters
+    with code points of the bytes, see `w2re.prefix_tree.bytes_tree`.
+    """
+
+    @staticmethod
+    def edge_fragment(label: Any, from_below: Fragment) -> Fragment:
+        if not from_below:  # target node is leaf
+            if len(label) <= 1:  # don't escape single characters
+                return label.decode(BYTES_ENCODING)
+
+            return escape_bytes_label(label)
+
+        return concatenate([escape_bytes_label(label), from_below])
+
+
+_BYTES_EMITTER = BytesRegexpEmitter()
+
+
+class BytesPrefixTree(BasePrefixTree[bytes]):
+    """Same as `PrefixTree`, but words are ``bytes``.
+
+    Other formatters than `PythonBytesFormatter` return ``str`` regular
+    expressions, with letters of the code points of the bytes. Atomic groups
+    are not supported. Unlike `PrefixTree`, it can't be saved, the file format
+    holds only ``str`` words.
+    """
+
+    def __init__(
+            self, words: Optional[Iterable[bytes]] = None, cache_regexp: bool = False
+    ) -> None:
+        super().__init__(words)
+
+        if cache_regexp:
+            self._emitter = BytesRegexpEmitter(cache_fragments=True)
+
+    def to_regexp(
+            self,
+            formatter: Type[BaseFormatter] = PythonBytesFormatter,
+            emitter: Optional[RegexpEmitter] = None
+    ) -> Union[bytes, str]:
+        """
+        :param formatter: `PythonBytesFormatter` or a formatter of ``str``
+            regular expressions.
+        :param emitter: Custom `BytesRegexpEmitter`.
+        :return: ``bytes`` regular expression from `PythonBytesFormatter`.
+        """
+        root_node = self._regexp_node(emitter or self._emitter or _BYTES_EMITTER)
+
+        if issubclass(formatter, PythonBytesFormatter):
+            return formatter.wrap_bytes_regexp(root_node)
+
+        return formatter.wrap_regexp(root_node)
@@ -0,0 +1,292 @@
+"""Prefix tree stored in flat arrays instead of a Python object per node and edge.
+
+Nodes and edges are integer indices into parallel arrays. Children of a node are
+linked through their edges, in the order of insertion. Most nodes have only a few
+children, which are searched for the first letter of a word one by one. Children
+of nodes with many of them are also indexed in a dict. Labels are stored as
+slices of a single buffer, so splitting an edge never copies them. The buffer
+uses one byte per letter until a letter outside of Latin-1 is added, four after.
+"""
+from array import array
+from typing import (  # pylint: disable=unused-import; false positive
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
+
+from w2re.formatters import BaseFormatter
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.primitives import RegexpNode
+
+_NARROW_ENCODING = 'latin-1'
+_WIDE_ENCODING = 'utf-32-le'
+_WIDE_CHARACTER_SIZE = 4  # bytes per letter in _WIDE_ENCODING
+_ERRORS = 'surrogatepass'  # lone surrogates are valid letters of words
+_NO_EDGE = -1
+_ROOT = 0
+_MAX_CHARACTER = 0x110000  # keys of different nodes never collide
+_MAX_SCANNED_EDGES = 8
+
+
+class IndexedPrefixTree:
+    """Prefix tree whose nodes are integer indices, serialized by
+    `CompactRegexpEmitter`.
+    """
+
+    __slots__ = ()
+
+    def edges(self, node: int) -> Sequence[Tuple[str, int]]:
+        """
+        :return: Pairs of edge label and target node of all edges leaving ``node``,
+            in the order of insertion.
+        """
+        raise NotImplementedError()
+
+    def is_terminal(self, node: int) -> bool:
+        raise NotImplementedError()
+
+
+class CompactPrefixTree(IndexedPrefixTree):  # pylint: disable=too-many-instance-attributes
+    """Prefix tree with the same interface as `PrefixTree`, using several times
+    less memory.
+    """
+
+    __slots__ = (
+        '_terminal', '_first_edge', '_last_edge',
+        '_edge_target', '_edge_next', '_edge_letter', '_label_start', '_label_length',
+        '_labels', '_encoding', '_character_size', '_indexed_nodes', '_edges_by_letter',
+    )
+
+    def __init__(self, words: Optional[Iterable[str]] = None) -> None:
+        # nodes
+        self._terminal = bytearray()
+        self._first_edge = array('i')
+        self._last_edge = array('i')
+        # edges
+        self._edge_target = array('i')
+        self._edge_next = array('i')
+        self._edge_letter = array('I')  # code point of the first letter of label
+        self._label_start = array('q')
+        self._label_length = array('i')
+        self._labels = bytearray()
+        self._encoding = _NARROW_ENCODING
+        self._character_size = 1
+        self._indexed_nodes = set()  # type: Set[int]
+        self._edges_by_letter = {}  # type: Dict[int, int]
+
+        self._new_node(False)
+
+        if words is not None:
+            self.extend(words)
+
+    def _new_node(self, terminal: bool) -> int:
+        self._terminal.append(terminal)
+        self._first_edge.append(_NO_EDGE)
+        self._last_edge.append(_NO_EDGE)
+        return len(self._terminal) - 1
+
+    def _new_edge(
+            self, node: int, label_start: int, label_length: int, target: int
+    ) -> None:
+        edge = len(self._edge_target)
+        letter = self._letter(label_start)
+        self._edge_target.append(target)
+        self._edge_next.append(_NO_EDGE)
+        self._edge_letter.append(letter)
+        self._label_start.append(label_start)
+        self._label_length.append(label_length)
+
+        if self._last_edge[node] == _NO_EDGE:
+            self._first_edge[node] = edge
+        else:
+            self._edge_next[self._last_edge[node]] = edge
+
+        self._last_edge[node] = edge
+
+        if node in self._indexed_nodes:
+            self._edges_by_letter[node * _MAX_CHARACTER + letter] = edge
+
+    def _new_leaf_edge(self, node: int, encoded_word: bytes, position: int) -> None:
+        label_start = len(self._labels) // self._character_size
+        label = encoded_word[position * self._character_size:]
+        self._labels += label
+        label_length = len(label) // self._character_size
+        self._new_edge(node, label_start, label_length, self._new_node(True))
+
+    def _letter(self, position: int) -> int:
+        """:return: Code point of the letter at ``position`` of the label buffer."""
+        offset = position * self._character_size
+        return int.from_bytes(self._labels[offset:offset + self._character_size], 'little')
+
+    def _find_edge(self, node: int, letter: int) -> Optional[int]:
+        if node in self._indexed_nodes:
+            return self._edges_by_letter.get(node * _MAX_CHARACTER + letter)
+
+        edge = self._first_edge[node]
+        edge_count = 0
+
+        while edge != _NO_EDGE:
+            if self._edge_letter[edge] == letter:
+                return edge
+
+            edge = self._edge_next[edge]
+            edge_count += 1
+
+        if edge_count >= _MAX_SCANNED_EDGES:  # too many to be searched one by one
+            self._indexed_nodes.add(node)
+            edge = self._first_edge[node]
+
+            while edge != _NO_EDGE:
+                key = node * _MAX_CHARACTER + self._edge_letter[edge]
+                self._edges_by_letter[key] = edge
+                edge = self._edge_next[edge]
+
+        return None
+
+    def label(self, edge: int) -> str:
+        start = self._label_start[edge] * self._character_size
+        end = start + self._label_length[edge] * self._character_size
+        return self._labels[start:end].decode(self._encoding, _ERRORS)
+
+    def edges(self, node: int) -> List[Tuple[str, int]]:
+        """
+        :return: Pairs of edge label and target node of all edges leaving ``node``,
+            in the order of insertion.
+        """
+        edges = []  # type: List[Tuple[str, int]]
+        edge = self._first_edge[node]
+
+        while edge != _NO_EDGE:
+            edges.append((self.label(edge), self._edge_target[edge]))
+            edge = self._edge_next[edge]
+
+        return edges
+
+    def is_terminal(self, node: int) -> bool:
+        return bool(self._terminal[node])
+
+    def _split_edge(self, edge: int, position: int) -> int:
+        """Splits the edge after ``position`` letters of its label.
+
+        :return: The new node in the middle of the edge.
+        """
+        middle_node = self._new_node(False)
+        self._new_edge(
+            middle_node,
+            self._label_start[edge] + position,
+            self._label_length[edge] - position,
+            self._edge_target[edge],
+        )
+        self._label_length[edge] = position
+        self._edge_target[edge] = middle_node
+        return middle_node
+
+    def _widen_labels(self) -> None:
+        self._labels = bytearray(
+            self._labels.decode(_NARROW_ENCODING).encode(_WIDE_ENCODING, _ERRORS)
+        )
+        self._encoding = _WIDE_ENCODING
+        self._character_size = _WIDE_CHARACTER_SIZE
+
+    def add(self, word: str) -> None:
+        try:
+            encoded_word = word.encode(self._encoding, _ERRORS)
+        except UnicodeEncodeError:
+            self._widen_labels()
+            encoded_word = word.encode(self._encoding, _ERRORS)
+
+        node = _ROOT
+        position = 0
+
+        while position < len(word):
+            edge = self._find_edge(node, ord(word[position]))
+
+            if edge is None:  # no edge starting with the same letter, new branch
+                self._new_leaf_edge(node, encoded_word, position)
+                return
+
+            label_length = self._label_length[edge]
+            label_start = self._label_start[edge] * self._character_size
+            label_end = label_start + label_length * self._character_size
+            word_start = position * self._character_size
+
+            if self._labels[label_start:label_end] == \
+                    encoded_word[word_start:word_start + label_end - label_start]:
+                common_length = label_length  # whole label matches
+            else:
+                label = self.label(edge)
+                common_length = 1
+                remaining_length = min(label_length, len(word) - position)
+
+                while common_length < remaining_length and \
+                        label[common_length] == word[position + common_length]:
+                    common_length += 1
+
+            position += common_length
+
+            if common_length < label_length:  # word leaves the edge or ends on it
+                node = self._split_edge(edge, common_length)
+
+                if position < len(word):
+                    self._new_leaf_edge(node, encoded_word, position)
+                else:
+                    self._terminal[node] = True
+
+                return
+
+            node = self._edge_target[edge]
+
+        if node != _ROOT:
+            self._terminal[node] = True
+
+    def extend(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.add(word)
+
+    def to_regexp(self, formatter: Type[BaseFormatter]) -> str:
+        """
+        :return Returns regular expression representation of the structure.
+        If the structure is empty, returns regular expression matching
+        empty string.
+        """
+        return formatter.wrap_regexp(CompactPrefixTreeNode(self, _ROOT))
+
+
+class CompactRegexpEmitter(RegexpEmitter):
+    """Serializes a `CompactPrefixTree` or another `IndexedPrefixTree`."""
+
+    def __init__(
+            self,
+            tree: IndexedPrefixTree,
+            share_subtrees: bool = False,
+            atomic: bool = False
+    ) -> None:
+        super().__init__(share_subtrees, atomic=atomic)
+        self._tree = tree
+
+    def edges(self, node: int) -> Sequence[Tuple[str, int]]:
+        return self._tree.edges(node)
+
+    def is_terminal(self, node: int) -> bool:
+        return self._tree.is_terminal(node)
+
+
+class CompactPrefixTreeNode(RegexpNode):  # pylint: disable=too-few-public-methods
+    """Node of a `CompactPrefixTree` or `MappedPrefixTree`, which can be passed to
+    formatters.
+    """
+
+    __slots__ = ('_tree', '_index')
+
+    def __init__(self, tree: IndexedPrefixTree, index: int) -> None:
+        self._tree = tree
+        self._index = index
+
+    def to_regexp(self, atomic: bool = False) -> str:
+        """:param atomic: See `RegexpEmitter`."""
+        return CompactRegexpEmitter(self._tree, atomic=atomic).emit(self._index)
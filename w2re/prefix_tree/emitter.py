@@ -0,0 +1,459 @@
+"""Serialization of prefix trees into regular expressions.
+
+Regular expressions of sub-trees are built from fragments, nested lists of
+strings, which are joined only once at the end, see `RegexpEmitter`. Escaped
+labels are cached, because the same labels repeat across the tree.
+"""
+import re
+from functools import lru_cache
+from operator import itemgetter
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from w2re.prefix_tree.letter_range_utils import collapse_letter_ranges
+from w2re.prefix_tree.repetitions import compress
+
+
+Fragment = Union[str, List[Any]]
+"""Part of a regular expression: either a string or a (nested) list of fragments."""
+
+_MAX_JOINED_FRAGMENT_LENGTH = 256
+LABEL_CACHE_SIZE = 2 ** 16
+_LEAF = -1  # ID of all leaf sub-trees
+
+
+def concatenate(fragments: List[Fragment]) -> Fragment:
+    """Concatenates fragments into a new one.
+
+    Short strings are joined right away, because it is cheaper than keeping them
+    apart. Longer ones are only referenced, so no part of the output is copied
+    on every level of the tree.
+    """
+    strings = fragments  # type: Any  # joined unless some are nested
+    try:
+        joined = ''.join(strings)
+    except TypeError:  # some fragments are already nested
+        return fragments
+
+    return joined if len(joined) <= _MAX_JOINED_FRAGMENT_LENGTH else [joined]
+
+
+def join_fragments(fragment: Fragment) -> str:
+    """Joins nested fragments into a single string, without recursion."""
+    if isinstance(fragment, str):
+        return fragment
+
+    chunks = []  # type: List[str]
+    stack = [iter(fragment)]
+
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, str):
+                chunks.append(part)
+            else:
+                stack.append(iter(part))
+                break
+        else:
+            stack.pop()
+
+    return ''.join(chunks)
+
+
+def fragment_length(fragment: Fragment) -> int:
+    """:return: Length of the string `join_fragments` would return."""
+    if isinstance(fragment, str):
+        return len(fragment)
+
+    length = 0
+    stack = [fragment]
+
+    while stack:
+        for part in stack.pop():
+            if isinstance(part, str):
+                length += len(part)
+            else:
+                stack.append(part)
+
+    return length
+
+
+class CacheStats:
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self, hits: int = 0, misses: int = 0) -> None:
+        self.hits = hits
+        self.misses = misses
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self) -> str:
+        return '{}(hits={}, misses={}, hit_rate={:.2%})'.format(
+            self.__class__.__name__, self.hits, self.misses, self.hit_rate
+        )
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def escape_label(label: str) -> str:
+    """Escapes and compresses an edge label. The same labels repeat across the
+    tree, so the most recent results are cached.
+    """
+    return compress(re.escape(label))
+
+
+def label_cache_stats() -> CacheStats:
+    cache_info = escape_label.cache_info()
+    return CacheStats(cache_info.hits, cache_info.misses)
+
+
+class RegexpEmitter:
+    """Serializes a prefix tree into a regular expression.
+
+    The tree is walked in post-order with an explicit stack, so its depth is not
+    limited by the recursion limit. Regular expressions of sub-trees are kept
+    as nested lists of fragments (see `concatenate`), which are joined only once
+    at the end. This avoids copying the output of every sub-tree on each level
+    of the tree.
+
+    Sub-classes can serialize other tree representations by overriding `edges`
+    and `is_terminal`, and `cached_fragment` with `store_fragment` to cache
+    fragments.
+
+    :param share_subtrees: Serialize structurally identical sub-trees only once.
+        Each sub-tree is identified by its labels and IDs of its children, which
+        costs extra memory. Hits and misses are counted in `subtree_stats`.
+    :param cache_fragments: Keep fragments of sub-trees in their root nodes and
+        serialize again only sub-trees changed since. Nodes must be invalidated
+        on changes. Can't be combined with ``share_subtrees``.
+    :param atomic: Use atomic groups and possessive quantifiers below the root,
+        supported by ``re`` since Python 3.11. Alternatives of each node start
+        with different letters and nothing follows a sub-tree in the regular
+        expression, so once a sub-tree matched, backtracking into it can't lead
+        to another match. Matches of ``re`` functions stay the same, but
+        non-matching strings are rejected sooner. See `emit`.
+    :param weighted: Order alternatives by descending weight of their sub-trees,
+        see `PrefixTree.add`, so the most frequently matched ones are tried
+        first. Single letters form one character set weighted by all of them.
+        Alternatives of a node start with different letters, so the order
+        doesn't change what is matched.
+    """
+
+    def __init__(
+            self,
+            share_subtrees: bool = False,
+            cache_fragments: bool = False,
+            atomic: bool = False,
+            weighted: bool = False
+    ) -> None:
+        if share_subtrees and cache_fragments:
+            raise ValueError('Sub-trees can not be both shared and cached.')
+
+        self.share_subtrees = share_subtrees
+        self.cache_fragments = cache_fragments
+        self.atomic = atomic
+        self.weighted = weighted
+        self.subtree_stats = CacheStats()
+        self._group_start = '(?>' if atomic else '(?:'
+        self._optional_suffix = '?+' if atomic else '?'
+
+    def edges(self, node: Any) -> Sequence[Tuple[str, Any]]:
+        """
+        :return: Pairs of edge label and target node of all edges leaving ``node``.
+            Empty sequence for leaf nodes.
+        """
+        if node._edges is None:  # pylint: disable=protected-access
+            return ()
+
+        edges = [
+            (edge._label, edge._target_node)  # pylint: disable=protected-access
+            for edge in node._edges.values()  # pylint: disable=protected-access
+        ]
+
+        if self.weighted:
+            return self._order_by_weight(edges)
+
+        return edges
+
+    @staticmethod
+    def weight(node: Any) -> int:
+        return node.weight
+
+    def _order_by_weight(self, edges: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+        """Sorts edges by descending weight of their target nodes. Edges of single
+        letters leading to leaves, which `combine` groups into a character set,
+        all get the total weight of the set, so they stay next to each other.
+        """
+        # pylint: disable=protected-access
+        is_letter = [len(label) == 1 and child._edges is None for label, child in edges]
+        weights = [self.weight(child) for _, child in edges]
+        letters_weight = sum(
+            weight for weight, letter in zip(weights, is_letter) if letter
+        )
+        keys = [
+            -letters_weight if letter else -weight
+            for weight, letter in zip(weights, is_letter)
+        ]
+        return [edge for _, edge in sorted(zip(keys, edges), key=itemgetter(0))]
+
+    def is_terminal(self, node: Any) -> bool:  # pylint: disable=no-self-use
+        # an instance method, as emitters of other trees ask the tree
+        return node.terminal_node
+
+    @staticmethod
+    def cached_fragment(node: Any) -> Optional[Fragment]:
+        """
+        :return: Fragment of the sub-tree stored by `store_fragment`, or
+            ``None`` if the sub-tree changed since.
+        """
+        return node._fragment  # pylint: disable=protected-access
+
+    @staticmethod
+    def store_fragment(node: Any, fragment: Fragment) -> None:
+        node._fragment = fragment  # pylint: disable=protected-access
+
+    def emit(self, node: Any) -> str:
+        if self.atomic:
+            return join_fragments(self._root_fragment(node))
+
+        return join_fragments(self.node_fragment(node))
+
+    def emit_edge(self, label: str, target_node: Any) -> str:
+        return join_fragments(self.edge_fragment(label, self.node_fragment(target_node)))
+
+    def node_fragment(self, root: Any) -> Fragment:
+        # pylint: disable=too-many-locals; bound methods are local in the hot loop
+        if self.share_subtrees:
+            return self._shared_node_fragment(root)
+
+        edges, edge_fragment = self.edges, self.edge_fragment
+        combine, is_terminal = self.combine, self.is_terminal
+        cache_fragments = self.cache_fragments
+        cached_fragment, store_fragment = self.cached_fragment, self.store_fragment
+
+        if cache_fragments:
+            fragment = cached_fragment(root)
+
+            if fragment is not None:
+                return fragment
+
+        # each frame holds a node, label of the edge leading to it, iterator over
+        # its edges and fragments of edges processed so far
+        stack = [
+            (root, '', iter(edges(root)), [])
+        ]  # type: List[Tuple[Any, str, Iterator, List[Fragment]]]
+
+        while True:
+            node, label, edges_iterator, sub_fragments = stack[-1]
+
+            for child_label, child in edges_iterator:
+                child_edges = edges(child)
+
+                if child_edges:
+                    fragment = cached_fragment(child) if cache_fragments else None
+
+                    if fragment is None:  # descend into the child
+                        stack.append((child, child_label, iter(child_edges), []))
+                        break
+
+                    sub_fragments.append(edge_fragment(child_label, fragment))
+                else:
+                    sub_fragments.append(edge_fragment(child_label, ''))
+            else:  # all children processed
+                stack.pop()
+                fragment = combine(sub_fragments, is_terminal(node))
+
+                if cache_fragments:
+                    store_fragment(node, fragment)
+
+                if not stack:
+                    return fragment
+
+                stack[-1][3].append(edge_fragment(label, fragment))
+
+    def _shared_node_fragment(self, root: Any) -> Fragment:
+        """Same as `node_fragment`, but fragments of identical sub-trees are
+        created only once, see `combine_edges`.
+        """
+        # pylint: disable=too-many-locals; bound methods are local in the hot loop
+        edges, combine_edges, is_terminal = self.edges, self.combine_edges, self.is_terminal
+        stats = self.subtree_stats
+        subtree_ids = {}  # type: Dict[Tuple[Any, ...], int]
+        fragments = []  # type: List[Fragment]
+        # each frame holds a node, label of the edge leading to it, iterator over
+        # its edges and a key of the node: whether it is terminal, followed by
+        # label and sub-tree ID of each edge processed so far
+        stack = [
+            (root, '', iter(edges(root)), [is_terminal(root)])
+        ]  # type: List[Tuple[Any, str, Iterator, List[Any]]]
+
+        while True:
+            _, label, edges_iterator, key = stack[-1]
+
+            for child_label, child in edges_iterator:
+                child_edges = edges(child)
+
+                if child_edges:  # descend into the child
+                    stack.append(
+                        (child, child_label, iter(child_edges), [is_terminal(child)])
+                    )
+                    break
+
+                key.append(child_label)
+                key.append(_LEAF)
+            else:  # all children processed
+                stack.pop()
+                key_tuple = tuple(key)
+                subtree_id = subtree_ids.get(key_tuple)
+
+                if subtree_id is None:
+                    stats.misses += 1
+                    subtree_id = subtree_ids[key_tuple] = len(fragments)
+                    fragments.append(combine_edges([
+                        (edge_label, '' if sub_id == _LEAF else fragments[sub_id])
+                        for edge_label, sub_id in zip(key[1::2], key[2::2])
+                    ], key[0]))
+                else:
+                    stats.hits += 1
+
+                if not stack:
+                    return fragments[subtree_id]
+
+                stack[-1][3].append(label)
+                stack[-1][3].append(subtree_id)
+
+    def combine_edges(
+            self, edges: List[Tuple[str, Fragment]], terminal: bool
+    ) -> Fragment:
+        """Serializes a node from labels of its edges and fragments of their
+        target nodes, ``''`` for leaves. Fragments of identical sub-trees are
+        the same objects.
+        """
+        edge_fragment = self.edge_fragment
+        return self.combine(
+            [edge_fragment(label, from_below) for label, from_below in edges], terminal
+        )
+
+    def _root_fragment(self, root: Any) -> Fragment:
+        """Serializes the root of an atomic regular expression in a plain group.
+
+        ``re`` skips positions where no alternative of the root can start only if
+        each of them starts with a literal letter, which atomic groups, character
+        sets and quantifiers would hide. Alternatives are ordered by length of
+        their sub-trees, so first letters of most words are tested first, or by
+        weights of sub-trees if weighted.
+        """
+        return self.combine_root(
+            [self.root_alternative(label, child) for label, child in self.edges(root)],
+            self.is_terminal(root)
+        )
+
+    def root_alternative(self, label: str, child: Any) -> Tuple[int, Fragment]:
+        """:return: Key ordering the alternative of the edge of the root of an
+            atomic regular expression, see `combine_root`, and its fragment.
+        """
+        from_below = self.node_fragment(child) if self.edges(child) else ''
+        return -fragment_length(from_below), concatenate(
+            [re.escape(label[0]), escape_label(label[1:]), from_below]
+        )
+
+    def combine_root(
+            self, alternatives: Sequence[Tuple[int, Fragment]], terminal: bool
+    ) -> Fragment:
+        """Serializes the root of an atomic regular expression from alternatives
+        of `root_alternative`, in order of edges of the root.
+        """
+        if not alternatives:
+            return ''
+
+        if not self.weighted:  # already ordered by weight by edges
+            alternatives = sorted(alternatives, key=itemgetter(0))
+
+        fragment = alternatives[0][1] if len(alternatives) == 1 else \
+            self._alternatives('(?:', [alternative for _, alternative in alternatives])
+        return concatenate([fragment, '?']) if terminal else fragment
+
+    @staticmethod
+    def _alternatives(group_start: str, strings: List[Fragment]) -> Fragment:
+        joined_strings = strings  # type: Any  # joined unless some are nested
+        try:
+            return concatenate([group_start, '|'.join(joined_strings), ')'])
+        except TypeError:  # some of the strings are nested fragments
+            alternatives = [group_start]  # type: List[Fragment]
+
+            for string in strings:
+                alternatives.extend((string, '|'))
+
+            alternatives[-1] = ')'
+            return alternatives
+
+    @staticmethod
+    def edge_fragment(label: str, from_below: Fragment) -> Fragment:
+        if not from_below:  # target node is leaf
+            if len(label) <= 1:  # don't escape single characters
+                return label
+
+            return escape_label(label)
+
+        return concatenate([escape_label(label), from_below])
+
+    def _optional(self, fragment: Fragment, terminal: bool, add_brackets: bool) -> Fragment:
+        if terminal:
+            return concatenate(
+                ['(?:', fragment, ')' + self._optional_suffix] if add_brackets
+                else [fragment, self._optional_suffix]
+            )
+
+        return fragment
+
+    def combine(self, sub_fragments: List[Fragment], terminal: bool) -> Fragment:
+        if not sub_fragments:  # leaf
+            return ''
+
+        letters = []  # type: List[str]
+        strings = []  # type: List[Fragment]
+        letters_position = 0  # in strings, set by the first letter if weighted
+
+        for sub_fragment in sub_fragments:
+            # just one letter received, more can be grouped in [XYZ]
+            if isinstance(sub_fragment, str) and len(sub_fragment) == 1:
+                if not letters and self.weighted:
+                    letters_position = len(strings)
+
+                letters.append(sub_fragment)
+            else:
+                # strings received, can be grouped just with | symbol
+                strings.append(sub_fragment)
+
+        if letters and not strings:  # just letters
+            if len(letters) == 1:  # just one letter
+                return self._optional(re.escape(letters[0]), terminal, False)
+
+            # more letters, group in []
+            return self._optional(
+                '[' + ''.join(collapse_letter_ranges(letters)) + ']', terminal, False
+            )
+
+        if not letters and len(strings) == 1:  # just one string
+            return self._optional(strings[0], terminal, True)
+
+        # combination of letters and strings
+        if len(letters) > 1:
+            strings.insert(
+                letters_position, '[' + ''.join(collapse_letter_ranges(letters)) + ']'
+            )
+        elif len(letters) == 1:
+            strings.insert(letters_position, re.escape(letters[0]))
+
+        return self._optional(
+            self._alternatives(self._group_start, strings), terminal, False
+        )
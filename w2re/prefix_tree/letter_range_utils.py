@@ -2,82 +2,75 @@ from typing import (
     List,
 )
 
-_SQUARE_BRACKET_ESCAPABLES = {'[', ']', '\\'}
+_SQUARE_BRACKET_ESCAPABLES = {'[', ']', '\\', '^'}
 
 
 def escape_char_in_square_brackets(character: str) -> str:
     return '\\' + character if character in _SQUARE_BRACKET_ESCAPABLES else character
 
 
-def _formatted_letter_range(first_letter: str, last_letter: str) -> List[str]:
-    if first_letter == last_letter:
-        raise RuntimeError(
-            "first_letter and last_letter must not be the same."
-        )  # pragma: no cover
+_ESCAPED_LETTERS = {
+    letter: escape_char_in_square_brackets(letter) for letter in _SQUARE_BRACKET_ESCAPABLES
+}
+_HYPHEN = '-'
+_SPECIAL_LETTERS = _SQUARE_BRACKET_ESCAPABLES | {_HYPHEN}
+_MIN_RANGE_LENGTH = 3  # in letters
+# a range is never longer than this, so longer runs are always collapsed
+_MAX_RANGE_LENGTH = len(r'\]-\^')
 
-    if ord(first_letter) + 1 < ord(last_letter):
-        return [first_letter + '-' + last_letter]
 
-    return [first_letter, last_letter]
+def _collapse_run(escaped_letters: List[str], letters: List[str]) -> List[str]:
+    """Collapses a run of at least three consecutive letters into a range, if it
+    contains an alphanumeric letter or if the range is shorter than the letters.
+    """
+    letter_range = escaped_letters[0] + '-' + escaped_letters[-1]
 
+    if len(letters) > _MAX_RANGE_LENGTH or any(map(str.isalnum, letters)) or \
+            len(letter_range) < len(''.join(escaped_letters)):
+        return [letter_range]
 
-def _is_next_letter(first_letter: str, second_letter: str) -> bool:
-    return ord(first_letter) + 1 == ord(second_letter)
+    return escaped_letters
 
 
-_STATE_NO_RANGE = 1
-_STATE_RANGE_START = 2
-_STATE_IN_RANGE = 3
+def collapse_letter_ranges(letters: List[str]) -> List[str]:
+    """Sorts ``letters`` in place by code point, with hyphen first, so it doesn't
+    need to be escaped, and collapses runs of consecutive letters into ranges.
 
-
-# TODO(Radek): Implement proper FSM
-def collapse_letter_ranges(  # pylint: disable=too-many-branches; required for FSM implementation
-        letters: List[str]
-) -> List[str]:
+    Runs are found by comparing code points only. Letters are escaped only if
+    some need to be and tested for being alphanumeric only in short runs, which
+    matters for nodes with thousands of letters.
+    """
     if len(letters) == 1:
         return [escape_char_in_square_brackets(letters[0])]
 
-    # Make hyphen first in the list, if present
-    letters.sort(key=lambda character: -1 if character == '-' else ord(character))
+    letters.sort()
     letters_out = []  # type: List[str]
-    state = _STATE_NO_RANGE
-    first_letter = ''
-    previous_letter = ''
-    last_index = len(letters)
-
-    for index, current_letter in enumerate(letters, 1):
-        if state == _STATE_NO_RANGE:
-            if current_letter.isalnum():
-                state = _STATE_RANGE_START
-                first_letter = current_letter
-            else:
-                letters_out.append(escape_char_in_square_brackets(current_letter))
-
-        elif state == _STATE_RANGE_START:
-            if not current_letter.isalnum():
-                state = _STATE_NO_RANGE
-                letters_out.append(first_letter)
-                letters_out.append(escape_char_in_square_brackets(current_letter))
-            elif _is_next_letter(previous_letter, current_letter):
-                state = _STATE_IN_RANGE
-            else:
-                letters_out.append(first_letter)
-                first_letter = current_letter
-
-        elif state == _STATE_IN_RANGE:
-            if not _is_next_letter(previous_letter, current_letter):
-                state = _STATE_RANGE_START
-                letters_out.extend(_formatted_letter_range(first_letter, previous_letter))
-                first_letter = current_letter
-        else:
-            raise RuntimeError("Unexpected state: " + str(state))  # pragma: no cover
-
-        if index == last_index:
-            if state == _STATE_RANGE_START:
-                letters_out.append(current_letter)
-            elif state == _STATE_IN_RANGE:
-                letters_out.extend(_formatted_letter_range(first_letter, current_letter))
-
-        previous_letter = current_letter
-
+    range_letters = escaped_letters = letters
+
+    if not _SPECIAL_LETTERS.isdisjoint(letters):
+        if _HYPHEN in letters:
+            letters.remove(_HYPHEN)
+            letters.insert(0, _HYPHEN)
+            letters_out.append(_HYPHEN)
+            range_letters = escaped_letters = letters[1:]
+
+        if not _SQUARE_BRACKET_ESCAPABLES.isdisjoint(range_letters):
+            escaped_letters = list(map(_ESCAPED_LETTERS.get, range_letters, range_letters))
+
+    codes = list(map(ord, range_letters))
+    codes.append(-1)  # ends the last run
+    run_start = previous_end = 0
+
+    for index in range(1, len(codes)):
+        if codes[index] != codes[index - 1] + 1:
+            if index - run_start >= _MIN_RANGE_LENGTH:
+                letters_out.extend(escaped_letters[previous_end:run_start])
+                letters_out.extend(_collapse_run(
+                    escaped_letters[run_start:index], range_letters[run_start:index]
+                ))
+                previous_end = index
+
+            run_start = index
+
+    letters_out.extend(escaped_letters[previous_end:])
     return letters_out
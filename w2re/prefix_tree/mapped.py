@@ -0,0 +1,231 @@
+"""Binary file format of prefix trees, which is read through ``mmap``.
+
+Nodes are numbered in breadth-first order, so edges of each node follow those of
+the previous node. The file consists of a header and these sections, each
+aligned to 8 bytes:
+
+* terminal flags of nodes, one byte each,
+* index of the first edge of each node, followed by the number of edges,
+* index of the target node of each edge,
+* offset of the label of each edge in the label buffer, in letters, followed
+  by the length of the buffer,
+* label buffer in Latin-1, or UTF-32 if some letter doesn't fit.
+
+Numbers use the byte order of the machine that wrote the file.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from typing import (
+    Any,
+    BinaryIO,
+    List,
+    Tuple,
+    Type,
+)
+
+from w2re.formatters import BaseFormatter
+from w2re.prefix_tree.compact import (
+    CompactPrefixTreeNode,
+    IndexedPrefixTree,
+)
+
+_MAGIC = b'W2RE'
+_FORMAT_VERSION = 1
+# magic, format version, letter size, byte order, number of nodes and edges
+_HEADER = struct.Struct('=4sBBBxII')
+_ALIGNMENT = 8
+_BYTE_ORDERS = ('little', 'big')
+_NARROW_ENCODING = 'latin-1'
+_WIDE_ENCODING = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+_ENCODINGS = {1: _NARROW_ENCODING, 4: _WIDE_ENCODING}
+_ERRORS = 'surrogatepass'  # lone surrogates are valid letters of words
+_ROOT = 0
+
+
+def _padding(length: int) -> bytes:
+    return bytes(-length % _ALIGNMENT)
+
+
+def _write_section(output_file: BinaryIO, data: bytes) -> None:
+    output_file.write(data)
+    output_file.write(_padding(len(data)))
+
+
+def write_tree(root: Any, output_file: BinaryIO) -> None:
+    """Writes a tree of `PrefixTreeNode` objects starting at ``root``."""
+    # pylint: disable=protected-access
+    terminal = bytearray()
+    first_edge = array('I')
+    edge_target = array('I')
+    label_offset = array('Q', [0])
+    labels = []  # type: List[str]
+    nodes = [root]
+
+    for node in nodes:  # nodes are appended while iterating, breadth-first
+        terminal.append(node.terminal_node)
+        first_edge.append(len(edge_target))
+
+        if node._edges is not None:
+            for edge in node._edges.values():
+                edge_target.append(len(nodes))
+                nodes.append(edge._target_node)
+                labels.append(edge._label)
+                label_offset.append(label_offset[-1] + len(edge._label))
+
+    first_edge.append(len(edge_target))
+    del nodes
+    text = ''.join(labels)
+    del labels
+
+    try:
+        encoded_labels = text.encode(_NARROW_ENCODING)
+    except UnicodeEncodeError:
+        encoded_labels = text.encode(_WIDE_ENCODING, _ERRORS)
+
+    letter_size = len(encoded_labels) // len(text) if text else 1
+    output_file.write(_HEADER.pack(
+        _MAGIC, _FORMAT_VERSION, letter_size, _BYTE_ORDERS.index(sys.byteorder),
+        len(terminal), len(edge_target)
+    ))
+
+    _write_section(output_file, terminal)
+
+    for section in (first_edge, edge_target, label_offset):
+        _write_section(output_file, section.tobytes())
+
+    output_file.write(encoded_labels)
+
+
+class MappedPrefixTree(IndexedPrefixTree):
+    """Read-only prefix tree stored in a file by `PrefixTree.save`.
+
+    The file is mapped into memory and read in place, without creating objects
+    for nodes and edges. Only labels of visited edges are copied. Can be used
+    as a context manager closing the file.
+
+    :raises ValueError: If the file is not a saved prefix tree.
+    """
+
+    def __init__(self, path: str) -> None:
+        error = ValueError("'{}' is not a saved prefix tree.".format(path))
+
+        with open(path, 'rb') as input_file:
+            try:
+                # typeshed lacks the buffer protocol of mmap and memoryview.cast
+                self._mmap = mmap.mmap(
+                    input_file.fileno(), 0, access=mmap.ACCESS_READ
+                )  # type: Any
+            except ValueError:  # empty file
+                raise error
+
+        try:
+            self._read_sections()
+        except (ValueError, TypeError, struct.error):
+            self.close()
+            raise error
+
+    def _read_sections(self) -> None:
+        magic, version, letter_size, byte_order, node_count, edge_count = \
+            _HEADER.unpack_from(self._mmap)
+
+        if magic != _MAGIC or version != _FORMAT_VERSION or \
+                letter_size not in _ENCODINGS or _BYTE_ORDERS[byte_order] != sys.byteorder:
+            raise ValueError()
+
+        position = _HEADER.size
+        sections = []  # type: List[memoryview]
+
+        # sections keep the mapping exported until close releases them
+        with memoryview(self._mmap) as view:  # type: Any
+            for type_code, length in (('B', node_count), ('I', node_count + 1),
+                                      ('I', edge_count), ('Q', edge_count + 1)):
+                size = length * array(type_code).itemsize
+                sections.append(view[position:position + size].cast(type_code))
+                position += size + len(_padding(size))
+
+            self._labels = view[position:]  # type: memoryview
+
+        self._terminal = sections[0]
+        self._first_edge = sections[1]
+        self._edge_target = sections[2]
+        self._label_offset = sections[3]
+        self._letter_size = letter_size  # type: int
+
+        if len(self._labels) != self._label_offset[-1] * letter_size:
+            raise ValueError()
+
+    def close(self) -> None:
+        for name in ('_terminal', '_first_edge', '_edge_target', '_label_offset',
+                     '_labels'):
+            if hasattr(self, name):
+                getattr(self, name).release()
+
+        self._mmap.close()
+
+    def __enter__(self) -> 'MappedPrefixTree':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _label_bytes(self, edge: int) -> memoryview:
+        return self._labels[self._label_offset[edge] * self._letter_size:
+                            self._label_offset[edge + 1] * self._letter_size]
+
+    def label(self, edge: int) -> str:
+        return self._label_bytes(edge).tobytes().decode(
+            _ENCODINGS[self._letter_size], _ERRORS
+        )
+
+    def edges(self, node: int) -> List[Tuple[str, int]]:
+        """
+        :return: Pairs of edge label and target node of all edges leaving ``node``,
+            in the order of insertion.
+        """
+        return [
+            (self.label(edge), self._edge_target[edge])
+            for edge in range(self._first_edge[node], self._first_edge[node + 1])
+        ]
+
+    def is_terminal(self, node: int) -> bool:
+        return bool(self._terminal[node])
+
+    def __contains__(self, word: str) -> bool:
+        """Walks the tree from the root, comparing encoded labels with the word."""
+        try:
+            encoded_word = word.encode(_ENCODINGS[self._letter_size], _ERRORS)
+        except UnicodeEncodeError:  # a letter not in any label
+            return False
+
+        letter_size = self._letter_size
+        node = _ROOT
+        position = 0  # in bytes
+
+        while position < len(encoded_word):
+            first_letter = encoded_word[position:position + letter_size]
+
+            for edge in range(self._first_edge[node], self._first_edge[node + 1]):
+                label = self._label_bytes(edge)
+
+                if label[:letter_size] == first_letter:
+                    break
+            else:
+                return False
+
+            if encoded_word[position:position + len(label)] != label:
+                return False
+
+            position += len(label)
+            node = self._edge_target[edge]
+
+        return node != _ROOT and self.is_terminal(node)
+
+    def to_regexp(self, formatter: Type[BaseFormatter]) -> str:
+        """
+        :return Returns regular expression representation of the structure.
+        If the structure is empty, returns regular expression matching
+        empty string.
+        """
+        return formatter.wrap_regexp(CompactPrefixTreeNode(self, _ROOT))
@@ -0,0 +1,341 @@
+"""Serialization of prefix trees minimizing a cost of the regular expression.
+
+`RegexpEmitter` serializes each alternative of a node on its own, so endings
+shared by several alternatives are repeated. `OptimizingEmitter` factors them
+out: alternatives followed by identical sub-trees share the sub-tree and the
+common end of their labels, e.g. ``(?:walk(?:ed|ing)|talk(?:ed|ing))`` becomes
+``[tw]alk(?:ed|ing)``. Alternatives of a node start with different letters, so
+at most one of them can match, and the factored group matches the same strings.
+
+Each rewrite is kept only if it lowers the cost given by a `CostModel`, such as
+the length of the regular expression or an estimate of steps of matching it.
+"""
+import re
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from w2re.prefix_tree.emitter import (
+    Fragment,
+    RegexpEmitter,
+    concatenate,
+    escape_label,
+    fragment_length,
+    join_fragments,
+)
+
+_TOKEN = re.compile(
+    r'\\.'  # escaped letter
+    r'|\[(?:\\.|[^\]\\])*\]'  # character set
+    r'|\((?:\?[:>])?'  # start of a group
+    r'|\{(\d+)(?:,\d*)?\}\+?'  # repetition
+    r'|[?*+]\+?'  # other quantifiers
+    r'|.',
+    re.DOTALL
+)
+
+
+class CostModel:  # pylint: disable=too-few-public-methods
+    """Scores regular expressions, the lower the better.
+
+    Costs of parts of a regular expression must add up to the cost of their
+    concatenation, so that only the rewritten parts are compared.
+    """
+
+    def cost(self, regexp: str) -> float:
+        raise NotImplementedError
+
+
+class PatternLengthCost(CostModel):  # pylint: disable=too-few-public-methods
+    """Number of characters of the regular expression."""
+
+    def cost(self, regexp: str) -> float:
+        return len(regexp)
+
+
+class MatchStepsCost(CostModel):  # pylint: disable=too-few-public-methods
+    """Estimated number of steps of matching the regular expression at one
+    position: each letter, escaped letter and character set is tested once,
+    repeated ones as many times as they repeat, and each alternative after
+    the first one costs one more step.
+    """
+
+    def cost(self, regexp: str) -> float:
+        steps = [0]  # of each open group
+        last = 0  # steps of the last letter or group
+
+        for match in _TOKEN.finditer(regexp):
+            token, repetitions = match.group(), match.group(1)
+
+            if token[0] == '(':
+                steps.append(0)
+            elif token == ')':
+                last = steps.pop()
+                steps[-1] += last
+            elif token == '|':
+                steps[-1] += 1
+            elif repetitions is not None:
+                steps[-1] += last * (int(repetitions) - 1)
+            elif token[0] not in '?*+':
+                last = 1
+                steps[-1] += 1
+
+        return steps[0]
+
+
+COST_MODELS = {
+    'length': PatternLengthCost,
+    'steps': MatchStepsCost,
+}  # type: Dict[str, Type[CostModel]]
+
+
+class OptimizingEmitter(RegexpEmitter):
+    """Same as `RegexpEmitter` sharing identical sub-trees, see
+    `w2re.prefix_tree.optimizer`, but common endings of alternatives are
+    factored out and terminal nodes are made optional by the cheaper of ``?``
+    and an empty alternative.
+
+    Alternatives followed by the same sub-tree are factored together. If their
+    labels have nothing else in common, alternatives ending with the same
+    letter are tried on their own. Alternatives of the root of atomic regular
+    expressions are never factored, see `RegexpEmitter._root_fragment`.
+
+    :param cost_model: Decides which rewrites are kept. Defaults to
+        `PatternLengthCost`.
+    :param atomic: See `RegexpEmitter`.
+    :param weighted: See `RegexpEmitter`.
+    :ivar saved_bytes: Number of characters the last emitted regular expression
+        is shorter than one of `RegexpEmitter` with the same options. Negative
+        if the cost model preferred longer ones.
+    """
+
+    def __init__(
+            self,
+            cost_model: Optional[CostModel] = None,
+            atomic: bool = False,
+            weighted: bool = False
+    ) -> None:
+        super().__init__(share_subtrees=True, atomic=atomic, weighted=weighted)
+        self.cost_model = cost_model or PatternLengthCost()
+        self.saved_bytes = 0
+        self._bar_cost = self.cost_model.cost('|')
+        self._costs = {}  # type: Dict[int, float]
+        # characters saved in each fragment, which is kept to hold its ID
+        self._saved = {}  # type: Dict[int, Tuple[Fragment, int]]
+
+        # whether (?:x|) costs less than x? or (?:x)?, by brackets needed by ?
+        cost = self.cost_model.cost
+        empty_alternative = cost(self._group_start + 'x|)')
+        self._empty_alternative = (
+            empty_alternative < cost('x' + self._optional_suffix),
+            empty_alternative < cost(self._group_start + 'x)' + self._optional_suffix),
+        )
+
+    def emit(self, node: Any) -> str:
+        self.saved_bytes = 0
+        return super().emit(node)
+
+    def node_fragment(self, root: Any) -> Fragment:
+        try:
+            fragment = super().node_fragment(root)
+            self.saved_bytes += self._saved.get(id(fragment), ('', 0))[1]
+            return fragment
+        finally:
+            self._costs.clear()
+            self._saved.clear()
+
+    def combine_edges(
+            self, edges: List[Tuple[str, Fragment]], terminal: bool
+    ) -> Fragment:
+        edge_fragment = self.edge_fragment
+        indexes_by_target = {}  # type: Dict[int, List[int]]
+
+        for index, (_, from_below) in enumerate(edges):
+            indexes_by_target.setdefault(id(from_below), []).append(index)
+
+        factored = {}  # type: Dict[int, Optional[Fragment]]
+
+        for indexes in indexes_by_target.values():
+            if len(indexes) > 1:
+                for group, fragment in self._factor(edges, indexes):
+                    factored[group[0]] = fragment
+                    factored.update((index, None) for index in group[1:])
+
+        fragments = [
+            factored[index] if index in factored else edge_fragment(label, from_below)
+            for index, (label, from_below) in enumerate(edges)
+        ]
+        fragment = self.combine(
+            [part for part in fragments if part is not None], terminal
+        )
+        saved = sum(
+            self._saved.get(id(from_below), ('', 0))[1] for _, from_below in edges
+        ) if self._saved else 0
+
+        if factored or terminal and any(self._empty_alternative):
+            saved += self._unoptimized_length(edges, terminal) - fragment_length(fragment)
+
+        if saved:
+            self._saved[id(fragment)] = (fragment, saved)
+
+        return fragment
+
+    def _unoptimized_length(self, edges: List[Tuple[str, Fragment]], terminal: bool) -> int:
+        """:return: Length of the fragment of `RegexpEmitter`."""
+        empty_alternative, self._empty_alternative = self._empty_alternative, (False, False)
+
+        try:
+            return fragment_length(self.combine(
+                [self.edge_fragment(label, from_below) for label, from_below in edges],
+                terminal
+            ))
+        finally:
+            self._empty_alternative = empty_alternative
+
+    def _factor(
+            self, edges: List[Tuple[str, Fragment]], indexes: List[int]
+    ) -> List[Tuple[List[int], Fragment]]:
+        """Chooses the cheapest way of factoring out the common sub-tree of
+        alternatives at ``indexes``, as a whole or by last letters of labels.
+
+        :return: Groups of indexes and their factored fragments, none if it
+            is the cheapest not to factor them.
+        """
+        from_below = edges[indexes[0]][1]
+        whole = bool(from_below or self._suffix_length(edges, indexes))
+        groups = self._groups_by_last_letter(edges, indexes)
+
+        if not whole and not groups:
+            return []
+
+        below_cost = self._below_cost(from_below)
+        best_cost = self._unfactored_cost(edges, indexes, below_cost)
+        best = []  # type: List[Tuple[List[int], Fragment]]
+
+        if whole:
+            fragment, cost = self._factored(edges, indexes, from_below, below_cost)
+
+            if cost < best_cost:
+                best_cost, best = cost, [(indexes, fragment)]
+
+        if groups:
+            factored, cost = self._factored_groups(edges, indexes, groups, below_cost)
+
+            if cost < best_cost:
+                best = factored
+
+        return best
+
+    @staticmethod
+    def _groups_by_last_letter(
+            edges: List[Tuple[str, Fragment]], indexes: List[int]
+    ) -> List[List[int]]:
+        """:return: Groups of at least two alternatives at ``indexes`` whose
+            labels end with the same letter and have other letters before it,
+            none if that is all of them.
+        """
+        by_last_letter = {}  # type: Dict[str, List[int]]
+
+        for index in indexes:
+            label = edges[index][0]
+
+            if len(label) > 1:
+                by_last_letter.setdefault(label[-1], []).append(index)
+
+        groups = [group for group in by_last_letter.values() if len(group) > 1]
+
+        if groups and len(groups[0]) == len(indexes):  # same as all of them
+            return []
+
+        return groups
+
+    def _factored_groups(
+            self,
+            edges: List[Tuple[str, Fragment]],
+            indexes: List[int],
+            groups: List[List[int]],
+            below_cost: float
+    ) -> Tuple[List[Tuple[List[int], Fragment]], float]:
+        """:return: Groups of alternatives at ``indexes`` ending with the same
+            letter, their factored fragments and cost of all alternatives.
+        """
+        from_below = edges[indexes[0]][1]
+        factored = []  # type: List[Tuple[List[int], Fragment]]
+        grouped = set()
+        cost = -self._bar_cost
+
+        for group in groups:
+            fragment, group_cost = self._factored(edges, group, from_below, below_cost)
+            factored.append((group, fragment))
+            grouped.update(group)
+            cost += group_cost + self._bar_cost
+
+        cost += self._unfactored_cost(
+            edges, [index for index in indexes if index not in grouped], below_cost
+        ) + (self._bar_cost if len(grouped) < len(indexes) else 0)
+        return factored, cost
+
+    def _factored(
+            self,
+            edges: List[Tuple[str, Fragment]],
+            indexes: List[int],
+            from_below: Fragment,
+            below_cost: float
+    ) -> Tuple[Fragment, float]:
+        """:return: Fragment of alternatives at ``indexes`` sharing the end of
+            their labels and ``from_below``, and its cost.
+        """
+        suffix_length = self._suffix_length(edges, indexes)
+        end = -suffix_length if suffix_length else None
+        suffix = escape_label(edges[indexes[0]][0][end:]) if suffix_length else ''
+        prefixes = join_fragments(self.combine(
+            [self.edge_fragment(edges[index][0][:end], '') for index in indexes], False
+        ))
+        return concatenate([prefixes, suffix, from_below]), \
+            self.cost_model.cost(prefixes + suffix) + below_cost
+
+    def _unfactored_cost(
+            self, edges: List[Tuple[str, Fragment]], indexes: List[int], below_cost: float
+    ) -> float:
+        if not indexes:
+            return 0
+
+        cost = self.cost_model.cost
+        return sum(cost(escape_label(edges[index][0])) for index in indexes) + \
+            len(indexes) * below_cost + (len(indexes) - 1) * self._bar_cost
+
+    @staticmethod
+    def _suffix_length(edges: List[Tuple[str, Fragment]], indexes: List[int]) -> int:
+        """:return: Length of the common end of labels, leaving at least their
+            first letter.
+        """
+        labels = [edges[index][0] for index in indexes]
+        limit = min(len(label) for label in labels) - 1
+        length = 0
+
+        while length < limit and all(
+                label[-length - 1] == labels[0][-length - 1] for label in labels
+        ):
+            length += 1
+
+        return length
+
+    def _below_cost(self, from_below: Fragment) -> float:
+        cost = self._costs.get(id(from_below))
+
+        if cost is None:
+            cost = self._costs[id(from_below)] = \
+                self.cost_model.cost(join_fragments(from_below))
+
+        return cost
+
+    def _optional(self, fragment: Fragment, terminal: bool, add_brackets: bool) -> Fragment:
+        if terminal and self._empty_alternative[add_brackets]:
+            return concatenate([self._group_start, fragment, '|)'])
+
+        return super()._optional(fragment, terminal, add_brackets)
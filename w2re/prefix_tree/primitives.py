@@ -1,209 +1,264 @@
-import re
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    List,
+    Optional,
+    Tuple,
+)
 
-from w2re.prefix_tree.letter_range_utils import collapse_letter_ranges
+from w2re.prefix_tree.emitter import (  # pylint: disable=unused-import; false positive
+    Fragment,
+    RegexpEmitter,
+)
 
+BYTES_ENCODING = 'latin-1'  # maps bytes to letters of the same code points
+_COMPARED_LETTERS = 16  # by common_length one by one, before binary search
 
-def get_stop_index(word, sliding_window_length):
-    """ Stop index for two adjacent sliding windows.
 
-    For blActgActgA it would be::
-
-        blAct | gActg | A -> b | lActg | ActgA
+def common_length(label: Any, word: Any, start: int) -> int:
+    """Finds the length of the common prefix of ``label`` and ``word[start:]``,
+    whose first letters are equal, without slicing the word.
 
+    First letters are compared one by one, which is the fastest for short labels.
+    The rest is found by binary search, comparing whole slices of the label.
     """
-    return len(word) - sliding_window_length * 2 + 1
+    limit = min(len(label), len(word) - start)
+    position = 1
 
+    while position < limit and position < _COMPARED_LETTERS:
+        if label[position] != word[start + position]:
+            return position
 
-def add_brackets_around_string(word: str):
-    """Adds square brackets for single character strings and round the rest.
-    """
-    if len(word) == 1 or (len(word) == 2 and word.startswith('\\')):
-        return word
+        position += 1
 
-    return '(?:' + word + ')'
+    if position == limit or word.startswith(label[:limit], start):
+        return limit
 
+    # word starts with label[:position] and not with label[:limit]
+    while limit - position > 1:
+        middle = (position + limit) // 2
 
-def compress(word, sliding_window_len=None):
-    """
-    This function uses sliding window of decreasing size to find repeated,
-    non-overlapping and adjacent sub-strings.
+        if word.startswith(label[:middle], start):
+            position = middle
+        else:
+            limit = middle
 
-    Example::
+    return position
 
-        BLACTGACTGA contains BL - 2x ACTG - A or BLA - 2x CTGA
 
-    Note that the sub-string can be repeated more than 2x, so the function remembers
-    first window and then next window, that can be repeated 1+ times, while
-    counting the repetitions.
+_EMITTER = RegexpEmitter()
+_ATOMIC_EMITTER = RegexpEmitter(atomic=True)
 
-    The function also applies itself on the longest discovered sub-string
-    recursively. So it discovers shorter sub-strings in sub-strings.
 
-    :param word: Input string.
-    :param sliding_window_len: Initial window size. Used by recursion. Do not set this
-        yourself.
-    :return: Compressed string.
+class RegexpNode:  # pylint: disable=too-few-public-methods
+    """Root of a structure, which formatters serialize into a regular
+    expression, see `w2re.formatters.BaseFormatter`.
     """
-    if sliding_window_len is None:
-        sliding_window_len = len(word) // 2
 
-    if sliding_window_len <= 0 or len(word) <= 1:
-        return word  # don't compress these
+    __slots__ = ()
 
-    stop_index = get_stop_index(word, sliding_window_len)
-    i = 0
-    compression_observed = False
+    def to_regexp(self, atomic: bool = False) -> str:
+        """:param atomic: See `RegexpEmitter`."""
+        raise NotImplementedError()
 
-    while i < stop_index:
-        next_window_start = i + sliding_window_len  # there can be more than 2 windows
-        first_window = word[i:next_window_start]
-        repeat_count = 0
 
-        while True:  # Repeat next windows until non-matching found
-            next_window_end = next_window_start + sliding_window_len
+class PrerenderedNode(RegexpNode):  # pylint: disable=too-few-public-methods
+    """Root node with an already serialized regular expression, which can be
+    passed to formatters.
 
-            if next_window_end >= len(word) + 1:
-                break  # next window overflows the string -> stop
+    :param regexp: Serialized regular expression.
+    :param atomic: Whether the regular expression was serialized with atomic
+        groups, see `RegexpEmitter`.
+    """
 
-            next_window = word[next_window_start:next_window_end]
+    __slots__ = ('_regexp', '_atomic')
+
+    def __init__(self, regexp: str, atomic: bool = False) -> None:
+        self._regexp = regexp
+        self._atomic = atomic
+
+    def to_regexp(self, atomic: bool = False) -> str:
+        """
+        :raises ValueError: If ``atomic`` differs from how the regular expression
+            was serialized.
+        """
+        if atomic != self._atomic:
+            raise ValueError(
+                'The regular expression was serialized {} atomic groups.'.format(
+                    'with' if self._atomic else 'without'
+                )
+            )
 
-            if first_window != next_window:
-                break
+        return self._regexp
 
-            repeat_count += 1
-            next_window_start = next_window_end
 
-        if repeat_count > 0:
-            compression_observed = True
-            prefix = word[:i]
+class PrefixTreeNode(RegexpNode):
+    """
+    :ivar weight: Sum of weights of all words added to the sub-tree, including
+        repeated ones.
+    """
 
-            repeated_block_len_end = i + sliding_window_len * (repeat_count + 1)
-            suffix = word[repeated_block_len_end:]
+    __slots__ = ('_edges', 'terminal_node', '_fragment', 'weight')
 
-            center = add_brackets_around_string(compress(first_window))
+    def __init__(self, terminal_node=False, weight=0):
+        self._edges = None
+        self.terminal_node = terminal_node
+        self._fragment = None  # type: Optional[Fragment]
+        self.weight = weight
+
+    def invalidate(self):
+        """Drops the fragment cached by `RegexpEmitter`."""
+        self._fragment = None
+
+    def add(
+            self,
+            word: Any,
+            new_node: "PrefixTreeNode" = None,
+            weight: int = 1,
+            start: int = 0
+    ):
+        """Adds ``word[start:]``, which is ``str`` or ``bytes``, to the sub-tree,
+        walking edges without recursion.
+
+        Labels are compared with the word at an offset, so the word is sliced
+        only to create a new label, and not once per edge on the way.
+
+        :param word: Word to add.
+        :param new_node: Existing sub-tree to end the word with, instead of a new
+            leaf. ``weight`` must be its weight.
+        :param weight: Added to weights of all nodes on the path of the word.
+        :param start: Number of first letters of ``word`` to skip.
+        """
+        # pylint: disable=protected-access
+        node = self
+        length = len(word)
+
+        while start < length:
+            node._fragment = None
+            node.weight += weight
+            first_letter = word[start]
+            edge = node._edges.get(first_letter) if node._edges is not None else None
+
+            # no edge starting with the same letter, create a new branch
+            if edge is None:
+                if node._edges is None:
+                    node._edges = {}
+
+                node._edges[first_letter] = PrefixTreeEdge(
+                    word[start:] if start else word, True, new_node, weight
+                )
+                return
 
-            new_word = prefix + center + '{' + str(repeat_count + 1) + '}'
-            i = len(new_word) - 1  # skip the compressed part, investigate only the rest
-            new_word += suffix
-            word = new_word
-            stop_index = get_stop_index(word, sliding_window_len)
+            label = edge._label
 
-        i += 1
+            if not word.startswith(label, start):
+                # label doesn't continue the word, split it or branch at the
+                # first different letter
+                position = common_length(label, word, start)
 
-    return word if compression_observed else compress(word, sliding_window_len - 1)
+                if start + position == length:
+                    edge._split(word, start, weight)
+                else:
+                    edge._branch(word, start, position, weight)
+                return
 
+            start += len(label)
+            node = edge._target_node
 
-class PrefixTreeNode:
-    def __init__(self, terminal_node=False):
-        self._edges = None
-        self.terminal_node = terminal_node
+        if node is not self:
+            # current word and edge are the same, mark target node as terminal
+            node.terminal_node = True
+            node.weight += weight
+            node.invalidate()
 
-    def add(self, word: str, new_node: "PrefixTreeNode" = None):
-        if not word:
-            return
+    def remove(self, word: Any) -> bool:
+        """Removes a word from the sub-tree. A node left with a single edge and
+        not ending any word is merged into the edge leading to it.
 
-        first_letter = word[0]
+        :return: ``False`` if the word is not in the sub-tree.
+        """
+        # pylint: disable=protected-access
+        path = []  # type: List[Tuple[PrefixTreeNode, PrefixTreeEdge]]
+        node = self
+        position = 0
 
-        # no edge starting with the same letter, create a new branch
-        if self._edges is None or first_letter not in self._edges:
-            if self._edges is None:
-                self._edges = {}
+        while position < len(word):
+            edge = node._edges.get(word[position]) if node._edges is not None else None
 
-            self._edges[first_letter] = PrefixTreeEdge(word, True, new_node)
-        else:
-            self._edges[first_letter].add(word)
+            if edge is None or not word.startswith(edge._label, position):
+                return False
 
-    @staticmethod
-    def _non_matching_brackets(string: str) -> str:
-        return '(?:' + string + ')'
+            path.append((node, edge))
+            position += len(edge._label)
+            node = edge._target_node
 
-    def _add_me(self, string: str, add_brackets: bool) -> str:
-        if self.terminal_node:
-            return (self._non_matching_brackets(string) if add_brackets else string) + '?'
+        if not path or not node.terminal_node:
+            return False
 
-        return string
+        # weight of the word itself, without longer words
+        weight = node.weight - sum(
+            child_edge._target_node.weight for child_edge in node._edges.values()
+        ) if node._edges is not None else node.weight
 
-    def to_regexp(self):
-        if self._edges is None:  # target node is leaf
-            return ''
+        for parent, _ in path:
+            parent._fragment = None
+            parent.weight -= weight
 
-        # not leaf, get sub-strings from children
-        letters = []
-        strings = []
+        node._fragment = None
+        node.weight -= weight
+        node.terminal_node = False
+        parent, edge = path[-1]
 
-        for edge in self._edges.values():
-            sub_str = edge.to_regexp()
-            if len(sub_str) == 1:  # just one letter received, more can be grouped in [XYZ]
-                letters.append(sub_str)
-            else:
-                # strings received, can be grouped just with | symbol
-                strings.append(sub_str)
+        if node._edges is None:  # no longer words, remove the edge
+            del parent._edges[edge._label[0]]
 
-        if letters and not strings:  # just letters
-            if len(letters) == 1:  # just one letter
-                return self._add_me(re.escape(letters[0]), False)
+            if not parent._edges:
+                parent._edges = None
 
-            # more letters, group in []
-            return self._add_me(
-                '[' + ''.join(collapse_letter_ranges(letters)) + ']', False
-            )
+            if len(path) == 1:  # parent is the root of the sub-tree
+                return True
 
-        if not letters and len(strings) == 1:  # just one string
-            return self._add_me(strings[0], True)
+            node = parent
+            edge = path[-2][1]
 
-        # combination of letters and strings
-        if len(letters) > 1:
-            strings.insert(0, '[' + ''.join(collapse_letter_ranges(letters)) + ']')
-        elif len(letters) == 1:
-            strings.insert(0, letters[0])
+        if not node.terminal_node and node._edges is not None and len(node._edges) == 1:
+            child_edge = next(iter(node._edges.values()))
+            edge._label += child_edge._label
+            edge._target_node = child_edge._target_node
 
-        return self._add_me(self._non_matching_brackets('|'.join(strings)), False)
+        return True
 
+    def to_regexp(self, atomic: bool = False) -> str:
+        """:param atomic: See `RegexpEmitter`."""
+        return (_ATOMIC_EMITTER if atomic else _EMITTER).emit(self)
 
-class PrefixTreeEdge:
-    def __init__(self, label, terminal, new_node=None):
-        self._target_node = new_node if new_node is not None else PrefixTreeNode(terminal)
+
+class PrefixTreeEdge:  # pylint: disable=too-few-public-methods
+    __slots__ = ('_target_node', '_label')
+
+    def __init__(self, label, terminal, new_node=None, weight=1):
+        self._target_node = new_node if new_node is not None else \
+            PrefixTreeNode(terminal, weight)
         self._label = label
 
-    def _split(self, word, position):
-        new_node = PrefixTreeNode(True)
-        new_node.add(self._label[position:], self._target_node)
-        self._label = word
+    def _split(self, word, start, weight=1):
+        """Ends ``word[start:]``, a prefix of the label, in the middle of the edge."""
+        position = len(word) - start
+        new_node = PrefixTreeNode(True, weight)
+        new_node.add(self._label, self._target_node, self._target_node.weight, position)
+        self._label = self._label[:position]
         self._target_node = new_node
 
-    def _branch(self, word, position):
+    def _branch(self, word, start, position, weight=1):
+        """Branches ``word[start:]`` off the edge after ``position`` common letters."""
         new_node = PrefixTreeNode(False)  # create branching node, not terminal
 
         # create branch from the original label, use original node as end of the edge
-        new_node.add(self._label[position:], self._target_node)
+        new_node.add(self._label, self._target_node, self._target_node.weight, position)
 
         # create branch from the new word, new node will be needed
-        new_node.add(word[position:])
-        self._label = word[:position]  # update label to the common part of both
+        new_node.add(word, weight=weight, start=start + position)
+        self._label = self._label[:position]  # update label to the common part of both
         self._target_node = new_node  # update target node to point to the splitting one
 
-    def add(self, word):
-        # find branching
-        for i in range(min(len(word), len(self._label))):
-            if word[i] != self._label[i]:  # difference found, branch
-                self._branch(word, i)
-                return
-
-        # no differences on the shortest length of both label and the new word
-        if len(word) > len(self._label):
-            # current edge is prefix of inputted word
-            self._target_node.add(word[len(self._label):])
-        elif len(word) < len(self._label):
-            # current edge has inputted word as prefix, split it
-            self._split(word, len(word))
-        else:
-            # current word and edge are the same, mark target node as terminal
-            self._target_node.terminal_node = True
-
-    def to_regexp(self):
-        from_below = self._target_node.to_regexp()
-
-        if len(from_below) + len(self._label) <= 1:  # don't escape single characters
-            return self._label + from_below
-
-        return compress(re.escape(self._label)) + from_below
+    def to_regexp(self) -> str:
+        return _EMITTER.emit_edge(self._label, self._target_node)
@@ -0,0 +1,288 @@
+"""Compression of repeated sub-strings of regular expressions into ``{n}`` quantifiers.
+
+Repetitions are found as *runs*, maximal sub-strings made of at least two
+copies of their shortest period. They are located with the divide and conquer
+algorithm of Main and Lorentz, which uses Z-functions to find all runs crossing
+the middle of a segment and recurses into both halves. This takes O(n log n)
+time for a string of length n.
+"""
+import re
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Dict,
+    List,
+    Sequence,
+    Tuple,
+)
+
+Run = Tuple[int, int, int]
+"""Start (inclusive), end (exclusive) and period of a run."""
+
+_SEPARATOR = object()  # not equal to any symbol
+_MAX_SCANNED_LENGTH = 32
+_MAX_PRECHECKED_LENGTH = 64
+_SQUARE = re.compile(r'(.+)\1', re.DOTALL)
+
+
+def add_brackets_around_string(word: str) -> str:
+    """Adds square brackets for single character strings and round the rest.
+    """
+    if len(word) == 1 or (len(word) == 2 and word.startswith('\\')):
+        return word
+
+    return '(?:' + word + ')'
+
+
+def z_function(sequence: Sequence[Any]) -> List[int]:
+    """
+    :return: For each position, length of the longest common prefix of
+        ``sequence`` and its suffix starting at that position. Value for
+        the position 0 is 0.
+    """
+    length = len(sequence)
+    z_values = [0] * length
+    left = right = 0
+
+    for i in range(1, length):
+        if i < right:
+            z_values[i] = min(right - i, z_values[i - left])
+
+        while i + z_values[i] < length and \
+                sequence[z_values[i]] == sequence[i + z_values[i]]:
+            z_values[i] += 1
+
+        if i + z_values[i] > right:
+            left, right = i, i + z_values[i]
+
+    return z_values
+
+
+def _runs_crossing_middle(
+        sequence: List[Any], low: int, middle: int, high: int
+) -> List[Run]:
+    """Finds runs within ``sequence[low:high]`` containing both
+    ``sequence[middle - 1]`` and ``sequence[middle]``.
+
+    A run with period p is a maximal stretch of positions i for which
+    ``sequence[i] == sequence[i + p]``, at least p long. A stretch crossing
+    the middle either contains the position ``middle - p`` or, if it does not,
+    the position ``middle``. Both are extended backward and forward by the
+    longest common suffix and prefix, taken from the Z-functions.
+    """
+    return _runs_before_middle(sequence, low, middle, high) + \
+        _runs_from_middle(sequence, low, middle, high)
+
+
+def _runs_before_middle(
+        sequence: List[Any], low: int, middle: int, high: int
+) -> List[Run]:
+    """Finds runs crossing the middle, whose stretch contains ``middle - p``.
+    """
+    left_reversed = sequence[low:middle][::-1]
+    left_length = middle - low
+    right_length = high - middle
+    runs = []  # type: List[Run]
+
+    # common suffixes of the left half and its prefixes
+    z_left_reversed = z_function(left_reversed) + [0]
+    # common prefixes of the right half and suffixes of the segment
+    z_right_in_segment = z_function(
+        sequence[middle:high] + [_SEPARATOR] + sequence[low:high]
+    )
+
+    for period in range(1, left_length + 1):
+        forward = z_right_in_segment[right_length + 1 + left_length - period]
+        backward = z_left_reversed[period]
+
+        if forward and backward + forward >= period:
+            start = middle - period - backward
+            runs.append((start, middle + forward, period))
+
+    return runs
+
+
+def _runs_from_middle(
+        sequence: List[Any], low: int, middle: int, high: int
+) -> List[Run]:
+    """Finds runs crossing the middle, whose stretch contains ``middle``, but
+    not ``middle - p``.
+    """
+    right = sequence[middle:high]
+    left_length = middle - low
+    right_length = high - middle
+    runs = []  # type: List[Run]
+
+    # common prefixes of the right half and its suffixes
+    z_right = z_function(right)
+    # common suffixes of the left half and prefixes of the segment
+    z_left_in_segment = z_function(
+        sequence[low:middle][::-1] + [_SEPARATOR] + sequence[low:high][::-1]
+    )
+
+    for period in range(1, right_length):
+        forward = z_right[period]
+        backward = z_left_in_segment[left_length + 1 + right_length - period]
+
+        if 0 < backward < period <= backward + forward:
+            runs.append((middle - backward, middle + period + forward, period))
+
+    return runs
+
+
+def _find_runs_by_scanning(sequence: Sequence[Any]) -> List[Run]:
+    """Finds all runs by comparing each position with positions one period
+    apart, for all periods. Takes O(n^2) time, but is faster than `find_runs`
+    for short sequences.
+    """
+    length = len(sequence)
+    shortest_periods = {}  # type: Dict[Tuple[int, int], int]
+
+    for period in range(1, length // 2 + 1):
+        start = 0
+
+        while start + period < length:
+            end = start
+
+            while end + period < length and sequence[end] == sequence[end + period]:
+                end += 1
+
+            if end - start >= period:
+                shortest_periods.setdefault((start, end + period), period)
+
+            start = end if end > start else start + 1
+
+    return sorted(
+        (start, end, period) for (start, end), period in shortest_periods.items()
+    )
+
+
+def find_runs(sequence: Sequence[Any]) -> List[Run]:
+    """Finds all runs in ``sequence``.
+
+    :param sequence: Comparable symbols, such as characters.
+    :return: Runs sorted by their start, end and period.
+    """
+    sequence = list(sequence)
+
+    if len(sequence) <= _MAX_SCANNED_LENGTH:
+        return _find_runs_by_scanning(sequence)
+
+    candidates = []  # type: List[Run]
+    segments = [(0, len(sequence))]
+
+    while segments:
+        low, high = segments.pop()
+
+        if high - low < 2:
+            continue
+
+        middle = (low + high) // 2
+        candidates.extend(_runs_crossing_middle(sequence, low, middle, high))
+        segments.append((low, middle))
+        segments.append((middle, high))
+
+    # Runs found in a segment may be cut by its boundaries. Keep only the
+    # maximal ones for each period.
+    candidates.sort(key=lambda run: (run[2], run[0], -run[1]))
+    maximal = []  # type: List[Run]
+
+    for run in candidates:
+        if maximal and maximal[-1][2] == run[2] and run[1] <= maximal[-1][1]:
+            continue  # contained in the previous run of the same period
+
+        maximal.append(run)
+
+    # Stretch of a period that is a multiple of the smallest period covers
+    # the same positions. Keep only the smallest period, which comes first.
+    shortest_periods = {}  # type: Dict[Tuple[int, int], int]
+
+    for start, end, period in maximal:
+        shortest_periods.setdefault((start, end), period)
+
+    return sorted(
+        (start, end, period) for (start, end), period in shortest_periods.items()
+    )
+
+
+def split_escaped(word: str) -> List[str]:
+    """Splits an escaped regular expression into literal characters, keeping
+    escape sequences together.
+    """
+    if '\\' not in word:
+        return list(word)
+
+    atoms = []  # type: List[str]
+    i = 0
+
+    while i < len(word):
+        atom_length = 2 if word[i] == '\\' and i + 1 < len(word) else 1
+        atoms.append(word[i:i + atom_length])
+        i += atom_length
+
+    return atoms
+
+
+def _select_blocks(runs: List[Run]) -> List[Run]:
+    """Chooses non-overlapping blocks of runs, in which the longest sub-string
+    is repeated.
+
+    Runs are processed from left to right. Each one is trimmed to the part not
+    covered by the previous block and shortened to a whole number of periods.
+
+    :return: Blocks as (start, end, period), sorted by start.
+    """
+    if not runs:
+        return []
+
+    longest = max(period * ((end - start) // (2 * period)) for start, end, period in runs)
+    blocks = []  # type: List[Run]
+    covered_end = 0
+
+    for start, end, period in runs:
+        start = max(start, covered_end)
+
+        if longest % period == 0 and end - start >= 2 * longest:
+            covered_end = start + (end - start) // period * period
+            blocks.append((start, covered_end, period))
+
+    return blocks
+
+
+def _compress_atoms(atoms: List[str]) -> str:
+    parts = []  # type: List[str]
+    position = 0
+
+    for start, end, period in _select_blocks(find_runs(atoms)):
+        unit = atoms[start:start + period]
+        parts.append(''.join(atoms[position:start]))
+        parts.append(add_brackets_around_string(
+            unit[0] if period == 1 else _compress_atoms(unit)
+        ))
+        parts.append('{' + str((end - start) // period) + '}')
+        position = end
+
+    parts.append(''.join(atoms[position:]))
+    return ''.join(parts)
+
+
+def compress(word: str) -> str:
+    """Replaces adjacent repetitions of sub-strings with ``{n}`` quantifiers.
+
+    Example::
+
+        BLACTGACTGA contains BL - 2x ACTG - A -> BL(?:ACTG){2}A
+
+    Only runs containing the longest repeated sub-string are compressed, each
+    with its shortest period. Repeated sub-strings are compressed recursively,
+    so shorter repetitions are found in longer ones. Escape sequences are
+    treated as single characters.
+
+    :param word: Escaped regular expression of a literal string.
+    :return: Compressed string.
+    """
+    # Most labels are short and have no repetitions. This is much faster to
+    # find out with the C implementation of regular expressions.
+    if len(word) <= _MAX_PRECHECKED_LENGTH and not _SQUARE.search(word):
+        return word
+
+    return _compress_atoms(split_escaped(word))
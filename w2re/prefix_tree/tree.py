@@ -1,27 +1,349 @@
-from typing import Optional, Iterable, Type
+from typing import (  # pylint: disable=unused-import; false positive
+    AnyStr,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
-from w2re.prefix_tree.primitives import PrefixTreeNode
+from w2re.prefix_tree.mapped import (
+    MappedPrefixTree,
+    write_tree,
+)
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.primitives import (
+    PrefixTreeEdge,
+    PrefixTreeNode,
+    PrerenderedNode,
+    RegexpNode,
+)
 from w2re.formatters import BaseFormatter
 
+PathEdge = Tuple[int, PrefixTreeEdge]
+"""Edge on a path from the root and number of letters before its label."""
 
-class PrefixTree:
-    def __init__(self, words: Optional[Iterable[str]] = None) -> None:
+WeightedWord = Tuple[str, int]
+"""Word and its weight, such as number of its occurrences."""
+
+
+def common_prefix_length(first: AnyStr, second: AnyStr) -> int:
+    """Finds the length of the longest common prefix by binary search, comparing
+    whole slices instead of single letters.
+    """
+    low, high = 0, min(len(first), len(second))
+
+    if first[:high] == second[:high]:
+        return high
+
+    # first[:low] == second[:low] and first[:high] != second[:high]
+    while high - low > 1:
+        middle = (low + high) // 2
+
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle
+
+    return low
+
+
+class BasePrefixTree(Generic[AnyStr]):
+    """Words of a prefix tree, which are ``str`` in `PrefixTree` and ``bytes`` in
+    `w2re.prefix_tree.bytes_tree.BytesPrefixTree`.
+
+    :param words: Added by `extend`.
+    :param cache_regexp: Keep regular expressions of all sub-trees, so that
+        ``to_regexp`` serializes again only those changed since the last call.
+        This makes repeated calls on big trees with few changes much faster,
+        but costs memory.
+    """
+
+    def __init__(
+            self, words: Optional[Iterable[AnyStr]] = None, cache_regexp: bool = False
+    ) -> None:
         self._root_node = PrefixTreeNode()
+        self._emitter = RegexpEmitter(cache_fragments=True) if cache_regexp else None
 
         if words is not None:
             self.extend(words)
 
-    def add(self, word: str):
-        self._root_node.add(word)
+    def add(self, word: AnyStr, weight: int = 1):
+        """
+        :param word: Word to add.
+        :param weight: Added to weights of all nodes on the path of the word, such
+            as number of its occurrences, so each node holds the total weight
+            of words below it. Weights of repeated words add up. Used to order
+            alternatives by `RegexpEmitter` with ``weighted`` set.
+        :raises ValueError: If the weight is negative.
+        """
+        if weight < 0:
+            raise ValueError('Weight must not be negative, but is {}.'.format(weight))
+
+        self._root_node.add(word, weight=weight)
+
+    def extend_weighted(self, weighted_words: Iterable[Tuple[AnyStr, int]]):
+        """Adds pairs of word and its weight, see `add`."""
+        for word, weight in weighted_words:
+            self.add(word, weight)
+
+    def remove(self, word: AnyStr):
+        """
+        :raises KeyError: If the word is not in the tree.
+        """
+        if not self._root_node.remove(word):
+            raise KeyError(word)
+
+    def extend(self, words: Iterable[AnyStr]):
+        for word in words:
+            self.add(word)
+
+    def __contains__(self, word: AnyStr) -> bool:
+        """Follows the path of ``word`` from the root. Takes O(len(word)) time:
+        one dict lookup and one label comparison per edge on the path.
+        """
+        # pylint: disable=protected-access
+        node = self._root_node
+        position = 0
+        # typeshed lacks the start argument of bytes.startswith
+        startswith = word.startswith  # type: Callable[..., bool]
+
+        while position < len(word):
+            edge = node._edges.get(word[position]) if node._edges is not None else None
+
+            if edge is None or not startswith(edge._label, position):
+                return False
+
+            position += len(edge._label)
+            node = edge._target_node
+
+        return position > 0 and node.terminal_node
+
+    def contains_many(self, words: Iterable[AnyStr]) -> List[bool]:
+        """:return: Whether each of ``words`` is in the tree, see `__contains__`."""
+        contains = self.__contains__
+        return [contains(word) for word in words]
+
+    def _prefix_lengths(self, text: AnyStr) -> Iterator[int]:
+        """:return: Lengths of words which are prefixes of ``text``, ascending."""
+        # pylint: disable=protected-access
+        node = self._root_node
+        position = 0
+        startswith = text.startswith  # type: Callable[..., bool]
+
+        while node._edges is not None and position < len(text):
+            edge = node._edges.get(text[position])
+
+            if edge is None or not startswith(edge._label, position):
+                return
+
+            position += len(edge._label)
+            node = edge._target_node
+
+            if node.terminal_node:
+                yield position
+
+    def has_prefix(self, text: AnyStr) -> bool:
+        """Checks if ``text`` starts with any word. Takes O(len(text)) time, but
+        stops at the shortest word found.
+        """
+        for _ in self._prefix_lengths(text):
+            return True
+
+        return False
+
+    def longest_prefix_match(self, text: AnyStr) -> Optional[AnyStr]:
+        """Takes O(len(text)) time.
+
+        :return: The longest word ``text`` starts with, or ``None`` if there is no
+            such word.
+        """
+        length = None
+
+        for length in self._prefix_lengths(text):
+            pass
+
+        return None if length is None else text[:length]
+
+    @staticmethod
+    def _extend_path(path: List[PathEdge], node: PrefixTreeNode, word: AnyStr) -> None:
+        """Appends edges leading to the end of ``word`` from ``node``, which
+        ends the path.
+        """
+        # pylint: disable=protected-access
+        position = path[-1][0] + len(path[-1][1]._label) if path else 0
+
+        while position < len(word):
+            edge = node._edges[word[position]]
+            path.append((position, edge))
+            position += len(edge._label)
+            node = edge._target_node
+
+    def extend_sorted(self, words: Iterable[AnyStr], strict: bool = True):
+        """Adds lexicographically sorted words faster than `extend`.
+
+        Path to the previous word is kept. Each word is compared only with the
+        previous one and inserted where it leaves its path, instead of walking
+        from the root.
+
+        :param words: Words to add.
+        :param strict: If set, unsorted words raise an error. Otherwise they are
+            added the same way as with `add`, which is slower.
+        :raises ValueError: If words are not sorted and ``strict`` is set. Words
+            preceding the unsorted one are added.
+        """
+        previous_word = None  # type: Optional[AnyStr]
+        path = []  # type: Optional[List[PathEdge]]
 
-    def extend(self, words: Iterable[str]):
         for word in words:
+            if previous_word is None:  # first word
+                previous_word = word[:0]
+
+            length = common_prefix_length(previous_word, word)
+
+            if length == len(word):  # same as or prefix of the previous word
+                if not word:
+                    continue
+
+                if word == previous_word:
+                    self._add_again(path, word)
+                    continue
+            elif length == len(previous_word) or word[length] > previous_word[length]:
+                path = self._add_after(path, word, length)
+                previous_word = word
+                continue
+
+            if strict:
+                raise ValueError("Words must be sorted, but '{}' follows '{}'.".format(
+                    word, previous_word
+                ))
+
+            self.add(word)
+            path = None  # edges of the path may have been split
+
+    def _add_after(
+            self, path: Optional[List[PathEdge]], word: AnyStr, length: int
+    ) -> List[PathEdge]:
+        """Adds ``word`` sharing ``length`` first letters with the word at the
+        end of ``path``.
+
+        :return: Path to the new word.
+        """
+        if path is None:  # rebuild after unsorted words
+            path = []
+            self._extend_path(path, self._root_node, word[:length])
+
+        while path and path[-1][0] >= length:  # edges after the common prefix
+            path.pop()
+
+        self._root_node.invalidate()
+
+        for _, edge in path:
+            edge._target_node.invalidate()  # pylint: disable=protected-access
+
+        if path:
+            # the last node of the path is weighted by add or _branch
+            self._root_node.weight += 1
+
+            for _, edge in path[:-1]:
+                edge._target_node.weight += 1  # pylint: disable=protected-access
+
+            start, edge = path[-1]
+            node = edge._target_node  # pylint: disable=protected-access
+
+            if length < start + len(edge._label):  # pylint: disable=protected-access
+                # word leaves the path in the middle of the label
+                # pylint: disable=protected-access
+                edge._branch(word, start, length - start)
+                node = edge._target_node  # pylint: disable=protected-access
+            else:
+                node.add(word, start=length)
+        else:
+            node = self._root_node
+            node.add(word)
+
+        self._extend_path(path, node, word)
+        return path
+
+    def _add_again(self, path: Optional[List[PathEdge]], word: AnyStr) -> None:
+        """Adds the word at the end of ``path`` once more, which changes only
+        weights of nodes on the path.
+        """
+        if path is None:
             self.add(word)
+            return
+
+        self._root_node.weight += 1
+        self._root_node.invalidate()
+
+        for _, edge in path:
+            edge._target_node.weight += 1  # pylint: disable=protected-access
+            edge._target_node.invalidate()  # pylint: disable=protected-access
+
+    def _regexp_node(self, emitter: Optional[RegexpEmitter]) -> RegexpNode:
+        """:return: Root node for formatters, serialized by ``emitter`` if given."""
+        if emitter is not None:
+            return PrerenderedNode(emitter.emit(self._root_node), emitter.atomic)
+
+        if self._emitter is not None:
+            return _CachedNode(self._root_node, self._emitter)
+
+        return self._root_node
+
+
+class PrefixTree(BasePrefixTree[str]):
+    """Prefix tree of ``str`` words, see `BasePrefixTree`."""
+
+    def save(self, path: str) -> None:
+        """Writes the tree into a binary file, see `w2re.prefix_tree.mapped`."""
+        with open(path, 'wb') as output_file:
+            write_tree(self._root_node, output_file)
 
-    def to_regexp(self, formatter: Type[BaseFormatter]) -> str:
+    @staticmethod
+    def load(path: str) -> MappedPrefixTree:
         """
+        :return: Read-only tree mapped from a file written by `save`. It converts
+            to the same regular expression as the saved tree.
+        :raises ValueError: If the file is not a saved prefix tree.
+        """
+        return MappedPrefixTree(path)
+
+    def to_regexp(
+            self,
+            formatter: Type[BaseFormatter],
+            emitter: Optional[RegexpEmitter] = None
+    ) -> str:
+        """
+        :param formatter: Formatter of the regular expression.
+        :param emitter: Custom serializer of the tree, such as one sharing
+            identical sub-trees. Keeps statistics of its caches.
+        :raises ValueError: If the emitter serializes atomic groups and the
+            formatter does not need them, or vice versa.
         :return Returns regular expression representation of the structure.
         If the structure is empty, returns regular expression matching
         empty string.
         """
-        return formatter.wrap_regexp(self._root_node)
+        return formatter.wrap_regexp(self._regexp_node(emitter))
+
+
+class _CachedNode(RegexpNode):  # pylint: disable=too-few-public-methods
+    """Root node serialized by an emitter caching fragments of sub-trees.
+
+    Atomic regular expressions are serialized without the cache, whose
+    fragments have plain groups.
+    """
+
+    __slots__ = ('_root_node', '_emitter')
+
+    def __init__(self, root_node: PrefixTreeNode, emitter: RegexpEmitter) -> None:
+        self._root_node = root_node
+        self._emitter = emitter
+
+    def to_regexp(self, atomic: bool = False) -> str:
+        if atomic:
+            return self._root_node.to_regexp(atomic=True)
+
+        return self._emitter.emit(self._root_node)
@@ -0,0 +1,288 @@
+"""Reading of words from streams and files.
+
+Input is read in chunks, so big files are never held in memory at once, and
+split into lines with any newline convention. Files can be compressed and are
+read by a pool of threads, see `iter_files_lines`.
+"""
+import bz2
+import codecs
+import gzip
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    AnyStr,
+    Callable,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from w2re.prefix_tree.tree import WeightedWord
+
+DEFAULT_ENCODING = 'utf-8'
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+WEIGHT_SEPARATOR = '\t'
+
+_LINE_BREAK = re.compile('\r\n|\r|\n')
+_BYTES_LINE_BREAK = re.compile(b'\r\n|\r|\n')
+
+DEFAULT_READER_THREADS = 4
+_QUEUE_SIZE = 4  # chunks of lines read ahead by each reader of iter_files_lines
+
+_DECOMPRESSING_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+}  # type: Dict[str, Callable[..., IO]]
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover; Python built without liblzma
+    pass
+else:
+    _DECOMPRESSING_OPENERS.update({'.xz': lzma.open, '.lzma': lzma.open})
+
+
+def iter_stream_chunks(
+        stream: IO,
+        encoding: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """Lazily reads a stream in chunks of text.
+
+    :param stream: Text stream, binary stream or any object with a ``read(size)``
+        method, such as ``mmap.mmap``.
+    :param encoding: Used to decode ``bytes`` returned by binary streams. Ignored
+        for text streams.
+    :param chunk_size: Number of characters (or bytes) read at once.
+    :return: Iterator of non-empty chunks of text.
+    """
+    decoder = None
+
+    while True:
+        chunk = stream.read(chunk_size)  # type: Union[str, bytes]
+
+        if not chunk:
+            break
+
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+
+        if chunk:  # may be empty if the chunk ended in a middle of a character
+            yield chunk
+
+    if decoder is not None:
+        chunk = decoder.decode(b'', True)
+
+        if chunk:
+            yield chunk
+
+
+def iter_stream_lines(
+        stream: IO,
+        encoding: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """Lazily splits a stream into non-empty lines.
+
+    The stream is read in chunks of ``chunk_size``, so only the current chunk and
+    an unfinished line are held in memory at any time. Lines can be terminated by
+    ``\\n``, ``\\r\\n`` or ``\\r``, even if mixed in one stream.
+
+    See `iter_stream_chunks` for the parameters.
+
+    :return: Iterator of lines without line terminators. Empty lines are skipped.
+    """
+    pending = ''
+
+    for chunk in iter_stream_chunks(stream, encoding, chunk_size):
+        lines, pending = split_lines(pending + chunk)
+
+        for line in lines:
+            if line:
+                yield line
+
+    for line in _LINE_BREAK.split(pending):
+        if line:
+            yield line
+
+
+def _iter_stream_line_batches(
+        stream: IO, encoding: str, chunk_size: int
+) -> Iterator[List[str]]:
+    """Same as `iter_stream_lines`, but returns non-empty lists of lines of
+    each chunk.
+    """
+    pending = ''
+
+    for chunk in iter_stream_chunks(stream, encoding, chunk_size):
+        lines, pending = split_lines(pending + chunk)
+        lines = [line for line in lines if line]
+
+        if lines:
+            yield lines
+
+    lines = [line for line in _LINE_BREAK.split(pending) if line]
+
+    if lines:
+        yield lines
+
+
+def split_lines(text: AnyStr) -> Tuple[List[AnyStr], AnyStr]:
+    """Splits a part of a text or binary stream into lines, see
+    `iter_stream_lines`.
+
+    :return: Finished lines, including empty ones, and the rest of the text,
+        which may continue in the next part.
+    """
+    if isinstance(text, str):
+        line_break, carriage_return = _LINE_BREAK, '\r'  # type: Tuple[Any, Any]
+    else:
+        line_break, carriage_return = _BYTES_LINE_BREAK, b'\r'
+
+    if text.endswith(carriage_return):  # may be the first half of "\r\n"
+        lines = line_break.split(text[:-1])
+        return lines, lines.pop() + carriage_return
+
+    lines = line_break.split(text)
+    return lines, lines.pop()
+
+
+def iter_stream_byte_lines(
+        stream: IO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Same as `iter_stream_lines`, but lines of a binary stream are not decoded."""
+    pending = b''
+
+    while True:
+        chunk = stream.read(chunk_size)  # type: bytes
+
+        if not chunk:
+            break
+
+        lines, pending = split_lines(pending + chunk)
+
+        for line in lines:
+            if line:
+                yield line
+
+    for line in _BYTES_LINE_BREAK.split(pending):
+        if line:
+            yield line
+
+
+def open_input_file(path: str) -> IO:
+    """Opens a file of words in binary mode. Files ending with ``.gz``, ``.bz2``,
+    ``.xz`` or ``.lzma`` are decompressed while they are read, ``.xz`` and
+    ``.lzma`` only if Python has the ``lzma`` module.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return _DECOMPRESSING_OPENERS.get(extension, open)(path, 'rb')
+
+
+def iter_files_lines(
+        paths: Sequence[str],
+        encoding: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        threads: int = DEFAULT_READER_THREADS
+) -> Iterator[str]:
+    """Lazily reads non-empty lines of files, see `open_input_file`.
+
+    Up to ``threads`` files are read and decompressed at once by a thread pool,
+    which releases the GIL while waiting for I/O and decompressing, so it
+    overlaps with processing of the returned lines. Each reader holds at most a
+    few chunks of lines ahead. Lines are returned in order of the files, the
+    same as if they were concatenated, so the output doesn't depend on timing
+    of the threads.
+
+    See `iter_stream_lines` for the other parameters.
+
+    :raises OSError: If a file can't be read.
+    """
+    cancelled = threading.Event()
+    queues = [queue.Queue(_QUEUE_SIZE) for _ in paths]  # type: List[queue.Queue]
+
+    with ThreadPoolExecutor(max(1, threads)) as executor:
+        futures = [
+            executor.submit(_read_file_lines, path, lines_queue, encoding, chunk_size,
+                            cancelled)
+            for path, lines_queue in zip(paths, queues)
+        ]
+
+        try:
+            for future, lines_queue in zip(futures, queues):
+                for lines in iter(lines_queue.get, None):
+                    yield from lines
+
+                future.result()  # raises errors of the reader
+        finally:
+            cancelled.set()  # stops readers if lines are not read to the end
+
+
+def _read_file_lines(
+        path: str,
+        lines_queue: queue.Queue,
+        encoding: str,
+        chunk_size: int,
+        cancelled: threading.Event
+) -> None:
+    """Puts lists of lines of a file into ``lines_queue`` and ``None`` at the
+    end, even if reading fails, unless ``cancelled`` is set.
+    """
+    try:
+        if cancelled.is_set():
+            return
+
+        with open_input_file(path) as stream:
+            for lines in _iter_stream_line_batches(stream, encoding, chunk_size):
+                if not _put(lines_queue, lines, cancelled):
+                    return
+    finally:
+        _put(lines_queue, None, cancelled)
+
+
+def _put(lines_queue: queue.Queue, item: Any, cancelled: threading.Event) -> bool:
+    """Waits for free space in a bounded queue, unless ``cancelled`` is set.
+
+    :return: ``False`` if cancelled.
+    """
+    while not cancelled.is_set():
+        try:
+            lines_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+
+def parse_weighted_lines(lines: Iterable[str]) -> Iterator[WeightedWord]:
+    """Splits lines in ``word<TAB>count`` format into words and their weights.
+    The count follows the last tab, so words can contain tabs. Lines without a
+    tab are words of weight 1.
+
+    :raises ValueError: If a count is not a non-negative integer.
+    """
+    for line in lines:
+        word, separator, count = line.rpartition(WEIGHT_SEPARATOR)
+
+        if not separator:
+            yield line, 1
+            continue
+
+        if not count.isdigit():
+            raise ValueError("Count of word '{}' must be a non-negative integer, "
+                             "but is '{}'.".format(word, count))
+
+        yield word, int(count)
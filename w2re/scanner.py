@@ -0,0 +1,237 @@
+"""Search for listed words in text with an Aho-Corasick automaton.
+
+States of the automaton are letters on paths of a prefix tree. Failure links
+lead to the state of the longest proper suffix of the path that is also a path
+in the tree, so the text is read only once, regardless of the number of words.
+
+Matches are the same as those of ``re.finditer`` with the regular expression of
+`PythonWordMatchFormatter`: words preceded by the start of the text or a non-word
+character and followed by the end of the text or a non-word character, not
+overlapping each other. Of words starting at the same position, the longest one
+is matched. Of words starting after the same run of non-word characters, the one
+starting last is matched, like with the greedy ``\\W+``. Without words, nothing
+is matched.
+"""
+from collections import deque
+from typing import (  # pylint: disable=unused-import; false positive
+    IO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from w2re.prefix_tree.tree import PrefixTree
+from w2re.reading import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_ENCODING,
+    iter_stream_chunks,
+)
+
+_ROOT = 0
+_NO_STATE = -1
+
+Match = Tuple[int, str]
+"""Position of a matched word in the text and the word."""
+
+
+class WordScanner:
+    """Aho-Corasick automaton of words of a prefix tree.
+
+    :param tree: Only read while building the automaton, so it can be changed
+        afterwards.
+    """
+
+    def __init__(self, tree: PrefixTree) -> None:
+        self._transitions = [{}]  # type: List[Dict[str, int]]
+        self._failure = [_ROOT]
+        self._word_length = [0]  # length of the word ending in each state, if any
+        self._output = [_NO_STATE]  # closest state on failure links ending a word
+        self._max_length = 0
+        self._add_tree(tree)
+        self._add_failure_links()
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> 'WordScanner':
+        return cls(PrefixTree(words))
+
+    def _new_state(self) -> int:
+        self._transitions.append({})
+        self._failure.append(_ROOT)
+        self._word_length.append(0)
+        self._output.append(_NO_STATE)
+        return len(self._transitions) - 1
+
+    def _add_tree(self, tree: PrefixTree) -> None:
+        # pylint: disable=protected-access
+        stack = [(tree._root_node, _ROOT, 0)]
+
+        while stack:
+            node, state, depth = stack.pop()
+
+            if node.terminal_node:
+                self._word_length[state] = depth
+                self._max_length = max(self._max_length, depth)
+
+            if node._edges is None:
+                continue
+
+            for edge in node._edges.values():
+                edge_state = state
+
+                for letter in edge._label:
+                    next_state = self._new_state()
+                    self._transitions[edge_state][letter] = next_state
+                    edge_state = next_state
+
+                stack.append((edge._target_node, edge_state, depth + len(edge._label)))
+
+    def _add_failure_links(self) -> None:
+        transitions, failure = self._transitions, self._failure
+        word_length, output = self._word_length, self._output
+        # failure links of depth 1 are root
+        queue = deque(list(transitions[_ROOT].values()))
+
+        while queue:  # breadth-first, so failure links always lead to known states
+            state = queue.popleft()
+
+            for letter, next_state in transitions[state].items():
+                fallback = failure[state]
+
+                while fallback != _ROOT and letter not in transitions[fallback]:
+                    fallback = failure[fallback]
+
+                fallback = transitions[fallback].get(letter, _ROOT)
+                failure[next_state] = fallback
+                output[next_state] = fallback if word_length[fallback] else output[fallback]
+                queue.append(next_state)
+
+    def _candidates(self, chunks: Iterable[str]) -> Iterator[Tuple[int, int, int, str]]:
+        """Finds the longest word followed by the end of text or a non-word
+        character at each position preceded by the start of text or a non-word
+        character.
+
+        :return: Start, end and anchor of each word and the word, in the order of
+            starts. Anchor is the position of the first character of the run of
+            non-word characters before the word.
+        """
+        # pylint: disable=too-many-locals,too-many-branches,too-complex
+        transitions, failure = self._transitions, self._failure
+        word_length, output = self._word_length, self._output
+        max_length = self._max_length
+        state = _ROOT
+        position = 0  # in the whole text
+        text = ''  # end of the text read so far, starting at text_start
+        text_start = 0
+        anchors = {0: 0}  # type: Dict[int, int]  # of positions where words can start
+        starts = deque([0])  # type: deque  # keys of anchors in ascending order
+        run_start = 0
+        previous_is_word = True
+        ends_to_check = []  # type: List[int]  # starts of words ending at position
+        longest_ends = {}  # type: Dict[int, int]  # of words followed by a non-word
+
+        for chunk in chunks:
+            text += chunk
+
+            for letter in chunk:
+                is_word = letter.isalnum() or letter == '_'  # same as \w
+
+                if ends_to_check:
+                    if not is_word:
+                        for start in ends_to_check:
+                            longest_ends[start] = position
+
+                    ends_to_check = []
+
+                if not is_word:
+                    if previous_is_word:
+                        run_start = position
+
+                    anchors[position + 1] = run_start
+                    starts.append(position + 1)
+
+                previous_is_word = is_word
+
+                while state != _ROOT and letter not in transitions[state]:
+                    state = failure[state]
+
+                state = transitions[state].get(letter, _ROOT)
+                position += 1
+                word_state = state if word_length[state] else output[state]
+
+                while word_state != _NO_STATE:
+                    start = position - word_length[word_state]
+
+                    if start in anchors:
+                        ends_to_check.append(start)
+
+                    word_state = output[word_state]
+
+                # all words starting at the first start have been seen and checked
+                while starts and starts[0] + max_length < position:
+                    start = starts.popleft()
+                    anchor = anchors.pop(start)
+                    end = longest_ends.pop(start, None)
+
+                    if end is not None:
+                        yield start, end, anchor, text[start - text_start:end - text_start]
+
+            cut = max(text_start, position - max_length - 1)
+            text = text[cut - text_start:]
+            text_start = cut
+
+        for start in ends_to_check:  # followed by the end of the text
+            longest_ends[start] = position
+
+        for start in starts:
+            end = longest_ends.get(start)
+
+            if end is not None:
+                yield start, end, anchors[start], text[start - text_start:end - text_start]
+
+    def scan(self, chunks: Iterable[str]) -> Iterator[Match]:
+        """Finds words in text split into chunks of any size.
+
+        Only the last chunk and the length of the longest word before it are kept
+        in memory.
+
+        :return: Matches in the order of their positions.
+        """
+        last_end = -1
+        group_anchor = _NO_STATE
+        group_match = None  # type: Optional[Match]
+        group_end = 0
+
+        for start, end, anchor, word in self._candidates(chunks):
+            if anchor != group_anchor:
+                if group_match is not None:
+                    yield group_match
+                    last_end = group_end
+
+                group_anchor, group_match = anchor, None
+
+            if start > last_end:  # the last one in a group is matched
+                group_match, group_end = (start, word), end
+
+        if group_match is not None:
+            yield group_match
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        return self.scan([text])
+
+    def findall(self, text: str) -> List[str]:
+        """:return: Matched words, same as ``re.findall`` with the regular
+            expression of `PythonWordMatchFormatter`.
+        """
+        return [word for _, word in self.scan([text])]
+
+    def scan_stream(
+            self,
+            stream: IO,
+            encoding: str = DEFAULT_ENCODING,
+            chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[Match]:
+        """Finds words in a stream read in chunks, see `iter_stream_chunks`."""
+        return self.scan(iter_stream_chunks(stream, encoding, chunk_size))
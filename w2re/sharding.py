@@ -0,0 +1,232 @@
+"""Conversion of words into multiple regular expressions of bounded size.
+
+A single regular expression of millions of words is too big to be compiled
+quickly. Instead, the prefix tree is split into sub-trees, whose regular
+expressions are grouped into shards no longer than a given size. Sub-trees too
+big for a shard are split further, prepending the path leading to them. Each
+shard is preceded by a common prefix and continues with distinct letters, so a
+whole word can be only matched by the shard with the longest of these keys at
+its start, see `ShardedRegexp`.
+"""
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Match,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+)
+
+from w2re.formatters import (
+    BaseFormatter,
+    PythonAtomicFormatter,
+    PythonFormatter,
+)
+from w2re.prefix_tree.emitter import (
+    Fragment,
+    RegexpEmitter,
+    escape_label,
+    fragment_length,
+    join_fragments,
+)
+from w2re.prefix_tree.primitives import PrerenderedNode
+from w2re.prefix_tree.tree import PrefixTree
+
+_GROUP_OVERHEAD = len('(?:)?')  # brackets and quantifier around alternatives
+
+
+class ShardedRegexp:
+    """Regular expressions of disjoint sets of words with a dispatcher, which
+    finds the only one that can match a word by its first letters.
+
+    :param patterns: Formatted regular expressions of shards.
+    :param keys: Index of the shard matching words starting with each key.
+    """
+
+    def __init__(self, patterns: List[str], keys: Dict[str, int]) -> None:
+        self.patterns = patterns
+        self.keys = keys
+        self._key_lengths = sorted({len(key) for key in keys}, reverse=True)
+        self._compiled = {}  # type: Dict[int, Pattern]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def shard_index(self, word: str) -> Optional[int]:
+        """:return: Index of the only shard that can match ``word``, if any."""
+        for length in self._key_lengths:
+            index = self.keys.get(word[:length])
+
+            if index is not None:
+                return index
+
+        return None
+
+    def pattern_for(self, word: str) -> Optional[str]:
+        index = self.shard_index(word)
+        return None if index is None else self.patterns[index]
+
+    def compiled_for(self, word: str) -> Optional[Pattern]:
+        """:return: Compiled shard for ``word``. Shards are compiled on first use."""
+        index = self.shard_index(word)
+        return None if index is None else self._compiled_shard(index)
+
+    def _compiled_shard(self, index: int) -> Pattern:
+        compiled = self._compiled.get(index)
+
+        if compiled is None:
+            compiled = self._compiled[index] = re.compile(self.patterns[index])
+
+        return compiled
+
+    def match(self, word: str) -> Optional[Match]:
+        """Same as ``re.match`` of one regular expression of all words.
+
+        A shorter word at the start of ``word`` can be in another shard than
+        the longest key, so shards of all keys at its start are tried, from the
+        longest key, which leads to the longest words.
+        """
+        tried = None  # type: Optional[int]
+
+        for length in self._key_lengths:
+            index = self.keys.get(word[:length]) if length <= len(word) else None
+
+            if index is not None and index != tried:
+                matched = self._compiled_shard(index).match(word)
+
+                if matched is not None:
+                    return matched
+
+                tried = index
+
+        return None
+
+    def fullmatch(self, word: str) -> Optional[Match]:
+        """Same as ``re.fullmatch`` of all shards, but only one is tried."""
+        compiled = self.compiled_for(word)
+        return None if compiled is None else compiled.fullmatch(word)
+
+
+class _ShardBuilder:  # pylint: disable=too-few-public-methods
+    """Groups sub-trees into shards, descending into those too big."""
+
+    def __init__(self, formatter: Type[BaseFormatter], max_pattern_size: int) -> None:
+        self._formatter = formatter
+        self._max_pattern_size = max_pattern_size
+        # length added by the formatter to each pattern
+        self._formatter_overhead = len(formatter.wrap_regexp(PrerenderedNode('x'))) - 1
+        # fragments of sub-trees are kept in their nodes, so no sub-tree is
+        # serialized twice when descending
+        self._emitter = RegexpEmitter(cache_fragments=True)
+        self.patterns = []  # type: List[str]
+        self.keys = {}  # type: Dict[str, int]
+
+    def _add_shard(
+            self, prefix: str, keys: List[str], fragments: List[Fragment], terminal: bool
+    ) -> None:
+        fragment = self._emitter.combine(fragments, terminal)
+        regexp = escape_label(prefix) + join_fragments(fragment) if prefix else \
+            join_fragments(fragment)
+
+        for key in keys:
+            self.keys[key] = len(self.patterns)
+
+        self.patterns.append(self._formatter.wrap_regexp(PrerenderedNode(regexp)))
+
+    def add_tree(self, root: Any) -> None:
+        stack = [('', root)]  # type: List[Tuple[str, Any]]
+
+        while stack:
+            prefix, node = stack.pop()
+            stack.extend(reversed(self._add_node(prefix, node)))
+
+    def _add_node(self, prefix: str, node: Any) -> List[Tuple[str, Any]]:
+        """Adds edges of the node to shards.
+
+        :return: Prefixes and children of edges too big for a shard.
+        """
+        fixed_length = len(escape_label(prefix)) + self._formatter_overhead + \
+            _GROUP_OVERHEAD
+        # a word ending in the node is matched by the first shard
+        terminal = self._emitter.is_terminal(node)
+        keys = [prefix] if terminal else []  # type: List[str]
+        fragments = []  # type: List[Fragment]
+        length = fixed_length
+        descended = []  # type: List[Tuple[str, Any]]
+
+        for label, child in self._emitter.edges(node):
+            has_edges = bool(self._emitter.edges(child))
+            fragment = self._emitter.edge_fragment(
+                label, self._emitter.node_fragment(child) if has_edges else ''
+            )
+            child_length = fragment_length(fragment) + 1  # with separator
+
+            if fixed_length + child_length > self._max_pattern_size and has_edges:
+                descended.append((prefix + label, child))
+                continue
+
+            if length + child_length > self._max_pattern_size and (fragments or keys):
+                self._add_shard(prefix, keys, fragments, terminal)
+                keys, fragments, length, terminal = [], [], fixed_length, False
+
+            keys.append(prefix + label[0])
+            fragments.append(fragment)
+            length += child_length
+
+        if fragments or keys:
+            self._add_shard(prefix, keys, fragments, terminal)
+
+        return descended
+
+
+def shard_prefix_tree(
+        tree: PrefixTree,
+        max_pattern_size: int,
+        formatter: Type[BaseFormatter] = PythonFormatter
+) -> ShardedRegexp:
+    """Splits the regular expression of ``tree`` into shards.
+
+    :param tree: Tree of the words.
+    :param max_pattern_size: Maximal length of each formatted regular
+        expression. Only a single word longer than that is put into a longer
+        shard.
+    :param formatter: Formatter of each shard.
+    :raises ValueError: If ``max_pattern_size`` is not positive or the formatter
+        needs atomic groups, whose root is not split into shards.
+    """
+    if max_pattern_size <= 0:
+        raise ValueError('Pattern size must be positive.')
+
+    if issubclass(formatter, PythonAtomicFormatter):
+        raise ValueError('Atomic regular expressions can not be split into shards.')
+
+    builder = _ShardBuilder(formatter, max_pattern_size)
+    builder.add_tree(tree._root_node)  # pylint: disable=protected-access
+
+    if not builder.patterns:  # no words
+        return ShardedRegexp([formatter.wrap_regexp(PrerenderedNode(''))], {'': 0})
+
+    return ShardedRegexp(builder.patterns, builder.keys)
+
+
+def iterable_to_sharded_regexp(
+        iterable: Iterable[str],
+        max_pattern_size: int,
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        assume_sorted: bool = False
+) -> ShardedRegexp:
+    """Same as `iterable_to_regexp`, but splits the output into shards of at
+    most ``max_pattern_size`` characters, see `shard_prefix_tree`.
+    """
+    tree = PrefixTree()
+
+    if assume_sorted:
+        tree.extend_sorted(iterable)
+    else:
+        tree.extend(iterable)
+
+    return shard_prefix_tree(tree, max_pattern_size, formatter)
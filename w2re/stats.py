@@ -0,0 +1,205 @@
+"""Counters and timers of phases of the conversion.
+
+Nothing is measured unless `collect_stats` is active. It temporarily replaces
+measured functions and methods with wrappers counting their calls, so there is
+no overhead at all otherwise. As a consequence, statistics can be collected by
+only one thread at a time and calls in other processes (see
+`parallel_iterable_to_regexp`) are not counted.
+"""
+import time
+from contextlib import contextmanager
+from typing import (  # pylint: disable=unused-import; false positive
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from w2re import dafsa
+from w2re.prefix_tree import (
+    bytes_tree,
+    emitter,
+    primitives,
+)
+
+# statistics being collected, at most one
+_ACTIVE_STATS = []  # type: List[Stats]
+
+
+class Stats:
+    """Counters of events and total times of phases in seconds, by name.
+
+    Timed phases are also counted.
+    """
+
+    __slots__ = ('counters', 'timers')
+
+    def __init__(self) -> None:
+        self.counters = {}  # type: Dict[str, int]
+        self.timers = {}  # type: Dict[str, float]
+
+    def count(self, name: str, increment: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+            self.count(name)
+
+    def counted(self, name: str, function: Callable) -> Callable:
+        """:return: ``function`` counting its calls."""
+        def wrapper(*args, **kwargs):
+            self.counters[name] = self.counters.get(name, 0) + 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        """:return: ``function`` counting its calls and their total time."""
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.timers[name] = self.timers.get(name, 0.0) + \
+                    time.perf_counter() - started
+                self.counters[name] = self.counters.get(name, 0) + 1
+
+        return wrapper
+
+    def timed_iterable(self, name: str, iterable: Iterable) -> Iterator:
+        """:return: Iterator over ``iterable`` counting its items and the total
+            time spent producing them.
+        """
+        iterator = iter(iterable)
+
+        while True:
+            started = time.perf_counter()
+
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - started)
+                return
+
+            self.add_time(name, time.perf_counter() - started)
+            self.count(name)
+            yield item
+
+    def report(self) -> str:
+        """:return: Human readable table of all counters and timers."""
+        lines = ['{:<24} {:>12} {:>12}'.format('', 'count', 'time [s]')]
+
+        for name in sorted(set(self.counters) | set(self.timers)):
+            seconds = self.timers.get(name)
+            lines.append('{:<24} {:>12} {:>12}'.format(
+                name,
+                self.counters.get(name, ''),
+                '' if seconds is None else '{:.6f}'.format(seconds)
+            ))
+
+        return '\n'.join(lines)
+
+    def __repr__(self) -> str:
+        return '{}(counters={!r}, timers={!r})'.format(
+            self.__class__.__name__, self.counters, self.timers
+        )
+
+
+class _NoTimer:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def active_stats() -> Optional[Stats]:
+    """:return: Statistics being collected by `collect_stats`, if any."""
+    return _ACTIVE_STATS[0] if _ACTIVE_STATS else None
+
+
+def timer(name: str) -> Any:
+    """:return: `Stats.timer` of the active statistics, or a context manager
+        doing nothing if none are collected.
+    """
+    if not _ACTIVE_STATS:
+        return _NO_TIMER
+
+    return _ACTIVE_STATS[0].timer(name)
+
+
+def _instrumented_attributes(stats: Stats) -> List[Tuple[Any, str, Callable]]:
+    """:return: Owner, name and wrapper of each measured function or method."""
+    # pylint: disable=protected-access
+    node_class, edge_class = primitives.PrefixTreeNode, primitives.PrefixTreeEdge
+
+    methods = [
+        (node_class, '__init__', stats.counted('nodes', node_class.__init__)),
+        (edge_class, '__init__', stats.counted('edges', edge_class.__init__)),
+        (edge_class, '_split', stats.counted('splits', edge_class._split)),
+        (edge_class, '_branch', stats.counted('branches', edge_class._branch)),
+        (dafsa.DafsaState, '__init__', stats.counted(
+            'dafsa states', dafsa.DafsaState.__init__
+        )),
+    ]  # type: List[Tuple[Any, str, Callable]]
+    functions = [
+        (module, name, stats.timed(name, getattr(module, name)))
+        for module in (emitter, dafsa)
+        for name in ('compress', 'collapse_letter_ranges')
+    ]  # type: List[Tuple[Any, str, Callable]]
+    functions.append(
+        (bytes_tree, 'compress', stats.timed('compress', bytes_tree.compress))
+    )
+    return methods + functions
+
+
+@contextmanager
+def collect_stats() -> Iterator[Stats]:
+    """Collects statistics of all conversions within the ``with`` block::
+
+        with collect_stats() as stats:
+            iterable_to_regexp(words)
+
+        print(stats.report())
+
+    Words are read while the tree is built, so the time of ``build`` includes
+    the time of ``read``. Only calls of `compress` not answered by the cache of
+    `escape_label` are measured.
+
+    :raises RuntimeError: If statistics are already being collected.
+    """
+    if _ACTIVE_STATS:
+        raise RuntimeError('Statistics are already being collected.')
+
+    stats = Stats()
+    instrumented = _instrumented_attributes(stats)
+    originals = [getattr(owner, name) for owner, name, _ in instrumented]
+    _ACTIVE_STATS.append(stats)
+
+    try:
+        for owner, name, wrapper in instrumented:
+            setattr(owner, name, wrapper)
+
+        yield stats
+    finally:
+        for (owner, name, _), original in zip(instrumented, originals):
+            setattr(owner, name, original)
+
+        _ACTIVE_STATS.pop()
@@ -1,26 +1,299 @@
-import os
 from typing import (
-    TextIO,
-    Type,
+    Any,
+    IO,
     Iterable,
+    Optional,
+    Sequence,
+    Type,
+    Union,
 )
 
 from w2re import PythonFormatter
-from w2re.formatters import BaseFormatter
-from w2re.prefix_tree.tree import PrefixTree
+from w2re.dafsa import Dafsa
+from w2re.external_sort import iter_sorted_unique
+from w2re.formatters import (
+    BaseFormatter,
+    PythonAtomicFormatter,
+    PythonBytesFormatter,
+)
+from w2re.parallel import parallel_iterable_to_regexp
+from w2re.prefix_tree.bytes_tree import BytesPrefixTree
+from w2re.prefix_tree.emitter import RegexpEmitter
+from w2re.prefix_tree.optimizer import (
+    CostModel,
+    OptimizingEmitter,
+)
+from w2re.prefix_tree.tree import (
+    PrefixTree,
+    WeightedWord,
+)
+from w2re.reading import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_ENCODING,
+    DEFAULT_READER_THREADS,
+    iter_files_lines,
+    iter_stream_byte_lines,
+    iter_stream_lines,
+    parse_weighted_lines,
+)
+from w2re.stats import (
+    active_stats,
+    timer,
+)
+
+
+class ConversionOptions:  # pylint: disable=too-few-public-methods
+    """How words are added to the tree and serialized by `iterable_to_regexp`,
+    `stream_to_regexp` and `files_to_regexp`.
+
+    :param merge_suffixes: Use `Dafsa` to merge common suffixes as well as
+        prefixes. Unless ``assume_sorted`` is set, words have to be sorted
+        first, so all of them are held in memory.
+    :param jobs: Number of processes building the prefix tree, see
+        `parallel_iterable_to_regexp`. All words are held in memory if it is
+        not 1. Ignored if ``merge_suffixes`` is set.
+    :param assume_sorted: Words are lexicographically sorted, so they can be
+        added faster, see `PrefixTree.extend_sorted`. Ignored if ``jobs`` is
+        not 1.
+    :param weighted: Words are pairs of word and its weight, see
+        `PrefixTree.add`, or lines of streams are words with their counts, see
+        `parse_weighted_lines`. Alternatives are ordered by descending weight,
+        see `RegexpEmitter`. Other options changing how the tree is built are
+        ignored.
+    :param presort: Sort words and skip duplicates first, see
+        `iter_sorted_unique`, so they are added in sorted order with bounded
+        memory, even with ``merge_suffixes``. Ignored if ``weighted`` is set.
+    :param cost_model: Serialize the tree by `OptimizingEmitter` minimizing
+        this cost of the regular expression. Ignored if ``merge_suffixes`` is
+        set or ``jobs`` is not 1.
+    """
+
+    __slots__ = (
+        'merge_suffixes', 'jobs', 'assume_sorted', 'weighted', 'presort', 'cost_model'
+    )
+
+    def __init__(
+            self,
+            *,
+            merge_suffixes: bool = False,
+            jobs: Optional[int] = 1,
+            assume_sorted: bool = False,
+            weighted: bool = False,
+            presort: bool = False,
+            cost_model: Optional[CostModel] = None
+    ) -> None:
+        self.merge_suffixes = merge_suffixes
+        self.jobs = jobs
+        self.assume_sorted = assume_sorted
+        self.weighted = weighted
+        self.presort = presort
+        self.cost_model = cost_model
+
+
+def _tree_to_regexp(
+        tree: PrefixTree, formatter: Type[BaseFormatter], emitter: Optional[RegexpEmitter]
+) -> str:
+    stats = active_stats()
+
+    with timer('to_regexp'):
+        regexp = tree.to_regexp(formatter, emitter)
+
+    if stats is not None and isinstance(emitter, OptimizingEmitter):
+        stats.count('optimizer saved bytes', emitter.saved_bytes)
+
+    return regexp
+
+
+def _weighted_words_to_regexp(
+        words: Iterable[WeightedWord],
+        formatter: Type[BaseFormatter],
+        cost_model: Optional[CostModel]
+) -> str:
+    atomic = issubclass(formatter, PythonAtomicFormatter)
+
+    with timer('build'):
+        tree = PrefixTree()
+        tree.extend_weighted(words)
+
+    emitter = RegexpEmitter(atomic=atomic, weighted=True) if cost_model is None \
+        else OptimizingEmitter(cost_model, atomic, weighted=True)
+    return _tree_to_regexp(tree, formatter, emitter)
+
+
+def _dafsa_words_to_regexp(
+        words: Iterable[str], formatter: Type[BaseFormatter], assume_sorted: bool
+) -> str:
+    with timer('build'):
+        dafsa = Dafsa(words if assume_sorted else sorted(set(words)))
+
+    with timer('to_regexp'):
+        return dafsa.to_regexp(formatter)
+
+
+def _parallel_words_to_regexp(
+        words: Iterable[str], formatter: Type[BaseFormatter], jobs: Optional[int]
+) -> str:
+    with timer('build'):  # sub-trees are serialized by the same processes
+        return parallel_iterable_to_regexp(words, formatter, jobs)
+
+
+def _prefix_tree_words_to_regexp(
+        words: Iterable[str],
+        formatter: Type[BaseFormatter],
+        assume_sorted: bool,
+        cost_model: Optional[CostModel]
+) -> str:
+    with timer('build'):
+        tree = PrefixTree()
+
+        if assume_sorted:
+            tree.extend_sorted(words)
+        else:
+            tree.extend(words)
+
+    emitter = None if cost_model is None else OptimizingEmitter(
+        cost_model, issubclass(formatter, PythonAtomicFormatter)
+    )
+    return _tree_to_regexp(tree, formatter, emitter)
+
+
+def _unweighted_words_to_regexp(
+        words: Iterable[str], formatter: Type[BaseFormatter], options: ConversionOptions
+) -> str:
+    assume_sorted = options.assume_sorted
+
+    if options.presort:
+        stats = active_stats()
+        words = iter_sorted_unique(words)
+        assume_sorted = True
+
+        if stats is not None:  # includes reading, which is done by the first word
+            words = stats.timed_iterable('presort', words)
+
+    if options.merge_suffixes:
+        return _dafsa_words_to_regexp(words, formatter, assume_sorted)
+
+    if options.jobs != 1:
+        return _parallel_words_to_regexp(words, formatter, options.jobs)
+
+    return _prefix_tree_words_to_regexp(words, formatter, assume_sorted, options.cost_model)
+
+
+def _words_to_regexp(
+        words: Iterable[Any], formatter: Type[BaseFormatter], options: ConversionOptions
+) -> str:
+    """Converts words, or pairs of word and weight if ``options.weighted``."""
+    stats = active_stats()
+
+    if stats is not None:
+        words = stats.timed_iterable('read', words)
+
+    if options.weighted:
+        regexp = _weighted_words_to_regexp(words, formatter, options.cost_model)
+    else:
+        regexp = _unweighted_words_to_regexp(words, formatter, options)
+
+    if stats is not None:
+        stats.count('output length', len(regexp))
+
+    return regexp
+
+
+def _lines_to_regexp(
+        lines: Iterable[str], formatter: Type[BaseFormatter], options: ConversionOptions
+) -> str:
+    if options.weighted:
+        return _words_to_regexp(parse_weighted_lines(lines), formatter, options)
+
+    return _words_to_regexp(lines, formatter, options)
 
 
 def stream_to_regexp(
-        stream: TextIO,
-        formatter: Type[BaseFormatter] = PythonFormatter
+        stream: IO,
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        options: Optional[ConversionOptions] = None,
+        encoding: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
 ) -> str:
-    lines_generator = (line for line in stream.read().split(os.linesep) if line)
-    prefix_tree = PrefixTree(lines_generator)
-    return prefix_tree.to_regexp(formatter)
+    """Converts lines of a stream into a regular expression.
+
+    Words are fed into the prefix tree as they are read, so the whole stream
+    is never held in memory. See `iter_stream_lines` for supported streams and
+    `ConversionOptions` for ``options``, which default to its defaults.
+
+    :raises ValueError: If ``assume_sorted`` is set, but words are not sorted,
+        or if ``weighted`` is set and a count is not valid.
+    """
+    return _lines_to_regexp(
+        iter_stream_lines(stream, encoding, chunk_size), formatter,
+        options or ConversionOptions()
+    )
+
+
+def files_to_regexp(
+        paths: Sequence[str],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        options: Optional[ConversionOptions] = None,
+        encoding: str = DEFAULT_ENCODING,
+        threads: int = DEFAULT_READER_THREADS
+) -> str:
+    """Same as `stream_to_regexp`, but reads lines of multiple files, which can
+    be compressed, by `iter_files_lines`. Words are added in order of the files,
+    so ``assume_sorted`` requires the files to be sorted one after another.
+
+    :raises OSError: If a file can't be read.
+    """
+    return _lines_to_regexp(
+        iter_files_lines(paths, encoding, threads=threads), formatter,
+        options or ConversionOptions()
+    )
 
 
 def iterable_to_regexp(
-        iterable: Iterable[str],
-        formatter: Type[BaseFormatter] = PythonFormatter
+        iterable: Iterable[Union[str, WeightedWord]],
+        formatter: Type[BaseFormatter] = PythonFormatter,
+        options: Optional[ConversionOptions] = None
 ) -> str:
-    return PrefixTree(iterable).to_regexp(formatter)
+    """Converts words, or pairs of word and weight if ``weighted`` of
+    ``options`` is set, see `ConversionOptions`, into a regular expression.
+
+    :raises ValueError: If ``assume_sorted`` is set, but words are not sorted,
+        or if ``weighted`` is set and a weight is negative.
+    """
+    return _words_to_regexp(iterable, formatter, options or ConversionOptions())
+
+
+def bytes_stream_to_regexp(
+        stream: IO,
+        formatter: Type[BaseFormatter] = PythonBytesFormatter,
+        options: Optional[ConversionOptions] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Union[bytes, str]:
+    """Same as `stream_to_regexp`, but lines of a binary stream are added to
+    `BytesPrefixTree` without decoding. Only ``assume_sorted`` of ``options``
+    is used.
+
+    :return: ``bytes`` regular expression from `PythonBytesFormatter`.
+    """
+    options = options or ConversionOptions()
+    stats = active_stats()
+    words = iter_stream_byte_lines(stream, chunk_size)  # type: Iterable[bytes]
+
+    if stats is not None:
+        words = stats.timed_iterable('read', words)
+
+    with timer('build'):
+        tree = BytesPrefixTree()
+
+        if options.assume_sorted:
+            tree.extend_sorted(words)
+        else:
+            tree.extend(words)
+
+    with timer('to_regexp'):
+        regexp = tree.to_regexp(formatter)
+
+    if stats is not None:
+        stats.count('output length', len(regexp))
+
+    return regexp